@@ -4,24 +4,39 @@ import numpy as np
 import pstats
 from io import StringIO
 from strategy.tunnel_strategy import (
-    calculate_position_size, detect_peaks_and_dips, manage_position,
-    check_entry_conditions, calculate_ema, execute_trade
+    calculate_position_size, detect_peaks_and_dips,
+    check_entry_conditions, compute_entry_signals, add_wavy_tunnel_indicators, build_peak_index,
+    strategy_params, wavy_tunnel_ema_specs, warmup_bars
 )
 from metatrader.data_retrieval import get_data
+from backtesting.exits import scan_exit, simulate_exits, TIE_BREAK_RULES
 import cProfile
 import MetaTrader5 as mt5
 from config import Config
 
+# Columns of the historical data the backtest reads
+BAR_COLUMNS = ('time', 'open', 'high', 'low', 'close')
+
 # Initialize the logger
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 def run_backtest(symbol, initial_balance, risk_percent, min_take_profit, max_loss_per_day,
                  starting_equity, stop_loss_pips, pip_value, start_date=None, end_date=None,
                  timeframe=mt5.TIMEFRAME_H1, max_trades_per_day=None, slippage=0,
-                 transaction_cost=0, enable_profiling=False, data=None):
+                 transaction_cost=0, enable_profiling=False, data=None, mode='vectorized', tie_break=None,
+                 peak_tolerance=None, params=None, ema_cache=None, trade_start=None):
     """
     Run a backtest for a given symbol with historical data.
+
+    ``mode='event'`` walks the bars one by one; ``mode='vectorized'`` computes
+    signals, stop levels and exits as arrays. Both produce the same trades.
+    Trades are closed at the first bar whose high/low touches their SL or TP;
+    ``tie_break`` (default ``Config.BACKTEST_TIE_BREAK``) decides bars that touch both.
+    ``peak_tolerance`` overrides the symbol's near-level distance (see ``level_tolerance``).
+    ``params`` overrides DEFAULT_STRATEGY_PARAMS; ``ema_cache`` is a dict shared
+    between runs over the same data so each EMA period is only computed once.
+    ``trade_start`` delays the first trade to that row of ``data``; earlier rows
+    only feed the indicators.
     """
     # Initialize the profiler if profiling is enabled
     pr = cProfile.Profile() if enable_profiling else None
@@ -36,140 +51,66 @@ def run_backtest(symbol, initial_balance, risk_percent, min_take_profit, max_los
     if risk_percent == 0:
         raise ValueError("Risk percentage cannot be zero.")
 
+    if mode not in ('event', 'vectorized'):
+        raise ValueError(f"Invalid backtest mode: {mode}. Use 'event' or 'vectorized'.")
+
+    tie_break = tie_break or Config.BACKTEST_TIE_BREAK
+    if tie_break not in TIE_BREAK_RULES:
+        raise ValueError(f"Invalid tie_break rule: {tie_break}. Expected one of {TIE_BREAK_RULES}.")
+
+    params = strategy_params(params)
+
     try:
         balance = initial_balance
-        trades = []
-        trades_today = 0
-        peak_type = 21
+        peak_type = params['peak_type']
+        warmup = warmup_bars(params)
+        start = warmup if trade_start is None else max(trade_start, warmup)
 
         # Use provided data if available, otherwise fetch it
         if data is None:
             if start_date is None or end_date is None:
                 raise ValueError("start_date and end_date must be provided if data is not supplied")
             data = get_data(symbol, mode='backtest', start_date=start_date, end_date=end_date, timeframe=timeframe)
-        else:
-            # If data is provided, extract start_date and end_date from it
-            start_date = data['time'].min()
-            end_date = data['time'].max()
 
-        if data is None or data.empty:
-            logger.error(f"No historical data available for {symbol}")
+        if data is None or len(data['close']) == 0:
+            logger.error("No historical data available for %s", symbol)
             return None
 
-        current_day = data.iloc[0]['time'].date()
-
-        data = data.copy()  # Make a copy to avoid modifying the original DataFrame
+        # Work on the price arrays themselves; the caller's data is never modified or copied
+        data = bar_columns(data)
+        start_date = data['time'].min()
+        end_date = data['time'].max()
 
-        # Handle missing values by interpolation
-        data['high'] = data['high'].interpolate(method='linear')
-        data['close'] = data['close'].interpolate(method='linear')
-        data['low'] = data['low'].interpolate(method='linear')
-
-        # Check if the DataFrame has enough rows for EMA calculation
-        if len(data) < 200:
-            raise ValueError("Not enough data to calculate required EMAs. Ensure data has at least 200 rows.")
+        # Check if the data has enough rows for EMA calculation
+        if len(data['close']) < warmup:
+            raise ValueError(f"Not enough data to calculate required EMAs. Ensure data has at least {warmup} rows.")
 
         # Log the data length before EMA calculation
-        logger.debug(f"Data length for 'high': {len(data['high'])}, 'low': {len(data['low'])}, 'close': {len(data['close'])}")
+        logger.debug("Data length for 'high': %d, 'low': %d, 'close': %d", len(data['high']), len(data['low']), len(data['close']))
 
         # Calculate EMAs
-        data.loc[:, 'wavy_h'] = calculate_ema(data['high'], 34)
-        data.loc[:, 'wavy_c'] = calculate_ema(data['close'], 34)
-        data.loc[:, 'wavy_l'] = calculate_ema(data['low'], 34)
-        data.loc[:, 'tunnel1'] = calculate_ema(data['close'], 144)
-        data.loc[:, 'tunnel2'] = calculate_ema(data['close'], 169)
-        data.loc[:, 'long_term_ema'] = calculate_ema(data['close'], 200)
+        add_wavy_tunnel_indicators(data, wavy_tunnel_ema_specs(params), ema_cache)
 
         # Peak and Dip detection
         peaks, dips = detect_peaks_and_dips(data, peak_type)
+        peak_index = build_peak_index(peaks, dips, symbol, peak_tolerance)
 
-        # Loop through the data
-        for i in range(200, len(data)):  # Start from 200 to ensure all indicators are calculated
-            row = data.iloc[i]
-            if row['time'].date() != current_day:
-                current_day = row['time'].date()
-                trades_today = 0
-                logger.info(f"New trading day: {current_day}, resetting daily counters.")
-
-            if max_trades_per_day is not None and trades_today >= max_trades_per_day:
-                logger.info(f"Reached max trades per day: {max_trades_per_day}, skipping further trades for {current_day}.")
-                continue
-
-            buy_condition, sell_condition = check_entry_conditions(row, peaks, dips, symbol)
-
-            if not buy_condition and not sell_condition:
-                logger.debug(f"No trade signal generated for {row['time']}.")
-                continue
-
-            try:
-                position_size = calculate_position_size(balance, risk_percent, stop_loss_pips, pip_value)
-            except ZeroDivisionError as e:
-                logger.warning(f"Zero division error while calculating position size: {e}")
-                continue
-
-            std_dev = data['close'].rolling(window=20).std().iloc[i]
-
-            if buy_condition and (max_trades_per_day is None or trades_today < max_trades_per_day):
-                trade = {
-                    'entry_time': row['time'],
-                    'entry_price': row['close'],
-                    'volume': position_size,
-                    'symbol': symbol,
-                    'action': 'BUY',
-                    'sl': row['close'] - (1.5 * std_dev),
-                    'tp': row['close'] + (2 * std_dev),
-                    'profit': 0  # Initialize profit to 0
-                }
-                execute_trade(trade)
-                trades.append(trade)
-                trades_today += 1
-                logger.info(f"Executed BUY trade at {trade['entry_time']}, price: {trade['entry_price']}, volume: {trade['volume']}.")
-
-            elif sell_condition and (max_trades_per_day is None or trades_today < max_trades_per_day):
-                trade = {
-                    'entry_time': row['time'],
-                    'entry_price': row['close'],
-                    'volume': position_size,
-                    'symbol': symbol,
-                    'action': 'SELL',
-                    'sl': row['close'] + (1.5 * std_dev),
-                    'tp': row['close'] - (2 * std_dev),
-                    'profit': 0  # Initialize profit to 0
-                }
-                execute_trade(trade)
-                trades.append(trade)
-                trades_today += 1
-                logger.info(f"Executed SELL trade at {trade['entry_time']}, price: {trade['entry_price']}, volume: {trade['volume']}.")
-
-            manage_position(symbol, min_take_profit, max_loss_per_day, starting_equity, max_trades_per_day)
-
-            for trade in trades:
-                exit_price = trade['tp'] if trade['action'] == 'BUY' else trade['sl']
-                if trade['action'] == 'BUY':
-                    trade['profit'] = (exit_price - trade['entry_price']) * trade['volume'] - slippage - transaction_cost
-                else:
-                    trade['profit'] = (trade['entry_price'] - exit_price) * trade['volume'] - slippage - transaction_cost
-                logger.info(f"Trade closed at {trade['entry_time']}, action: {trade['action']}, profit: {trade['profit']}.")
-
-            total_profit = sum(trade.get('profit', 0) for trade in trades)
-            num_trades = len(trades)
-            win_rate = sum(1 for trade in trades if trade.get('profit', 0) > 0) / num_trades if num_trades > 0 else 0
-            max_drawdown = calculate_max_drawdown(trades, initial_balance)
-
-            final_balance = balance + total_profit
-
-            logger.info(f"Backtest completed. Total Profit: {total_profit}, Final Balance: {final_balance}, Number of Trades: {num_trades}, Win Rate: {win_rate}, Max Drawdown: {max_drawdown}.")
-
-            return {
-                'total_profit': total_profit,
-                'final_balance': final_balance,
-                'num_trades': num_trades,
-                'win_rate': win_rate,
-                'max_drawdown': max_drawdown,
-                'trades': trades,
-                'total_slippage_costs': len(trades) * slippage,
-                'total_transaction_costs': len(trades) * transaction_cost
-            }
+        # Rolling volatility used for the SL/TP distances, computed once for the whole history
+        std_dev = pd.Series(data['close']).rolling(window=params['std_window']).std().to_numpy()
+
+        if mode == 'vectorized':
+            trades, entries = generate_trades_vectorized(data, symbol, peak_index, std_dev, balance, risk_percent,
+                                                         stop_loss_pips, pip_value, max_trades_per_day, start,
+                                                         params['sl_std_multiplier'], params['tp_std_multiplier'])
+            resolve_trade_outcomes(trades, entries, data, slippage, transaction_cost, tie_break)
+        else:
+            data = pd.DataFrame(data)
+            trades, entries = generate_trades_event(data, symbol, peaks, dips, peak_index, std_dev, balance, risk_percent,
+                                                    stop_loss_pips, pip_value, max_trades_per_day, start,
+                                                    params['sl_std_multiplier'], params['tp_std_multiplier'])
+            close_trades_event(trades, entries, data, slippage, transaction_cost, tie_break)
+
+        return summarize_backtest(trades, balance, slippage, transaction_cost)
 
     finally:
         if enable_profiling and pr:
@@ -179,6 +120,215 @@ def run_backtest(symbol, initial_balance, risk_percent, min_take_profit, max_los
             ps.print_stats()
             print(s.getvalue())
 
+def bar_columns(data):
+    """
+    The price columns of ``data`` as a dict of NumPy arrays.
+
+    ``data`` may be a DataFrame or any mapping of arrays, such as the read-only
+    bar store views. Columns are used as they are, without copying; high, low
+    and close are only replaced by interpolated copies when they contain NaN.
+    """
+    columns = {column: np.asarray(data[column]) for column in BAR_COLUMNS if column in data}
+    for column in ('high', 'low', 'close'):
+        values = np.asarray(columns[column], dtype=np.float64)
+        if np.isnan(values).any():
+            # Handle missing values by interpolation
+            values = pd.Series(values).interpolate(method='linear').to_numpy()
+        columns[column] = values
+    return columns
+
+def generate_trades_event(data, symbol, peaks, dips, peak_index, std_dev, balance, risk_percent,
+                          stop_loss_pips, pip_value, max_trades_per_day, start=200, sl_multiplier=1.5, tp_multiplier=2):
+    """
+    Walk the bars one by one and open trades on entry signals.
+
+    This is the reference path used to validate the vectorized one; it only
+    simulates trades and never sends orders to the terminal. Returns the trades
+    and the bar index each one was opened on.
+    """
+    trades = []
+    entries = []
+    trades_today = 0
+    current_day = data.iloc[0]['time'].date()
+
+    # Loop through the data
+    for i in range(start, len(data)):  # Start after the warmup to ensure all indicators are calculated
+        row = data.iloc[i]
+        if row['time'].date() != current_day:
+            current_day = row['time'].date()
+            trades_today = 0
+            logger.info("New trading day: %s, resetting daily counters.", current_day)
+
+        if max_trades_per_day is not None and trades_today >= max_trades_per_day:
+            logger.info("Reached max trades per day: %s, skipping further trades for %s.", max_trades_per_day,
+                        current_day)
+            continue
+
+        buy_condition, sell_condition = check_entry_conditions(row, peaks, dips, symbol, peak_index)
+
+        if not buy_condition and not sell_condition:
+            logger.debug("No trade signal generated for %s.", row['time'])
+            continue
+
+        try:
+            position_size = calculate_position_size(balance, risk_percent, stop_loss_pips, pip_value)
+        except ZeroDivisionError as e:
+            logger.warning("Zero division error while calculating position size: %s", e)
+            continue
+
+        if buy_condition and (max_trades_per_day is None or trades_today < max_trades_per_day):
+            trade = {
+                'entry_time': row['time'],
+                'entry_price': row['close'],
+                'volume': position_size,
+                'symbol': symbol,
+                'action': 'BUY',
+                'sl': row['close'] - (sl_multiplier * std_dev[i]),
+                'tp': row['close'] + (tp_multiplier * std_dev[i]),
+                'profit': 0  # Initialize profit to 0
+            }
+            trades.append(trade)
+            entries.append(i)
+            trades_today += 1
+            logger.info("Executed BUY trade at %s, price: %s, volume: %s.", trade['entry_time'], trade['entry_price'],
+                        trade['volume'])
+
+        elif sell_condition and (max_trades_per_day is None or trades_today < max_trades_per_day):
+            trade = {
+                'entry_time': row['time'],
+                'entry_price': row['close'],
+                'volume': position_size,
+                'symbol': symbol,
+                'action': 'SELL',
+                'sl': row['close'] + (sl_multiplier * std_dev[i]),
+                'tp': row['close'] - (tp_multiplier * std_dev[i]),
+                'profit': 0  # Initialize profit to 0
+            }
+            trades.append(trade)
+            entries.append(i)
+            trades_today += 1
+            logger.info("Executed SELL trade at %s, price: %s, volume: %s.", trade['entry_time'], trade['entry_price'],
+                        trade['volume'])
+
+    return trades, entries
+
+def generate_trades_vectorized(data, symbol, peak_index, std_dev, balance, risk_percent,
+                               stop_loss_pips, pip_value, max_trades_per_day, start=200, sl_multiplier=1.5,
+                               tp_multiplier=2):
+    """
+    Open the same trades as ``generate_trades_event`` using array operations only.
+    """
+    buy_signal, sell_signal, _ = compute_entry_signals(data, peak_index)
+    signal = buy_signal | sell_signal
+    signal[:start] = False
+    entries = np.flatnonzero(signal)
+
+    if max_trades_per_day is not None and len(entries):
+        # Keep the first max_trades_per_day signals of each calendar day
+        days = np.asarray(data['time'])[entries].astype('datetime64[D]')
+        day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        rank = np.arange(len(entries)) - np.repeat(day_starts, np.diff(np.r_[day_starts, len(entries)]))
+        entries = entries[rank < max_trades_per_day]
+
+    if len(entries) == 0:
+        return [], entries
+
+    try:
+        position_size = calculate_position_size(balance, risk_percent, stop_loss_pips, pip_value)
+    except ZeroDivisionError as e:
+        logger.warning("Zero division error while calculating position size: %s", e)
+        return [], entries[:0]
+
+    is_buy = buy_signal[entries]
+    close = np.asarray(data['close'])[entries]
+    sl = np.where(is_buy, close - (sl_multiplier * std_dev[entries]), close + (sl_multiplier * std_dev[entries]))
+    tp = np.where(is_buy, close + (tp_multiplier * std_dev[entries]), close - (tp_multiplier * std_dev[entries]))
+    entry_times = pd.DatetimeIndex(np.asarray(data['time'])[entries])
+
+    trades = [
+        {
+            'entry_time': entry_time,
+            'entry_price': entry_price,
+            'volume': position_size,
+            'symbol': symbol,
+            'action': 'BUY' if buy else 'SELL',
+            'sl': trade_sl,
+            'tp': trade_tp,
+            'profit': 0
+        }
+        for entry_time, entry_price, buy, trade_sl, trade_tp in zip(entry_times, close, is_buy, sl, tp)
+    ]
+    logger.info("Generated %s trades for %s from %s signal bars.", len(trades), symbol, int(signal.sum()))
+    return trades, entries
+
+def _price_arrays(data):
+    close = np.asarray(data['close'], dtype=np.float64)
+    open_ = np.asarray(data['open'], dtype=np.float64) if 'open' in data else close
+    return np.asarray(data['high'], dtype=np.float64), np.asarray(data['low'], dtype=np.float64), open_, close
+
+def _book_exit(trade, exit_time, exit_price, exit_reason, slippage, transaction_cost):
+    trade['exit_time'] = exit_time
+    trade['exit_price'] = exit_price
+    trade['exit_reason'] = exit_reason
+    if trade['action'] == 'BUY':
+        trade['profit'] = (exit_price - trade['entry_price']) * trade['volume'] - slippage - transaction_cost
+    else:
+        trade['profit'] = (trade['entry_price'] - exit_price) * trade['volume'] - slippage - transaction_cost
+
+def close_trades_event(trades, entries, data, slippage, transaction_cost, tie_break='stop_first'):
+    """
+    Close every trade by scanning the bars after its entry one at a time.
+    """
+    high, low, open_, close = _price_arrays(data)
+    times = data['time']
+    for trade, entry_index in zip(trades, entries):
+        exit_index, exit_price, exit_reason = scan_exit(high, low, open_, close, entry_index,
+                                                        trade['action'] == 'BUY', trade['sl'], trade['tp'], tie_break)
+        _book_exit(trade, times.iloc[exit_index], exit_price, exit_reason, slippage, transaction_cost)
+        logger.info("Trade closed at %s (%s), action: %s, profit: %s.", trade['exit_time'], exit_reason,
+                    trade['action'], trade['profit'])
+    return trades
+
+def resolve_trade_outcomes(trades, entries, data, slippage, transaction_cost, tie_break='stop_first'):
+    """
+    Close every trade at its first SL/TP touch and set its profit, using array operations.
+    """
+    if not trades:
+        return trades
+    high, low, open_, close = _price_arrays(data)
+    is_buy = np.array([trade['action'] == 'BUY' for trade in trades])
+    sl = np.array([trade['sl'] for trade in trades], dtype=np.float64)
+    tp = np.array([trade['tp'] for trade in trades], dtype=np.float64)
+
+    exit_index, exit_price, exit_reason = simulate_exits(high, low, open_, close, np.asarray(entries),
+                                                         is_buy, sl, tp, tie_break)
+    exit_times = pd.DatetimeIndex(np.asarray(data['time'])[exit_index])
+    for trade, exit_time, price, reason in zip(trades, exit_times, exit_price.tolist(), exit_reason.tolist()):
+        _book_exit(trade, exit_time, price, reason, slippage, transaction_cost)
+    return trades
+
+def summarize_backtest(trades, balance, slippage, transaction_cost):
+    total_profit = sum(trade.get('profit', 0) for trade in trades)
+    num_trades = len(trades)
+    win_rate = sum(1 for trade in trades if trade.get('profit', 0) > 0) / num_trades if num_trades > 0 else 0
+    max_drawdown = calculate_max_drawdown(trades, balance)
+
+    final_balance = balance + total_profit
+
+    logger.info("Backtest completed. Total Profit: %s, Final Balance: %s, Number of Trades: %s, Win Rate: %s, Max Drawdown: %s.",
+                total_profit, final_balance, num_trades, win_rate, max_drawdown)
+
+    return {
+        'total_profit': total_profit,
+        'final_balance': final_balance,
+        'num_trades': num_trades,
+        'win_rate': win_rate,
+        'max_drawdown': max_drawdown,
+        'trades': trades,
+        'total_slippage_costs': len(trades) * slippage,
+        'total_transaction_costs': len(trades) * transaction_cost
+    }
+
 def calculate_max_drawdown(trades, initial_balance):
     balance = initial_balance
     max_balance = initial_balance
@@ -0,0 +1,118 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How to resolve a bar whose range touches both the stop loss and the take profit
+TIE_BREAK_RULES = ('stop_first', 'target_first', 'nearest_to_open')
+
+def first_crossing(values, level, start, stop=None, above=True, chunk=64):
+    """
+    Index of the first bar in ``values[start:stop]`` at or above ``level`` (or at or below it
+    when ``above`` is False); -1 when there is none.
+
+    The range is scanned in doubling chunks. Within a chunk the running maximum
+    (minimum) is monotonic, so the crossing is found with searchsorted instead of
+    a Python loop. ``values`` must not contain NaN.
+    """
+    stop = len(values) if stop is None else min(stop, len(values))
+    pos = start
+    while pos < stop:
+        end = min(stop, pos + chunk)
+        if above:
+            running = np.maximum.accumulate(values[pos:end])
+            i = np.searchsorted(running, level, side='left')
+        else:
+            running = np.minimum.accumulate(values[pos:end])
+            i = np.searchsorted(-running, -level, side='left')
+        if i < end - pos:
+            return pos + i
+        pos = end
+        chunk *= 2
+    return -1
+
+def exit_fill(bar_open, is_buy, sl, tp, hit_sl, hit_tp, tie_break):
+    """
+    Exit price and reason for a bar that touched the stop loss and/or take profit.
+
+    Stops that are gapped through fill at the bar open; targets fill at their level.
+    """
+    if hit_sl and hit_tp:
+        if tie_break == 'target_first':
+            hit_sl = False
+        elif tie_break == 'nearest_to_open' and abs(tp - bar_open) < abs(bar_open - sl):
+            hit_sl = False
+    if hit_sl:
+        if is_buy:
+            return (bar_open if bar_open < sl else sl), 'stop_loss'
+        return (bar_open if bar_open > sl else sl), 'stop_loss'
+    return tp, 'take_profit'
+
+def scan_exit(high, low, open_, close, entry_index, is_buy, sl, tp, tie_break='stop_first'):
+    """
+    Walk the bars after ``entry_index`` one at a time until the stop loss or take profit is touched.
+
+    Returns ``(exit_index, exit_price, exit_reason)``; trades still open at the end
+    of the data exit at the last close. This is the reference for ``simulate_exits``.
+    """
+    for j in range(entry_index + 1, len(close)):
+        if is_buy:
+            hit_sl, hit_tp = low[j] <= sl, high[j] >= tp
+        else:
+            hit_sl, hit_tp = high[j] >= sl, low[j] <= tp
+        if hit_sl or hit_tp:
+            price, reason = exit_fill(open_[j], is_buy, sl, tp, hit_sl, hit_tp, tie_break)
+            return j, price, reason
+    return len(close) - 1, close[-1], 'end_of_data'
+
+def simulate_exits(high, low, open_, close, entry_index, is_buy, sl, tp, tie_break='stop_first'):
+    """
+    Resolve the exits of many trades at once.
+
+    For every trade the first stop-loss touch is located with ``first_crossing``
+    and the take-profit search is bounded by it, so each trade costs about
+    O(holding period) of array work. Fill prices, tie-breaks and end-of-data
+    exits are then computed with array operations. Returns
+    ``(exit_index, exit_price, exit_reason)`` arrays matching ``scan_exit``.
+    """
+    if tie_break not in TIE_BREAK_RULES:
+        raise ValueError(f"Invalid tie_break rule: {tie_break}. Expected one of {TIE_BREAK_RULES}.")
+
+    high = np.where(np.isnan(high), -np.inf, high)
+    low = np.where(np.isnan(low), np.inf, low)
+    n = len(close)
+    count = len(entry_index)
+    sl_index = np.full(count, -1, dtype=np.int64)
+    tp_index = np.full(count, -1, dtype=np.int64)
+
+    for k in range(count):
+        start = entry_index[k] + 1
+        if is_buy[k]:
+            sl_index[k] = first_crossing(low, sl[k], start, above=False)
+            stop = n if sl_index[k] < 0 else sl_index[k] + 1
+            tp_index[k] = first_crossing(high, tp[k], start, stop, above=True)
+        else:
+            sl_index[k] = first_crossing(high, sl[k], start, above=True)
+            stop = n if sl_index[k] < 0 else sl_index[k] + 1
+            tp_index[k] = first_crossing(low, tp[k], start, stop, above=False)
+
+    hit = (sl_index >= 0) | (tp_index >= 0)
+    exit_index = np.where(tp_index >= 0, tp_index, sl_index)
+    exit_index = np.where(hit, exit_index, n - 1)
+    hit_sl = (sl_index >= 0) & (sl_index == exit_index)
+    hit_tp = (tp_index >= 0) & (tp_index == exit_index)
+
+    bar_open = open_[exit_index]
+    use_sl = hit_sl.copy()
+    tie = hit_sl & hit_tp
+    if tie_break == 'target_first':
+        use_sl &= ~tie
+    elif tie_break == 'nearest_to_open':
+        use_sl &= ~(tie & (np.abs(tp - bar_open) < np.abs(bar_open - sl)))
+
+    stop_price = np.where(is_buy, np.where(bar_open < sl, bar_open, sl), np.where(bar_open > sl, bar_open, sl))
+    exit_price = np.where(use_sl, stop_price, np.where(hit_tp, tp, close[-1]))
+    exit_reason = np.where(use_sl, 'stop_loss', np.where(hit_tp, 'take_profit', 'end_of_data'))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Resolved %d exits: %d stop loss, %d take profit", count, int(use_sl.sum()), int((hit_tp & ~use_sl).sum()))
+    return exit_index, exit_price, exit_reason
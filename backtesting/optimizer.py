@@ -0,0 +1,145 @@
+import itertools
+import logging
+import os
+import random
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from metatrader.indicators import calculate_emas
+from backtesting.backtest import run_backtest
+from backtesting.parallel import share_history, attach_history
+from strategy.tunnel_strategy import strategy_params, wavy_tunnel_ema_specs, level_tolerance
+from utils.error_handling import handle_error
+
+logger = logging.getLogger(__name__)
+
+# A modest default search space around the classic 34/144/169/200 setup
+DEFAULT_PARAM_GRID = {
+    'wavy_period': [21, 34, 55],
+    'tunnel1_period': [144],
+    'tunnel2_period': [169],
+    'long_term_period': [200],
+    'peak_type': [11, 21, 31],
+    'std_window': [20],
+    'sl_std_multiplier': [1.0, 1.5, 2.0],
+    'tp_std_multiplier': [2, 3],
+}
+
+RESULT_METRICS = ['total_profit', 'final_balance', 'num_trades', 'win_rate', 'max_drawdown']
+
+# Prefix of the precomputed EMA columns placed next to the prices in shared memory
+EMA_COLUMN_PREFIX = '__ema__'
+
+# State of an optimizer worker process, filled once by _init_worker
+_worker = {}
+
+def parameter_grid(grid):
+    """Every combination of the values in ``grid`` (name -> list of values), as a list of dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def random_parameter_samples(grid, n_samples, seed=None):
+    """
+    Up to ``n_samples`` distinct combinations drawn at random from ``grid``.
+    """
+    rng = random.Random(seed)
+    names = list(grid)
+    total = 1
+    for name in names:
+        total *= len(grid[name])
+    samples = []
+    seen = set()
+    while len(samples) < min(n_samples, total):
+        values = tuple(rng.choice(grid[name]) for name in names)
+        if values not in seen:
+            seen.add(values)
+            samples.append(dict(zip(names, values)))
+    return samples
+
+def precompute_emas(data, combinations):
+    """
+    Compute every distinct ``(column, period)`` EMA needed by ``combinations`` once.
+
+    Returns a cache dict usable as ``run_backtest(ema_cache=...)``.
+    """
+    specs = {}
+    for params in combinations:
+        for column, period in wavy_tunnel_ema_specs(params).values():
+            specs[(column, period)] = (column, period)
+    cache = {}
+    calculate_emas(data, specs, cache)
+    logger.info(f"Precomputed {len(cache)} distinct EMAs for {len(combinations)} parameter combinations.")
+    return cache
+
+def share_history_with_emas(data, cache):
+    """
+    Place ``data`` and the EMA arrays of ``cache`` in one shared memory block (see ``share_history``).
+    """
+    shared = data.copy()
+    for (column, period), values in cache.items():
+        shared[f"{EMA_COLUMN_PREFIX}{column}_{period}"] = values
+    return share_history(shared)
+
+def attach_history_with_emas(descriptor):
+    """Return the ``(data, ema_cache)`` placed in shared memory by ``share_history_with_emas``."""
+    data = attach_history(descriptor)
+    cache = {}
+    for column in [column for column in data.columns if column.startswith(EMA_COLUMN_PREFIX)]:
+        source, period = column[len(EMA_COLUMN_PREFIX):].rsplit('_', 1)
+        cache[(source, int(period))] = data.pop(column).to_numpy()
+    return data, cache
+
+def _init_worker(symbol, descriptor, peak_tolerance, backtest_kwargs):
+    data, cache = attach_history_with_emas(descriptor)
+    _worker.update(symbol=symbol, data=data, cache=cache, peak_tolerance=peak_tolerance, backtest_kwargs=backtest_kwargs)
+
+def score_parameters(symbol, data, params, ema_cache=None, **backtest_kwargs):
+    """Backtest one parameter combination and return its results row, or None if it failed."""
+    try:
+        result = run_backtest(symbol=symbol, data=data, params=params, ema_cache=ema_cache, **backtest_kwargs)
+    except Exception as e:
+        handle_error(e, f"Backtest failed for parameters {params}")
+        return None
+    if not result:
+        return None
+    return {**params, **{metric: result[metric] for metric in RESULT_METRICS}}
+
+def evaluate_parameters(params):
+    """Backtest one parameter combination in a worker set up by ``_init_worker``."""
+    return score_parameters(_worker['symbol'], _worker['data'], params, _worker['cache'],
+                            peak_tolerance=_worker['peak_tolerance'], **_worker['backtest_kwargs'])
+
+def run_optimization(symbol, data, combinations, metric='total_profit', ascending=False, max_workers=None,
+                     output_path=None, **backtest_kwargs):
+    """
+    Backtest ``symbol`` over ``data`` once per parameter combination, in parallel.
+
+    The EMAs of all combinations are computed once up front and shared with the
+    workers through shared memory together with the prices. Returns the results
+    ranked by ``metric`` (best first) and writes them to ``output_path`` as CSV if given.
+    """
+    combinations = [strategy_params(params) for params in combinations]
+    backtest_kwargs.setdefault('mode', 'vectorized')
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame({column: np.asarray(data[column]) for column in data})
+
+    shm, descriptor = share_history_with_emas(data, precompute_emas(data, combinations))
+
+    max_workers = max_workers or min(os.cpu_count() or 1, max(len(combinations), 1))
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(symbol, descriptor, level_tolerance(symbol), backtest_kwargs)) as executor:
+            rows = [row for row in executor.map(evaluate_parameters, combinations) if row is not None]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame(rows, columns=list(combinations[0]) + RESULT_METRICS if combinations else RESULT_METRICS)
+    results = results.sort_values(metric, ascending=ascending, kind='mergesort').reset_index(drop=True)
+    results.insert(0, 'rank', range(1, len(results) + 1))
+
+    if output_path:
+        results.to_csv(output_path, index=False)
+        logger.info(f"Optimization results for {symbol} written to {output_path}")
+    logger.info(f"Evaluated {len(results)} of {len(combinations)} parameter combinations for {symbol} with {max_workers} workers.")
+    return results
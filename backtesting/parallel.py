@@ -0,0 +1,166 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import MetaTrader5 as mt5
+from backtesting.backtest import run_backtest, calculate_max_drawdown
+from strategy.tunnel_strategy import level_tolerance
+from config import Config
+from metatrader.bar_store import BarArrays
+from metatrader.data_retrieval import get_data, get_bar_arrays
+from utils.error_handling import handle_error
+
+logger = logging.getLogger(__name__)
+
+def load_histories(symbols, start_date, end_date, timeframe, min_rows=20):
+    """
+    Fetch the backtest history of every symbol once, in the process that owns the MT5 connection.
+
+    With MT5 data and the bar store enabled the histories are read-only memory-mapped views
+    (``BarArrays``) of the stored bars, otherwise DataFrames. Symbols that cannot
+    be selected or have too little data are skipped. Returns a dict keyed by symbol.
+    """
+    from_mt5 = Config.DATA_SOURCE == 'MT5'
+    use_store = from_mt5 and Config.BAR_STORE_ENABLED and timeframe in Config.TIMEFRAME_SECONDS
+    histories = {}
+    for symbol in symbols:
+        if from_mt5 and not mt5.symbol_select(symbol, True):
+            logger.error(f"Failed to select symbol {symbol}")
+            continue
+
+        if use_store:
+            data = get_bar_arrays(symbol, timeframe, start_date, end_date)
+        else:
+            data = get_data(symbol, mode='backtest', start_date=start_date, end_date=end_date, timeframe=timeframe)
+        if data is None or len(data['close']) == 0:
+            logger.error(f"No historical data retrieved for {symbol} for backtesting. Start: {start_date}, End: {end_date}")
+            continue
+        if len(data['close']) < min_rows:
+            logger.error(f"Not enough data for symbol {symbol} to perform backtest")
+            continue
+
+        if isinstance(data, pd.DataFrame):
+            data.loc[:, 'close'] = pd.to_numeric(data['close'], errors='coerce')
+        logger.info(f"Backtest data retrieved for {symbol}: {len(data['close'])} bars from {np.asarray(data['time'])[0]} to {np.asarray(data['time'])[-1]}")
+        histories[symbol] = data
+    return histories
+
+def share_history(data):
+    """
+    Copy the numeric and datetime columns of ``data`` into one shared memory block.
+
+    Returns the ``SharedMemory`` object, which the caller must close and unlink,
+    and a small picklable descriptor that ``attach_history`` turns back into a DataFrame.
+    """
+    arrays = {}
+    for column in data.columns:
+        values = np.asarray(data[column])
+        if values.dtype.kind in 'biufM':
+            arrays[column] = values
+
+    shm = shared_memory.SharedMemory(create=True, size=max(sum(values.nbytes for values in arrays.values()), 1))
+    layout = []
+    offset = 0
+    for column, values in arrays.items():
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=offset)[:] = values
+        layout.append((column, values.dtype.str, offset))
+        offset += values.nbytes
+    return shm, {'name': shm.name, 'length': len(data), 'layout': layout}
+
+def attach_history(descriptor):
+    """Rebuild the DataFrame described by ``share_history`` from shared memory."""
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    columns = {}
+    try:
+        for column, dtype, offset in descriptor['layout']:
+            columns[column] = np.ndarray(descriptor['length'], dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        return pd.DataFrame(columns, copy=True)
+    finally:
+        # The views must be released before the block can be closed
+        columns.clear()
+        shm.close()
+
+def _run_shared_backtest(symbol, source, peak_tolerance, backtest_kwargs):
+    data = source if isinstance(source, BarArrays) else attach_history(source)
+    return run_backtest(symbol=symbol, data=data, peak_tolerance=peak_tolerance, **backtest_kwargs)
+
+def run_parallel_backtests(histories, max_workers=None, **backtest_kwargs):
+    """
+    Run ``run_backtest`` for every symbol in ``histories`` across a process pool.
+
+    Each DataFrame history is placed in shared memory once; workers attach to it
+    instead of receiving a pickled DataFrame. ``BarArrays`` histories are passed
+    as file references and memory-mapped by the workers. ``backtest_kwargs`` are passed to every
+    ``run_backtest`` call (``mode`` defaults to ``'vectorized'``). Symbol point
+    sizes are looked up here, since workers have no MT5 connection. Returns a dict
+    of results keyed by symbol; symbols whose backtest failed are left out.
+    """
+    backtest_kwargs.setdefault('mode', 'vectorized')
+    max_workers = max_workers or min(os.cpu_count() or 1, max(len(histories), 1))
+    shared = {}
+    results = {}
+    try:
+        for symbol, data in histories.items():
+            if not isinstance(data, BarArrays):
+                shared[symbol] = share_history(data)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                symbol: executor.submit(_run_shared_backtest, symbol, shared[symbol][1] if symbol in shared else data,
+                                        level_tolerance(symbol), backtest_kwargs)
+                for symbol, data in histories.items()
+            }
+            for symbol, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    handle_error(e, f"An error occurred during backtesting for {symbol}")
+                    continue
+                if result:
+                    results[symbol] = result
+                else:
+                    logger.warning(f"Backtest for {symbol} did not produce results.")
+    finally:
+        for shm, _ in shared.values():
+            shm.close()
+            shm.unlink()
+
+    logger.info(f"Completed {len(results)} of {len(histories)} backtests with {max_workers} workers.")
+    return results
+
+def portfolio_report(results, initial_balance):
+    """
+    Merge per-symbol backtest results into one portfolio trading a single ``initial_balance``.
+
+    Trades are ordered by exit time to build the portfolio equity curve.
+    """
+    trades = sorted(
+        (trade for result in results.values() for trade in result['trades']),
+        key=lambda trade: trade.get('exit_time', trade['entry_time'])
+    )
+    per_symbol = pd.DataFrame(
+        [
+            {'symbol': symbol, 'total_profit': result['total_profit'], 'num_trades': result['num_trades'],
+             'win_rate': result['win_rate'], 'max_drawdown': result['max_drawdown']}
+            for symbol, result in results.items()
+        ],
+        columns=['symbol', 'total_profit', 'num_trades', 'win_rate', 'max_drawdown']
+    ).set_index('symbol')
+
+    total_profit = sum(trade.get('profit', 0) for trade in trades)
+    num_trades = len(trades)
+    report = {
+        'total_profit': total_profit,
+        'final_balance': initial_balance + total_profit,
+        'num_trades': num_trades,
+        'win_rate': sum(1 for trade in trades if trade.get('profit', 0) > 0) / num_trades if num_trades > 0 else 0,
+        'max_drawdown': calculate_max_drawdown(trades, initial_balance),
+        'total_slippage_costs': sum(result.get('total_slippage_costs', 0) for result in results.values()),
+        'total_transaction_costs': sum(result.get('total_transaction_costs', 0) for result in results.values()),
+        'per_symbol': per_symbol,
+        'trades': trades
+    }
+    logger.info(f"Portfolio backtest: Total Profit: {total_profit}, Number of Trades: {num_trades}, Win Rate: {report['win_rate']}, Max Drawdown: {report['max_drawdown']}.\n{per_symbol}")
+    return report
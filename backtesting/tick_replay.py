@@ -0,0 +1,298 @@
+import heapq
+import logging
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from config import Config
+from strategy.live_loop import SymbolTrader
+from strategy.tunnel_strategy import (
+    add_wavy_tunnel_indicators, build_peak_index, detect_peaks_and_dips, level_tolerance, strategy_params,
+    wavy_tunnel_ema_specs, warmup_bars
+)
+from backtesting.backtest import _book_exit, generate_trades_vectorized, summarize_backtest
+from backtesting.exits import first_crossing
+from metatrader.data_sources import get_data_source
+
+logger = logging.getLogger(__name__)
+
+TICK_REPLAY_MODES = ('incremental', 'vectorized')
+
+# Ticks per block of a QuoteIndex
+QUOTE_BLOCK_TICKS = 1024
+
+def load_ticks(symbol, start_date, end_date, source=None):
+    """Ticks of ``symbol`` from the configured data source (MT5 ``copy_ticks_range`` or tick files)."""
+    source = source or get_data_source()
+    if not hasattr(source, 'get_ticks'):
+        raise ValueError(f"{type(source).__name__} does not provide ticks")
+    return source.get_ticks(symbol, start_date, end_date)
+
+def tick_columns(ticks):
+    """
+    ``time_msc``, ``bid`` and ``ask`` of a tick frame, mapping or MT5 tick
+    array as NumPy arrays, without copying when they already have the right dtype.
+    """
+    fields = ticks.dtype.names if isinstance(ticks, np.ndarray) else ticks
+    if 'time_msc' in fields:
+        time_msc = np.asarray(ticks['time_msc'], dtype=np.int64)
+    else:
+        time_msc = np.asarray(ticks['time']).astype('datetime64[ms]').astype(np.int64)
+    return time_msc, np.asarray(ticks['bid'], dtype=np.float64), np.asarray(ticks['ask'], dtype=np.float64)
+
+def build_bars(time_msc, bid, timeframe):
+    """
+    The closed bid bars of a tick stream, as the terminal builds them tick by tick.
+
+    A bar is only known to be closed when the first tick of a later bar
+    arrives. Returns the bar columns and, for every bar, the index of the tick
+    that revealed its close. The last bar has no such tick yet and is left out.
+    """
+    seconds = Config.TIMEFRAME_SECONDS[timeframe]
+    buckets = time_msc // (seconds * 1000)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if len(buckets) else buckets[:0]
+    reveal = starts[1:]
+    starts = starts[:-1]
+    closed = bid[:reveal[-1]] if len(reveal) else bid[:0]
+    bars = {
+        'time': (buckets[starts] * seconds).astype('datetime64[s]'),
+        'open': bid[starts],
+        'high': np.maximum.reduceat(closed, starts) if len(starts) else closed,
+        'low': np.minimum.reduceat(closed, starts) if len(starts) else closed,
+        'close': bid[reveal - 1],
+        'tick_volume': reveal - starts,
+    }
+    return bars, reveal
+
+def first_exit(quotes, start, sl, tp, is_buy, chunk=1024):
+    """
+    Index and reason of the first quote from ``start`` on that reaches ``sl`` or ``tp``;
+    ``(-1, None)`` if neither is reached.
+
+    Both levels are searched in the same doubling windows, so the cost follows
+    how long the trade is held rather than the length of the stream.
+    """
+    pos = start
+    while pos < len(quotes):
+        stop = min(pos + chunk, len(quotes))
+        hit_sl = first_crossing(quotes, sl, pos, stop, above=not is_buy)
+        hit_tp = first_crossing(quotes, tp, pos, stop, above=is_buy)
+        hits = [(index, reason) for index, reason in ((hit_sl, 'stop_loss'), (hit_tp, 'take_profit')) if index >= 0]
+        if hits:
+            return min(hits)
+        pos = stop
+        chunk *= 2
+    return -1, None
+
+class QuoteIndex:
+    """
+    The highest and lowest quote of every ``block`` ticks of a quote stream.
+
+    ``first_exit`` skips the blocks whose range reaches neither level and only
+    scans ticks in the block where the SL or TP is first reached, so a trade
+    held for millions of ticks costs a search over a few thousand blocks.
+    """
+
+    def __init__(self, quotes, block=QUOTE_BLOCK_TICKS):
+        self.quotes = quotes
+        self.block = block
+        starts = np.arange(0, len(quotes), block)
+        self.highs = np.maximum.reduceat(quotes, starts) if len(quotes) else quotes
+        self.lows = np.minimum.reduceat(quotes, starts) if len(quotes) else quotes
+
+    def first_exit(self, start, sl, tp, is_buy):
+        """Same as ``first_exit(quotes, start, sl, tp, is_buy)``."""
+        stop = (start // self.block + 1) * self.block
+        hit = self._first_exit_in_block(start, stop, sl, tp, is_buy)
+        if hit[0] >= 0 or stop >= len(self.quotes):
+            return hit
+        upper, lower = (tp, sl) if is_buy else (sl, tp)
+        blocks = [block for block in (first_crossing(self.highs, upper, stop // self.block),
+                                      first_crossing(self.lows, lower, stop // self.block, above=False))
+                  if block >= 0]
+        if not blocks:
+            return -1, None
+        start = min(blocks) * self.block
+        return self._first_exit_in_block(start, start + self.block, sl, tp, is_buy)
+
+    def _first_exit_in_block(self, start, stop, sl, tp, is_buy):
+        window = self.quotes[start:stop]
+        hit_sl = window <= sl if is_buy else window >= sl
+        hit_tp = window >= tp if is_buy else window <= tp
+        hit = hit_sl | hit_tp
+        i = int(hit.argmax()) if len(hit) else 0
+        if not len(hit) or not hit[i]:
+            return -1, None
+        return start + i, 'stop_loss' if hit_sl[i] else 'take_profit'
+
+def quote_indexes(bid, ask):
+    """Buys close on the bid and sells on the ask."""
+    return {'BUY': QuoteIndex(bid), 'SELL': QuoteIndex(ask)}
+
+def _fill(trade, tick, time_msc, bid, ask, transaction_cost, exits):
+    """
+    Fill ``trade`` on ``tick`` and close it on the first later tick that reaches
+    its SL or TP; returns the index of the closing tick. ``exits`` maps the
+    trade action to the ``QuoteIndex`` it closes on.
+    """
+    is_buy = trade['action'] == 'BUY'
+    signal_price = trade['signal_price']
+    shift = bid[tick] - signal_price
+    trade['entry_time'] = pd.Timestamp(time_msc[tick], unit='ms')
+    trade['entry_price'] = ask[tick] if is_buy else bid[tick]
+    trade['slippage'] = trade['entry_price'] - signal_price if is_buy else signal_price - trade['entry_price']
+    trade['spread'] = ask[tick] - bid[tick]
+    trade['sl'] += shift
+    trade['tp'] += shift
+
+    quotes = bid if is_buy else ask
+    exit_index, exit_reason = exits[trade['action']].first_exit(tick + 1, trade['sl'], trade['tp'], is_buy)
+    if exit_index < 0:
+        exit_index, exit_reason = len(quotes) - 1, 'end_of_data'
+    _book_exit(trade, pd.Timestamp(time_msc[exit_index], unit='ms'), quotes[exit_index], exit_reason,
+               0, transaction_cost)
+    return exit_index
+
+def replay_incremental(symbol, time_msc, bid, ask, initial_balance, risk_percent, pip_value, timeframe,
+                       max_trades_per_day, transaction_cost, latency_ms, params, peak_tolerance, num_candles):
+    """
+    Feed the bars of the tick stream into a live ``SymbolTrader``, one close at a time.
+
+    At the tick that reveals a bar's close the trader gets what the live loop's
+    refresh gets: the final bar, then the forming bar of that tick. Entries
+    come from ``SymbolTrader.entry_request``, which only sees the bars fed so
+    far. Returns the filled trades and the number of closed bars.
+    """
+    params = strategy_params(params)
+    warmup = warmup_bars(params)
+    trader = SymbolTrader(symbol, timeframe, num_candles, params, risk_percent, pip_value)
+    trader.tolerance = level_tolerance(symbol) if peak_tolerance is None else peak_tolerance
+    seconds = Config.TIMEFRAME_SECONDS[timeframe]
+    bars, reveal = build_bars(time_msc, bid, timeframe)
+    exits = quote_indexes(bid, ask)
+    columns = {field: values.tolist() for field, values in bars.items() if field != 'time'}
+
+    balance = initial_balance
+    open_trades = []
+    filled = []
+    trades_today = 0
+    current_day = None
+    for i, tick in enumerate(reveal.tolist()):
+        price = bid[tick]
+        closed = {field: values[i] for field, values in columns.items()}
+        closed.update(time=bars['time'][i], spread=0, real_volume=0)
+        forming = {'time': np.datetime64(int(time_msc[tick]) // 1000 // seconds * seconds, 's'), 'open': price,
+                   'high': price, 'low': price, 'close': price, 'tick_volume': 1, 'spread': 0, 'real_volume': 0}
+        trader.push_bar(closed, price)
+        if not trader.push_bar(forming, price) or i + 1 < warmup:
+            continue
+
+        day = bars['time'][i].astype('datetime64[D]')
+        if day != current_day:
+            current_day, trades_today = day, 0
+        if max_trades_per_day is not None and trades_today >= max_trades_per_day:
+            continue
+        # Only profits of trades closed by now count towards the balance
+        while open_trades and open_trades[0][0] <= tick:
+            balance += heapq.heappop(open_trades)[1]
+        request = trader.entry_request(balance)
+        if request is None:
+            continue
+
+        order_tick = int(np.searchsorted(time_msc, time_msc[tick] + latency_ms, side='left'))
+        if order_tick >= len(time_msc):
+            continue
+        trades_today += 1
+        trade = {
+            'entry_time': None,
+            'entry_price': None,
+            'volume': request['volume'],
+            'symbol': symbol,
+            'action': 'BUY' if request['type'] == mt5.ORDER_TYPE_BUY else 'SELL',
+            'sl': request['sl'],
+            'tp': request['tp'],
+            'profit': 0,
+            'signal_price': request['price'],
+        }
+        exit_index = _fill(trade, order_tick, time_msc, bid, ask, transaction_cost, exits)
+        heapq.heappush(open_trades, (exit_index, trade['profit']))
+        filled.append(trade)
+    return filled, len(reveal)
+
+def replay_vectorized(symbol, time_msc, bid, ask, initial_balance, risk_percent, stop_loss_pips, pip_value,
+                      timeframe, max_trades_per_day, transaction_cost, latency_ms, params, peak_tolerance, ema_cache):
+    """
+    Build all bars at once and take the entries of ``run_backtest``'s vectorized
+    signals. Peaks and dips are detected over the whole bar series, so entries
+    can depend on later bars; use it to measure costs fast, not to validate signals.
+    """
+    params = strategy_params(params)
+    warmup = warmup_bars(params)
+    bars, reveal = build_bars(time_msc, bid, timeframe)
+    if len(bars['close']) < warmup:
+        raise ValueError(f"Not enough ticks to build the {warmup} bars the EMAs need.")
+
+    add_wavy_tunnel_indicators(bars, wavy_tunnel_ema_specs(params), ema_cache)
+    peaks, dips = detect_peaks_and_dips(bars, params['peak_type'])
+    peak_index = build_peak_index(peaks, dips, symbol, peak_tolerance)
+    std_dev = pd.Series(bars['close']).rolling(window=params['std_window']).std().to_numpy()
+
+    trades, entries = generate_trades_vectorized(bars, symbol, peak_index, std_dev, initial_balance, risk_percent,
+                                                 stop_loss_pips, pip_value, max_trades_per_day, warmup,
+                                                 params['sl_std_multiplier'], params['tp_std_multiplier'])
+    order_ticks = np.searchsorted(time_msc, time_msc[reveal[entries]] + latency_ms, side='left')
+    exits = quote_indexes(bid, ask)
+
+    filled = []
+    for trade, bar, tick in zip(trades, entries, order_ticks.tolist()):
+        if tick >= len(time_msc):
+            continue
+        trade['signal_price'] = bars['close'][bar]
+        _fill(trade, tick, time_msc, bid, ask, transaction_cost, exits)
+        filled.append(trade)
+    return filled, len(bars['close'])
+
+def run_tick_backtest(symbol, ticks, initial_balance, risk_percent, stop_loss_pips, pip_value,
+                      timeframe=mt5.TIMEFRAME_H1, max_trades_per_day=None, transaction_cost=0, latency_ms=0,
+                      params=None, peak_tolerance=None, ema_cache=None, mode='incremental', num_candles=None):
+    """
+    Backtest on bid/ask ticks instead of bar closes.
+
+    In ``incremental`` mode (the default) every closed bar goes through the live
+    trading code at the tick that reveals it: ``SymbolTrader``'s bar buffer,
+    streaming indicators and ``entry_request``, which also size the position
+    and place SL/TP as the live bot does (``stop_loss_pips`` is not used).
+    ``vectorized`` mode uses ``run_backtest``'s signals over all bars at once
+    (see ``replay_vectorized``); it is faster but its peaks can look ahead.
+
+    An order for a signal is sent on the tick that revealed the bar close (plus
+    ``latency_ms``) and filled at that tick's ask (buy) or bid (sell); SL/TP
+    move with the bid between signal and fill. Positions close on the first
+    tick whose bid (buy) or ask (sell) reaches the SL or TP, at that tick's price.
+
+    Each trade records ``slippage`` (fill versus the signal price, positive
+    when adverse) and the ``spread`` paid at entry.
+    """
+    if initial_balance <= 0:
+        raise ValueError("Initial balance must be greater than zero.")
+    if risk_percent == 0:
+        raise ValueError("Risk percentage cannot be zero.")
+    if mode not in TICK_REPLAY_MODES:
+        raise ValueError(f"Invalid mode: {mode}. Expected one of {TICK_REPLAY_MODES}.")
+
+    time_msc, bid, ask = tick_columns(ticks)
+    if mode == 'incremental':
+        filled, num_bars = replay_incremental(symbol, time_msc, bid, ask, initial_balance, risk_percent, pip_value,
+                                              timeframe, max_trades_per_day, transaction_cost, latency_ms, params,
+                                              peak_tolerance, num_candles)
+    else:
+        filled, num_bars = replay_vectorized(symbol, time_msc, bid, ask, initial_balance, risk_percent,
+                                             stop_loss_pips, pip_value, timeframe, max_trades_per_day,
+                                             transaction_cost, latency_ms, params, peak_tolerance, ema_cache)
+    logger.info("Replayed %s ticks into %s bars for %s (%s)", len(time_msc), num_bars, symbol, mode)
+
+    result = summarize_backtest(filled, initial_balance, 0, transaction_cost)
+    result['num_ticks'] = len(time_msc)
+    result['num_bars'] = num_bars
+    result['total_entry_slippage'] = sum(trade['slippage'] for trade in filled)
+    result['average_entry_spread'] = float(np.mean([trade['spread'] for trade in filled])) if filled else 0.0
+    return result
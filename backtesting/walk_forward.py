@@ -0,0 +1,136 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from backtesting.backtest import run_backtest, summarize_backtest
+from backtesting.optimizer import (
+    precompute_emas, share_history_with_emas, attach_history_with_emas, score_parameters, RESULT_METRICS
+)
+from strategy.tunnel_strategy import strategy_params, warmup_bars, level_tolerance
+
+logger = logging.getLogger(__name__)
+
+# State of a walk-forward worker process, filled once by _init_worker
+_worker = {}
+
+def walk_forward_windows(n_bars, in_sample, out_of_sample, step=None, warmup=0):
+    """
+    Rolling ``(is_start, is_end, oos_start, oos_end)`` row ranges over ``n_bars`` bars.
+
+    Each in-sample segment of ``in_sample`` bars is followed by ``out_of_sample``
+    bars; windows advance by ``step`` (default ``out_of_sample``). The first
+    in-sample segment starts after ``warmup`` bars so every indicator is defined.
+    """
+    step = step or out_of_sample
+    windows = []
+    is_start = warmup
+    while is_start + in_sample + out_of_sample <= n_bars:
+        oos_start = is_start + in_sample
+        windows.append((is_start, oos_start, oos_start, oos_start + out_of_sample))
+        is_start += step
+    return windows
+
+def segment_backtest_args(data, ema_cache, start, end, lookback):
+    """
+    Slice ``data`` and ``ema_cache`` for a backtest that trades rows ``start:end`` only.
+
+    ``lookback`` earlier rows are kept for the peak and volatility windows; the
+    EMAs are views into the full-history arrays, so nothing is recomputed from
+    the start of the segment.
+    """
+    lo = max(start - lookback, 0)
+    segment = data.iloc[lo:end].reset_index(drop=True)
+    cache = {key: values[lo:end] for key, values in ema_cache.items()}
+    return segment, cache, start - lo
+
+def _init_worker(symbol, descriptor, peak_tolerance, combinations, lookback, metric, ascending, backtest_kwargs):
+    data, cache = attach_history_with_emas(descriptor)
+    _worker.update(symbol=symbol, data=data, cache=cache, peak_tolerance=peak_tolerance, combinations=combinations,
+                   lookback=lookback, metric=metric, ascending=ascending, backtest_kwargs=backtest_kwargs)
+
+def evaluate_window(window):
+    """
+    Optimize on the in-sample segment of ``window`` and backtest the best parameters on its out-of-sample segment.
+    """
+    is_start, is_end, oos_start, oos_end = window
+    data, cache, lookback = _worker['data'], _worker['cache'], _worker['lookback']
+    backtest_kwargs = dict(_worker['backtest_kwargs'], peak_tolerance=_worker['peak_tolerance'])
+
+    segment, segment_cache, trade_start = segment_backtest_args(data, cache, is_start, is_end, lookback)
+    rows = [
+        row for row in (
+            score_parameters(_worker['symbol'], segment, params, segment_cache, trade_start=trade_start, **backtest_kwargs)
+            for params in _worker['combinations']
+        ) if row is not None
+    ]
+    if not rows:
+        logger.warning(f"No in-sample results for window starting at row {is_start}")
+        return None
+    ranked = pd.DataFrame(rows).sort_values(_worker['metric'], ascending=_worker['ascending'], kind='mergesort')
+    best_params = {name: ranked[name].iloc[0] for name in _worker['combinations'][0]}
+
+    segment, segment_cache, trade_start = segment_backtest_args(data, cache, oos_start, oos_end, lookback)
+    result = run_backtest(symbol=_worker['symbol'], data=segment, params=best_params, ema_cache=segment_cache,
+                          trade_start=trade_start, **backtest_kwargs)
+    return {
+        'window': window,
+        'params': best_params,
+        'in_sample_metric': ranked[_worker['metric']].iloc[0],
+        'result': result
+    }
+
+def run_walk_forward(symbol, data, combinations, in_sample, out_of_sample, step=None, metric='total_profit',
+                     ascending=False, max_workers=None, **backtest_kwargs):
+    """
+    Walk-forward analysis of ``symbol`` over ``data``.
+
+    The history is split into rolling in-sample/out-of-sample windows. On each
+    in-sample segment every parameter combination is backtested and the best one
+    by ``metric`` is then backtested on the following out-of-sample segment.
+    EMAs are computed once over the full history and sliced per window; windows
+    run in parallel. Returns the per-window table and the combined out-of-sample summary.
+    """
+    combinations = [strategy_params(params) for params in combinations]
+    backtest_kwargs.setdefault('mode', 'vectorized')
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame({column: np.asarray(data[column]) for column in data})
+    lookback = max(warmup_bars(params) for params in combinations)
+    windows = walk_forward_windows(len(data), in_sample, out_of_sample, step, warmup=lookback)
+    if not windows:
+        raise ValueError(f"Not enough data for walk-forward analysis: {len(data)} rows, need at least {lookback + in_sample + out_of_sample}.")
+
+    data = data.reset_index(drop=True)
+    shm, descriptor = share_history_with_emas(data, precompute_emas(data, combinations))
+    max_workers = max_workers or min(os.cpu_count() or 1, len(windows))
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(symbol, descriptor, level_tolerance(symbol), combinations, lookback,
+                                           metric, ascending, backtest_kwargs)) as executor:
+            outcomes = [outcome for outcome in executor.map(evaluate_window, windows) if outcome is not None]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    times = data['time']
+    rows = []
+    trades = []
+    for outcome in outcomes:
+        is_start, is_end, oos_start, oos_end = outcome['window']
+        result = outcome['result'] or {metric_name: 0 for metric_name in RESULT_METRICS}
+        trades.extend(result.get('trades', []))
+        rows.append({
+            'in_sample_start': times.iloc[is_start],
+            'in_sample_end': times.iloc[is_end - 1],
+            'out_of_sample_start': times.iloc[oos_start],
+            'out_of_sample_end': times.iloc[oos_end - 1],
+            **outcome['params'],
+            f"in_sample_{metric}": outcome['in_sample_metric'],
+            **{f"out_of_sample_{name}": result[name] for name in RESULT_METRICS}
+        })
+
+    summary = summarize_backtest(trades, backtest_kwargs['initial_balance'], backtest_kwargs.get('slippage', 0),
+                                 backtest_kwargs.get('transaction_cost', 0))
+    summary['windows'] = pd.DataFrame(rows)
+    logger.info(f"Walk-forward analysis for {symbol}: {len(outcomes)} of {len(windows)} windows evaluated with {max_workers} workers.")
+    return summary
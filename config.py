@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from utils.error_handling import handle_error, critical_error
+from utils.logger import parse_log_levels
 import logging
 import MetaTrader5 as mt5
 from datetime import datetime
@@ -46,6 +47,15 @@ class Config:
     if MT5_TIMEFRAME not in TIMEFRAME_DICT:
         raise ValueError(f"Invalid MT5_TIMEFRAME value: {MT5_TIMEFRAME}. Expected values: M1, M5, M15, M30, H1, H4, D1.")
     MT5_TIMEFRAME_VALUE = TIMEFRAME_DICT[MT5_TIMEFRAME]
+    TIMEFRAME_SECONDS = {
+        mt5.TIMEFRAME_M1: 60,
+        mt5.TIMEFRAME_M5: 300,
+        mt5.TIMEFRAME_M15: 900,
+        mt5.TIMEFRAME_M30: 1800,
+        mt5.TIMEFRAME_H1: 3600,
+        mt5.TIMEFRAME_H4: 14400,
+        mt5.TIMEFRAME_D1: 86400
+    }
 
     SYMBOLS = os.getenv("SYMBOLS")
     if SYMBOLS:
@@ -55,7 +65,45 @@ class Config:
 
     # Data Retrieval Settings
     DATA_SOURCE = os.getenv("DATA_SOURCE", "MT5")
+    # CSV/Parquet files named <symbol>_<timeframe>.<ext> for DATA_SOURCE=CSV, read DATA_CHUNK_ROWS rows at a time
+    DATA_DIR = os.getenv("DATA_DIR", os.path.join(script_dir, "data"))
+    DATA_CHUNK_ROWS = int(os.getenv("DATA_CHUNK_ROWS", 500000))
+    # HTTP bar service for DATA_SOURCE=API
+    DATA_API_URL = os.getenv("DATA_API_URL", "http://127.0.0.1:8000")
+    DATA_API_TIMEOUT = float(os.getenv("DATA_API_TIMEOUT", 30))
+    # Timezone-aware vendor times are converted to this zone and made naive, like MT5 bar times
+    DATA_TIMEZONE = os.getenv("DATA_TIMEZONE", "UTC")
     HISTORICAL_DATA_CANDLES = int(os.getenv("HISTORICAL_DATA_CANDLES", 200))
+    # Closed MT5 bars are kept on disk here and only the missing tail is fetched
+    BAR_STORE_ENABLED = os.getenv("BAR_STORE_ENABLED", "True").lower() in ("true", "1", "yes")
+    BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", os.path.join(script_dir, "bar_store"))
+
+    # How often live trading checks the open positions, in seconds
+    LIVE_POLL_SECONDS = int(os.getenv("LIVE_POLL_SECONDS", 10))
+    # Wait after a bar's scheduled close before reading it, and between checks until its first tick arrives
+    BAR_CLOSE_GRACE_SECONDS = float(os.getenv("BAR_CLOSE_GRACE_SECONDS", 1.0))
+    # Symbol settings (point, stops level, filling modes...) are re-read from the terminal after this many seconds
+    SYMBOL_CACHE_TTL_SECONDS = float(os.getenv("SYMBOL_CACHE_TTL_SECONDS", 3600))
+    # Terminal connection checks during live trading, and reconnects with exponential backoff when it drops
+    MT5_HEARTBEAT_SECONDS = float(os.getenv("MT5_HEARTBEAT_SECONDS", 30))
+    MT5_RECONNECT_ATTEMPTS = int(os.getenv("MT5_RECONNECT_ATTEMPTS", 5))
+    MT5_RECONNECT_BACKOFF_SECONDS = float(os.getenv("MT5_RECONNECT_BACKOFF_SECONDS", 1))
+    MT5_RECONNECT_MAX_BACKOFF_SECONDS = float(os.getenv("MT5_RECONNECT_MAX_BACKOFF_SECONDS", 60))
+    # Requoted live orders are resent at once while younger than the budget; orders the terminal
+    # did not answer are retried with exponential backoff
+    ORDER_LATENCY_BUDGET_SECONDS = float(os.getenv("ORDER_LATENCY_BUDGET_SECONDS", 2.0))
+    ORDER_TRANSPORT_RETRIES = int(os.getenv("ORDER_TRANSPORT_RETRIES", 4))
+    ORDER_RETRY_BACKOFF_SECONDS = float(os.getenv("ORDER_RETRY_BACKOFF_SECONDS", 0.5))
+    ORDER_MAX_RESENDS = int(os.getenv("ORDER_MAX_RESENDS", 5))
+
+    # Trade journal: signals, orders, fills, closes and equity snapshots, fsynced every JOURNAL_FSYNC_SECONDS
+    JOURNAL_ENABLED = os.getenv("JOURNAL_ENABLED", "True").lower() in ("true", "1", "yes")
+    JOURNAL_DIR = os.getenv("JOURNAL_DIR", os.path.join(script_dir, "journal"))
+    JOURNAL_FSYNC_SECONDS = float(os.getenv("JOURNAL_FSYNC_SECONDS", 5.0))
+
+    # Logging Settings; LOG_LEVELS sets single modules, e.g. "strategy.tunnel_strategy=WARNING,metatrader=DEBUG"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")
 
     # Telegram Bot Settings
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -111,11 +159,20 @@ class Config:
 
     # New Strategy Parameters
     PEAK_DETECTION_WINDOW = int(os.getenv("PEAK_DETECTION_WINDOW", 21))
+    # Distance from a peak/dip, in symbol points, that counts as "near" it (100 points = 0.001 on EURUSD)
+    PEAK_TOLERANCE_POINTS = int(os.getenv("PEAK_TOLERANCE_POINTS", 100))
 
     # Backtesting Settings
     BACKTEST_SLIPPAGE = float(os.getenv("BACKTEST_SLIPPAGE", 0.0))
     BACKTEST_TRANSACTION_COST = float(os.getenv("BACKTEST_TRANSACTION_COST", 0.0))
 
+    # Which level wins when a backtest bar touches both the stop loss and the take profit
+    BACKTEST_TIE_BREAK = os.getenv("BACKTEST_TIE_BREAK", "stop_first")
+
+    # Walk-forward analysis window sizes, in bars
+    WALK_FORWARD_IN_SAMPLE_BARS = int(os.getenv("WALK_FORWARD_IN_SAMPLE_BARS", 2000))
+    WALK_FORWARD_OUT_OF_SAMPLE_BARS = int(os.getenv("WALK_FORWARD_OUT_OF_SAMPLE_BARS", 500))
+
     # Optional Backtest Start/End Dates for Backtesting
     BACKTEST_START_DATE = os.getenv("BACKTEST_START_DATE")
     BACKTEST_END_DATE = os.getenv("BACKTEST_END_DATE")
@@ -133,13 +190,13 @@ class Config:
                     raise ValueError(f"Missing required environment variable: {var}")
 
             # Ensure all numeric variables have valid numeric values
-            numeric_vars = ['MIN_TP_PROFIT', 'MAX_LOSS_PER_DAY', 'STARTING_EQUITY', 'RISK_PER_TRADE', 'PIP_VALUE', 'MAX_DRAWDOWN', 'SL_TP_ADJUSTMENT_PIPS', 'BACKTEST_SLIPPAGE', 'BACKTEST_TRANSACTION_COST']
+            numeric_vars = ['MIN_TP_PROFIT', 'MAX_LOSS_PER_DAY', 'STARTING_EQUITY', 'RISK_PER_TRADE', 'PIP_VALUE', 'MAX_DRAWDOWN', 'SL_TP_ADJUSTMENT_PIPS', 'BACKTEST_SLIPPAGE', 'BACKTEST_TRANSACTION_COST', 'BAR_CLOSE_GRACE_SECONDS', 'SYMBOL_CACHE_TTL_SECONDS', 'MT5_HEARTBEAT_SECONDS', 'MT5_RECONNECT_BACKOFF_SECONDS', 'MT5_RECONNECT_MAX_BACKOFF_SECONDS', 'ORDER_LATENCY_BUDGET_SECONDS', 'ORDER_RETRY_BACKOFF_SECONDS', 'JOURNAL_FSYNC_SECONDS']
             for var in numeric_vars:
                 if not isinstance(getattr(cls, var, None), (int, float)):
                     raise ValueError(f"Invalid value for {var}. Expected a numeric value.")
 
             # Validate integer-specific configuration
-            integer_vars = ['LIMIT_NO_OF_TRADES', 'HISTORICAL_DATA_CANDLES', 'PEAK_DETECTION_WINDOW']
+            integer_vars = ['LIMIT_NO_OF_TRADES', 'HISTORICAL_DATA_CANDLES', 'PEAK_DETECTION_WINDOW', 'PEAK_TOLERANCE_POINTS', 'WALK_FORWARD_IN_SAMPLE_BARS', 'WALK_FORWARD_OUT_OF_SAMPLE_BARS', 'DATA_CHUNK_ROWS', 'LIVE_POLL_SECONDS', 'MT5_RECONNECT_ATTEMPTS', 'ORDER_TRANSPORT_RETRIES', 'ORDER_MAX_RESENDS']
             for var in integer_vars:
                 if not isinstance(getattr(cls, var), int) or getattr(cls, var) <= 0:
                     raise ValueError(f"Invalid value for {var}. Expected a positive integer.")
@@ -158,6 +215,14 @@ class Config:
             elif cls.BACKTEST_START_DATE or cls.BACKTEST_END_DATE:
                 raise ValueError("Both BACKTEST_START_DATE and BACKTEST_END_DATE must be set for backtesting.")
 
+            if cls.BACKTEST_TIE_BREAK not in ["stop_first", "target_first", "nearest_to_open"]:
+                raise ValueError(f"Invalid BACKTEST_TIE_BREAK value: {cls.BACKTEST_TIE_BREAK}. Expected 'stop_first', 'target_first', or 'nearest_to_open'.")
+
+            # Validate logging levels
+            if not isinstance(logging.getLevelName(cls.LOG_LEVEL), int):
+                raise ValueError(f"Invalid LOG_LEVEL value: {cls.LOG_LEVEL}. Expected DEBUG, INFO, WARNING, ERROR or CRITICAL.")
+            parse_log_levels(cls.LOG_LEVELS)
+
             # Validate data source
             if cls.DATA_SOURCE not in ["MT5", "CSV", "API"]:
                 raise ValueError(f"Invalid DATA_SOURCE value: {cls.DATA_SOURCE}. Expected 'MT5', 'CSV', or 'API'.")
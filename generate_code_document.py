@@ -34,8 +34,8 @@ if __name__ == "__main__":
     root_directory = r"C:\Users\Owner\Desktop\upwork_projects\Wavy_Tunnel_Bot"
 
     # Lists of folders and files to exclude
-    excluded_folders = ['ignore_extra_stuff', 'jupyter_notebooks', '__pycache__']
-    excluded_files = ['tempCodeRunnerFile.py', 'app.log','*.git','.gitignore','code_document.xml','generate_code_document.py','historical_data_cache.sqlite']
+    excluded_folders = ['ignore_extra_stuff', 'jupyter_notebooks', '__pycache__', 'bar_store']
+    excluded_files = ['tempCodeRunnerFile.py', 'app.log','*.git','.gitignore','code_document.xml','generate_code_document.py']
 
     # Generate the code document
     code_document = generate_code_document(root_directory, excluded_folders, excluded_files)
@@ -1,21 +1,21 @@
 import MetaTrader5 as mt5
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from config import Config
-from metatrader.connection import initialize_mt5, shutdown_mt5
-from strategy.tunnel_strategy import (
-    check_broker_connection, check_market_open, execute_trade, place_pending_order,
-    calculate_ema, detect_peaks_and_dips, check_entry_conditions, calculate_position_size,
-    manage_position, close_position
-)
-from metatrader.data_retrieval import get_data
-from backtesting.backtest import run_backtest
+from metatrader.session import get_session
+from metatrader.symbol_cache import symbol_cache
+from strategy.tunnel_strategy import check_broker_connection, check_market_open
+from strategy.live_loop import LiveLoop
+from backtesting.parallel import load_histories, run_parallel_backtests, portfolio_report
+from backtesting.optimizer import run_optimization, parameter_grid, DEFAULT_PARAM_GRID
+from backtesting.walk_forward import run_walk_forward
 from utils.logger import setup_logging
+from utils.journal import TradeJournal
 from utils.error_handling import handle_error
 from utils.mt5_log_checker import start_log_checking, stop_log_checking
 from ui import run_ui
 import logging
 import argparse
+import asyncio
 import os
 import time
 
@@ -23,12 +23,19 @@ def clear_log_file():
     with open("app.log", "w"):
         pass
 
+def open_journal():
+    """The trade journal at ``Config.JOURNAL_DIR``, or None when journaling is disabled."""
+    if not Config.JOURNAL_ENABLED:
+        return None
+    return TradeJournal(Config.JOURNAL_DIR, fsync_seconds=Config.JOURNAL_FSYNC_SECONDS)
+
 def check_auto_trading_enabled():
     """Check if global auto trading is enabled and log the status."""
-    if not mt5.initialize():
-        logging.error("Failed to initialize MetaTrader5 for checking auto trading status.")
+    terminal_info = get_session().call(mt5.terminal_info)
+    if terminal_info is None:
+        logging.error("Failed to read the MetaTrader5 terminal info for checking auto trading status.")
         return False
-    global_autotrading_enabled = mt5.terminal_info().trade_allowed
+    global_autotrading_enabled = terminal_info.trade_allowed
     if not global_autotrading_enabled:
         logging.error("Global auto trading is disabled. Please enable it manually in the MetaTrader 5 terminal.")
     else:
@@ -36,24 +43,20 @@ def check_auto_trading_enabled():
     return global_autotrading_enabled
 
 def validate_mt5_and_symbol(symbol):
-    if not mt5.initialize():
-        logging.error("Failed to initialize MT5 connection.")
-        return False
-    if not mt5.symbol_select(symbol, True):
-        logging.error(f"Failed to select symbol {symbol}")
-        return False
-    return True
+    # The terminal is already initialized; only make sure the symbol is selected
+    return get_session().call(symbol_cache.select, symbol)
 
 def log_mt5_version():
-    if mt5.initialize():
-        version = mt5.version()
+    session = get_session()
+    if session.connect():
+        version = session.call(mt5.version)
         logging.info(f"MetaTrader5 version: {version}")
     else:
         logging.error("Failed to initialize MT5 for version check.")
 
 def get_account_info_with_retry(max_attempts=3, delay=2):
     for attempt in range(max_attempts):
-        account_info = mt5.account_info()
+        account_info = get_session().call(mt5.account_info)
         if account_info is not None:
             return account_info
         logging.warning(f"Failed to get account info. Attempt {attempt + 1} of {max_attempts}.")
@@ -63,85 +66,143 @@ def get_account_info_with_retry(max_attempts=3, delay=2):
 def wait_for_mt5_terminal_load(max_wait_time=30):
     start_time = time.time()
     while time.time() - start_time < max_wait_time:
-        if mt5.terminal_info() is not None:
+        if get_session().call(mt5.terminal_info) is not None:
             return True
         time.sleep(1)
     return False
 
 def run_backtest_func():
     try:
-        logging.info("Initializing MetaTrader5...")
-        if not initialize_mt5(Config.MT5_PATH):
-            raise Exception("Failed to initialize MetaTrader5")
-        logging.info("MetaTrader5 initialized successfully.")
+        # File and HTTP data sources need no terminal
+        if Config.DATA_SOURCE == 'MT5':
+            logging.info("Initializing MetaTrader5...")
+            if not get_session().connect():
+                raise Exception("Failed to initialize MetaTrader5")
+            logging.info("MetaTrader5 initialized successfully.")
+
+            if not check_auto_trading_enabled():
+                return
 
-        if not check_auto_trading_enabled():
+        start_date = datetime.strptime(Config.BACKTEST_START_DATE, "%Y-%m-%d") if Config.BACKTEST_START_DATE else datetime(2023, 1, 1)
+        end_date = datetime.strptime(Config.BACKTEST_END_DATE, "%Y-%m-%d") if Config.BACKTEST_END_DATE else datetime.now()
+        initial_balance = 10000
+
+        # Fetch every symbol's history once here, then run the backtests in parallel worker processes
+        histories = load_histories(Config.SYMBOLS, start_date, end_date, Config.MT5_TIMEFRAME_VALUE)
+        if not histories:
+            logging.error(f"No historical data retrieved for backtesting. Timeframe: {Config.MT5_TIMEFRAME}, Start: {start_date}, End: {end_date}")
             return
 
-        for symbol in Config.SYMBOLS:
-            if not validate_mt5_and_symbol(symbol):
-                continue
+        logging.info(f"Running backtests for {', '.join(histories)}...")
+        results = run_parallel_backtests(
+            histories,
+            initial_balance=initial_balance,
+            risk_percent=Config.RISK_PER_TRADE,
+            min_take_profit=Config.MIN_TP_PROFIT,
+            max_loss_per_day=Config.MAX_LOSS_PER_DAY,
+            starting_equity=Config.STARTING_EQUITY,
+            stop_loss_pips=20,
+            pip_value=Config.PIP_VALUE,
+            max_trades_per_day=Config.LIMIT_NO_OF_TRADES
+        )
+        journal = open_journal()
+        for symbol, result in results.items():
+            logging.info(f"Backtest results for {symbol}: {result}")
+            if journal is not None and result:
+                journal.record_trades(result['trades'], initial_balance)
+        if journal is not None:
+            journal.close()
+
+        report = portfolio_report(results, initial_balance)
+        logging.info(f"Portfolio backtest completed. Final Balance: {report['final_balance']}, Max Drawdown: {report['max_drawdown']}")
 
-            logging.info(f"Running backtest for {symbol}...")
-            start_date = datetime.strptime(Config.BACKTEST_START_DATE, "%Y-%m-%d") if Config.BACKTEST_START_DATE else datetime(2023, 1, 1)
-            end_date = datetime.strptime(Config.BACKTEST_END_DATE, "%Y-%m-%d") if Config.BACKTEST_END_DATE else datetime.now()
-            initial_balance = 10000
-            risk_percent = Config.RISK_PER_TRADE
-            stop_loss_pips = 20
-            pip_value = Config.PIP_VALUE
-
-            backtest_data = get_data(symbol, mode='backtest', start_date=start_date, end_date=end_date, timeframe=Config.MT5_TIMEFRAME_VALUE)
-            if backtest_data is not None and not backtest_data.empty:
-                logging.info(f"Backtest data retrieved for {symbol}. Shape: {backtest_data.shape}")
-                logging.info(f"Date range: from {backtest_data['time'].min()} to {backtest_data['time'].max()}")
-                logging.info(f"Backtest data head:\n{backtest_data.head()}")
-            else:
-                logging.error(f"No historical data retrieved for {symbol} for backtesting. Timeframe: {Config.MT5_TIMEFRAME}, Start: {start_date}, End: {end_date}")
-                continue
+    except Exception as e:
+        error_code = get_session().call(mt5.last_error)
+        error_message = str(e)
+        handle_error(e, f"An error occurred in the run_backtest_func: {error_code} - {error_message}")
 
-            if len(backtest_data) < 20:
-                logging.error(f"Not enough data for symbol {symbol} to perform backtest")
-                continue
+    finally:
+        logging.info("Shutting down MetaTrader5...")
+        get_session().shutdown()
+        logging.info("MetaTrader5 connection gracefully shut down.")
+
+def run_optimization_func():
+    try:
+        if Config.DATA_SOURCE == 'MT5':
+            logging.info("Initializing MetaTrader5...")
+            if not get_session().connect():
+                raise Exception("Failed to initialize MetaTrader5")
+
+        start_date = datetime.strptime(Config.BACKTEST_START_DATE, "%Y-%m-%d") if Config.BACKTEST_START_DATE else datetime(2023, 1, 1)
+        end_date = datetime.strptime(Config.BACKTEST_END_DATE, "%Y-%m-%d") if Config.BACKTEST_END_DATE else datetime.now()
+        histories = load_histories(Config.SYMBOLS, start_date, end_date, Config.MT5_TIMEFRAME_VALUE)
+        combinations = parameter_grid(DEFAULT_PARAM_GRID)
+
+        for symbol, data in histories.items():
+            logging.info(f"Optimizing strategy parameters for {symbol} over {len(combinations)} combinations...")
+            results = run_optimization(
+                symbol, data, combinations,
+                output_path=f"optimization_{symbol}.csv",
+                initial_balance=10000,
+                risk_percent=Config.RISK_PER_TRADE,
+                min_take_profit=Config.MIN_TP_PROFIT,
+                max_loss_per_day=Config.MAX_LOSS_PER_DAY,
+                starting_equity=Config.STARTING_EQUITY,
+                stop_loss_pips=20,
+                pip_value=Config.PIP_VALUE,
+                max_trades_per_day=Config.LIMIT_NO_OF_TRADES
+            )
+            logging.info(f"Top parameter combinations for {symbol}:\n{results.head(10)}")
 
-            backtest_data.loc[:, 'close'] = pd.to_numeric(backtest_data['close'], errors='coerce')
+    except Exception as e:
+        error_code = get_session().call(mt5.last_error)
+        error_message = str(e)
+        handle_error(e, f"An error occurred in the run_optimization_func: {error_code} - {error_message}")
 
+def run_walk_forward_func():
+    try:
+        if Config.DATA_SOURCE == 'MT5':
+            logging.info("Initializing MetaTrader5...")
+            if not get_session().connect():
+                raise Exception("Failed to initialize MetaTrader5")
+
+        start_date = datetime.strptime(Config.BACKTEST_START_DATE, "%Y-%m-%d") if Config.BACKTEST_START_DATE else datetime(2023, 1, 1)
+        end_date = datetime.strptime(Config.BACKTEST_END_DATE, "%Y-%m-%d") if Config.BACKTEST_END_DATE else datetime.now()
+        histories = load_histories(Config.SYMBOLS, start_date, end_date, Config.MT5_TIMEFRAME_VALUE)
+        combinations = parameter_grid(DEFAULT_PARAM_GRID)
+
+        for symbol, data in histories.items():
+            logging.info(f"Running walk-forward analysis for {symbol}...")
             try:
-                result = run_backtest(
-                    symbol=symbol,
-                    initial_balance=initial_balance,
-                    risk_percent=risk_percent,
+                summary = run_walk_forward(
+                    symbol, data, combinations,
+                    in_sample=Config.WALK_FORWARD_IN_SAMPLE_BARS,
+                    out_of_sample=Config.WALK_FORWARD_OUT_OF_SAMPLE_BARS,
+                    initial_balance=10000,
+                    risk_percent=Config.RISK_PER_TRADE,
                     min_take_profit=Config.MIN_TP_PROFIT,
                     max_loss_per_day=Config.MAX_LOSS_PER_DAY,
                     starting_equity=Config.STARTING_EQUITY,
-                    stop_loss_pips=stop_loss_pips,
-                    pip_value=pip_value,
-                    max_trades_per_day=Config.LIMIT_NO_OF_TRADES,
-                    data=backtest_data,
-                    start_date=start_date,
-                    end_date=end_date
+                    stop_loss_pips=20,
+                    pip_value=Config.PIP_VALUE,
+                    max_trades_per_day=Config.LIMIT_NO_OF_TRADES
                 )
-                if result:
-                    logging.info(f"Backtest results for {symbol}: {result}")
-                else:
-                    logging.warning(f"Backtest for {symbol} did not produce results.")
-                logging.info(f"Backtest completed successfully for {symbol}.")
-            except Exception as e:
-                handle_error(e, f"An error occurred during backtesting for {symbol}")
+            except ValueError as e:
+                handle_error(e, f"Walk-forward analysis skipped for {symbol}")
+                continue
+            logging.info(f"Walk-forward windows for {symbol}:\n{summary['windows']}")
+            logging.info(f"Out-of-sample Total Profit for {symbol}: {summary['total_profit']}, Max Drawdown: {summary['max_drawdown']}")
 
     except Exception as e:
-        error_code = mt5.last_error()
+        error_code = get_session().call(mt5.last_error)
         error_message = str(e)
-        handle_error(e, f"An error occurred in the run_backtest_func: {error_code} - {error_message}")
-
-    finally:
-        logging.info("Shutting down MetaTrader5...")
-        shutdown_mt5()
-        logging.info("MetaTrader5 connection gracefully shut down.")
+        handle_error(e, f"An error occurred in the run_walk_forward_func: {error_code} - {error_message}")
 
 def run_live_trading_func():
+    journal = None
     try:
         logging.info("Initializing MetaTrader5...")
-        if not initialize_mt5(Config.MT5_PATH):
+        if not get_session().connect():
             raise Exception("Failed to initialize MetaTrader5")
         logging.info("MetaTrader5 initialized successfully.")
 
@@ -153,8 +214,8 @@ def run_live_trading_func():
 
         account_info = get_account_info_with_retry()
         if account_info is None:
-            error_code = mt5.last_error()
-            error_desc = mt5.last_error_description()
+            error_code = get_session().call(mt5.last_error)
+            error_desc = get_session().call(mt5.last_error_description)
             raise Exception(f"Failed to get account info. Error code: {error_code}, Description: {error_desc}")
 
         if account_info.server.endswith("demo"):
@@ -164,162 +225,37 @@ def run_live_trading_func():
 
         starting_balance = account_info.balance
         current_balance = starting_balance
+        total_trades = 0
         logging.info(f"Starting balance: {starting_balance:.2f}")
 
-        if not check_broker_connection():
+        if not get_session().call(check_broker_connection):
             return
 
         if not check_market_open():
             return
 
-        daily_trades = 0
-        total_trades = 0
-        total_profit = 0.0
-        total_loss = 0.0
-        max_drawdown_reached = False
-
-        start_time = time.time()
-        max_duration = 24 * 3600  # 24 hours
-        last_log_time = time.time()
-
-        # Initialize historical data for each symbol
-        historical_data = {}
-        for symbol in Config.SYMBOLS:
-            data = get_data(symbol, mode='live', timeframe=Config.MT5_TIMEFRAME_VALUE, num_candles=Config.HISTORICAL_DATA_CANDLES)
-            if data is not None and not data.empty:
-                historical_data[symbol] = data
-                logging.info(f"Initialized historical data for {symbol}: {len(data)} candles")
-            else:
-                logging.error(f"Failed to initialize historical data for {symbol}")
-                return
-
-        while time.time() - start_time < max_duration:
-            if max_drawdown_reached:
-                logging.info("Maximum drawdown reached. Stopping trading.")
-                break
-
-            if time.time() - last_log_time > 300:  # Log every 5 minutes
-                logging.info("Strategy still running...")
-                last_log_time = time.time()
-
-            current_day = datetime.now().date()
-            if daily_trades >= Config.LIMIT_NO_OF_TRADES:
-                logging.info("Maximum number of trades for the day reached. Stopping trading for today.")
-                time.sleep(86400 - (datetime.now() - datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)).seconds)
-                daily_trades = 0
-                continue
-
-            for symbol in Config.SYMBOLS:
-                if not validate_mt5_and_symbol(symbol):
-                    continue
-
-                logging.info(f"Processing symbol: {symbol}")
-
-                # Fetch new data and update historical data
-                new_data = get_data(symbol, mode='live', timeframe=Config.MT5_TIMEFRAME_VALUE, num_candles=1)
-                if new_data is not None and not new_data.empty:
-                    historical_data[symbol] = pd.concat([historical_data[symbol], new_data]).drop_duplicates(subset='time').tail(Config.HISTORICAL_DATA_CANDLES)
-                    logging.info(f"Updated historical data for {symbol}: {len(historical_data[symbol])} candles")
-                else:
-                    logging.warning(f"Failed to fetch new data for {symbol}, skipping this iteration")
-                    continue
-
-                df = historical_data[symbol]
-
-                logging.info(f"Calculating indicators for {symbol}")
-                df['wavy_h'] = calculate_ema(df['high'], 34)
-                df['wavy_c'] = calculate_ema(df['close'], 34)
-                df['wavy_l'] = calculate_ema(df['low'], 34)
-                df['tunnel1'] = calculate_ema(df['close'], 144)
-                df['tunnel2'] = calculate_ema(df['close'], 169)
-                df['long_term_ema'] = calculate_ema(df['close'], 200)
-
-                logging.info(f"Indicator values for {symbol}:")
-                for indicator in ['wavy_h', 'wavy_c', 'wavy_l', 'tunnel1', 'tunnel2', 'long_term_ema']:
-                    logging.info(f"{indicator}: {df[indicator].iloc[-1]:.5f}")
-
-                peaks, dips = detect_peaks_and_dips(df, 21)
-                logging.info(f"Number of peaks detected: {len(peaks)}")
-                logging.info(f"Number of dips detected: {len(dips)}")
-
-                buy_condition, sell_condition = check_entry_conditions(df.iloc[-1], peaks, dips, symbol)
-                logging.info(f"Entry conditions for {symbol}: Buy = {buy_condition}, Sell = {sell_condition}")
-
-                if buy_condition or sell_condition:
-                    account_info = get_account_info_with_retry()
-                    if account_info is None:
-                        raise Exception("Failed to get account info")
-
-                    balance_before = account_info.balance
-                    logging.info(f"Account balance before trade attempt: {balance_before}")
-
-                    current_price = df.iloc[-1]['close']
-                    std_dev = df['close'].rolling(window=20).std().iloc[-1]
-                    sl_distance = max(1.5 * std_dev, 20 * Config.PIP_VALUE)
-                    tp_distance = max(2 * std_dev, 20 * Config.PIP_VALUE)
-
-                    volume = calculate_position_size(
-                        account_balance=balance_before,
-                        risk_per_trade=Config.RISK_PER_TRADE,
-                        stop_loss_pips=sl_distance / Config.PIP_VALUE,
-                        pip_value=Config.PIP_VALUE
-                    )
-
-                    trade_request = {
-                        'action': mt5.TRADE_ACTION_DEAL,
-                        'symbol': symbol,
-                        'volume': volume,
-                        'type': mt5.ORDER_TYPE_BUY if buy_condition else mt5.ORDER_TYPE_SELL,
-                        'price': current_price,
-                        'sl': current_price - sl_distance if buy_condition else current_price + sl_distance,
-                        'tp': current_price + tp_distance if buy_condition else current_price - tp_distance,
-                        'deviation': 10,
-                        'magic': 12345,
-                        'comment': 'Tunnel Strategy',
-                        'type_filling': mt5.ORDER_FILLING_FOK,
-                        'type_time': mt5.ORDER_TIME_GTC
-                    }
-
-                    logging.info(f"Placing order with the following details: {trade_request}")
-
-                    result = execute_trade(trade_request)
-                    logging.info(f"Order send result: {result}")
-
-                    if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
-                        logging.info("Order placed successfully.")
-                        daily_trades += 1
-                        total_trades += 1
-                    else:
-                        logging.error(f"Order failed with retcode: {result.retcode if result else 'Unknown'}")
-
-                    account_info = get_account_info_with_retry()
-                    if account_info is None:
-                        raise Exception("Failed to get account info after trade")
-
-                    balance_after = account_info.balance
-                    logging.info(f"Account balance after trade attempt: {balance_after}")
-                    logging.info(f"Balance change: {balance_after - balance_before}")
-
-                    current_balance = balance_after
-                    drawdown = (starting_balance - current_balance) / starting_balance
-                    if drawdown > Config.MAX_DRAWDOWN:
-                        max_drawdown_reached = True
-                        logging.warning(f"Maximum drawdown of {Config.MAX_DRAWDOWN*100}% reached. Current drawdown: {drawdown*100:.2f}%")
-                else:
-                    logging.info(f"No trade conditions met for {symbol}")
-
-                manage_position(symbol, Config.MIN_TP_PROFIT, Config.MAX_LOSS_PER_DAY, Config.STARTING_EQUITY, Config.LIMIT_NO_OF_TRADES)
-
-                time.sleep(60)  # Wait for 1 minute before processing the next symbol
+        # One asyncio task per symbol; each acts as soon as its bar closes
+        symbols = [symbol for symbol in Config.SYMBOLS if validate_mt5_and_symbol(symbol)]
+        journal = open_journal()
+        live_loop = LiveLoop(symbols, starting_balance, journal=journal)
+        if not live_loop.load():
+            return
+        asyncio.run(live_loop.run())
+        total_trades = live_loop.total_trades
+        current_balance = live_loop.current_balance
+        if live_loop.max_drawdown_reached:
+            logging.info("Maximum drawdown reached. Stopped trading.")
 
     except Exception as e:
-        error_code = mt5.last_error()
+        error_code = get_session().call(mt5.last_error)
         error_message = str(e)
         handle_error(e, f"An error occurred in the run_live_trading_func: {error_code} - {error_message}")
 
     finally:
+        if journal is not None:
+            journal.close()
         logging.info("Shutting down MetaTrader5...")
-        shutdown_mt5()
+        get_session().shutdown()
         logging.info("MetaTrader5 connection gracefully shut down.")
 
         try:
@@ -352,7 +288,7 @@ def main():
     args = parser.parse_args()
 
     try:
-        setup_logging()
+        setup_logging(Config.LOG_LEVEL, module_levels=Config.LOG_LEVELS)
         logging.info("STARTING APPLICATION")
         log_mt5_version()
 
@@ -367,7 +303,9 @@ def main():
             print("Choose an option:")
             print("1. Run Backtesting")
             print("2. Run Live Trading")
-            choice = input("Enter your choice (1 or 2): ")
+            print("3. Run Parameter Optimization")
+            print("4. Run Walk-Forward Analysis")
+            choice = input("Enter your choice (1, 2, 3 or 4): ")
 
             if choice == "1":
                 logging.info("User selected Backtesting")
@@ -375,12 +313,18 @@ def main():
             elif choice == "2":
                 logging.info("User selected Live Trading")
                 run_live_trading_func()
+            elif choice == "3":
+                logging.info("User selected Parameter Optimization")
+                run_optimization_func()
+            elif choice == "4":
+                logging.info("User selected Walk-Forward Analysis")
+                run_walk_forward_func()
             else:
                 logging.warning(f"Invalid choice entered: {choice}")
                 print("Invalid choice. Exiting...")
 
     except Exception as e:
-        error_code = mt5.last_error()
+        error_code = get_session().call(mt5.last_error)
         error_message = str(e)
         handle_error(e, f"An error occurred in the main function: {error_code} - {error_message}. Timeframe: {Config.MT5_TIMEFRAME_VALUE}")
 
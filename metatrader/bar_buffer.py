@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from metatrader.bar_store import BAR_FIELDS
+
+# In memory bar times stay datetime64, like the frames get_data returns
+BUFFER_FIELDS = dict(BAR_FIELDS, time='datetime64[ns]')
+
+class BarBuffer:
+    """
+    The latest ``capacity`` bars of one symbol in fixed, preallocated NumPy columns.
+
+    Appending a bar and replacing the last (forming) bar are O(1) and allocate
+    nothing: every bar is written twice, ``capacity`` slots apart, so the
+    buffered bars are always one contiguous slice of each column and
+    ``buffer['close']`` is a view, oldest bar first. ``frame()`` builds a
+    DataFrame only when asked and reuses it until the next change.
+    """
+
+    def __init__(self, capacity, fields=None):
+        if capacity <= 0:
+            raise ValueError("Bar buffer capacity must be greater than zero.")
+        self.capacity = capacity
+        self._columns = {field: np.zeros(2 * capacity, dtype=dtype) for field, dtype in (fields or BUFFER_FIELDS).items()}
+        self._start = 0
+        self._count = 0
+        self._frame = None
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, field):
+        return field in self._columns
+
+    def __getitem__(self, field):
+        return self._columns[field][self._start:self._start + self._count]
+
+    def keys(self):
+        return self._columns.keys()
+
+    def columns(self, stop=None):
+        """Views of every column, up to (not including) the bar at ``stop``."""
+        return {field: self[field][:stop] for field in self._columns}
+
+    @property
+    def last_time(self):
+        return self['time'][-1] if self._count else None
+
+    def _write(self, slot, bar):
+        for field, column in self._columns.items():
+            column[slot] = column[slot + self.capacity] = bar[field]
+        self._frame = None
+
+    def append(self, bar):
+        """Add a bar after the last one, dropping the oldest bar when the buffer is full."""
+        if self._count == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._count += 1
+        self._write((self._start + self._count - 1) % self.capacity, bar)
+
+    def replace_last(self, bar):
+        if not self._count:
+            raise IndexError("Bar buffer is empty")
+        self._write((self._start + self._count - 1) % self.capacity, bar)
+
+    def push(self, bar):
+        """
+        Add a bar snapshot: a bar with the last bar's time replaces it, a later
+        one is appended and an older one is ignored. Returns True if a bar was appended.
+        """
+        last = self.last_time
+        if last is None or bar['time'] > last:
+            self.append(bar)
+            return True
+        if bar['time'] == last:
+            self.replace_last(bar)
+        return False
+
+    def extend(self, data):
+        """``push`` every row of ``data`` (oldest first); returns the number of bars appended."""
+        values = {field: np.asarray(data[field]).astype(column.dtype, copy=False)
+                  for field, column in self._columns.items()}
+        appended = 0
+        for i in range(len(values['time'])):
+            appended += self.push({field: column[i] for field, column in values.items()})
+        return appended
+
+    def frame(self):
+        if self._frame is None:
+            self._frame = pd.DataFrame({field: self[field] for field in self._columns})
+        return self._frame
@@ -0,0 +1,63 @@
+import logging
+import time
+import MetaTrader5 as mt5
+from config import Config
+from metatrader.bar_store import server_time, timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+# Trade servers run on whole or half-hour offsets; rounding the measured offset
+# to a quarter hour keeps it exact even when the last tick is a few minutes old
+SERVER_OFFSET_ROUNDING = 900
+
+class BarClock:
+    """
+    Knows when the bars of one symbol close, so the strategy can sleep until
+    then instead of polling.
+
+    ``seconds_until_close`` is the time left until the forming bar closes (plus
+    ``grace``), from the forming bar's open time and the trade server's offset
+    to the local clock. ``check`` reads only the newest rate's time with
+    ``copy_rates_from_pos(symbol, timeframe, 0, 1)`` and reports whether a new
+    bar has opened, i.e. the previous one closed. Until the first tick of the
+    new bar arrives the clock asks to be checked again every ``grace`` seconds.
+    """
+
+    def __init__(self, symbol, timeframe=None, grace=None, clock=time.time):
+        self.symbol = symbol
+        self.timeframe = timeframe or Config.MT5_TIMEFRAME_VALUE
+        self.seconds = timeframe_seconds(self.timeframe)
+        self.grace = Config.BAR_CLOSE_GRACE_SECONDS if grace is None else grace
+        self.clock = clock
+        self.bar_time = None
+
+    def latest_bar_time(self):
+        rates = mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, 1)
+        if rates is None or len(rates) == 0:
+            logger.warning("No rates for %s: %s", self.symbol, mt5.last_error())
+            return None
+        return int(rates['time'][-1])
+
+    def check(self):
+        """True when a bar opened (so the previous one closed) since the last check."""
+        latest = self.latest_bar_time()
+        if latest is None:
+            return False
+        closed = self.bar_time is not None and latest > self.bar_time
+        if self.bar_time is None or closed:
+            self.bar_time = latest
+        return closed
+
+    def server_offset(self):
+        offset = server_time(self.symbol) - self.clock()
+        return round(offset / SERVER_OFFSET_ROUNDING) * SERVER_OFFSET_ROUNDING
+
+    def seconds_until_close(self):
+        if self.bar_time is None:
+            self.check()
+        if self.bar_time is None:
+            return self.grace
+        now = self.clock() + self.server_offset()
+        remaining = self.bar_time + self.seconds - now
+        # A bar that is due but not seen yet is waiting for its first tick
+        return remaining + self.grace if remaining > 0 else self.grace
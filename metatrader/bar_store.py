@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import time
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from config import Config
+from utils.error_handling import handle_error
+
+logger = logging.getLogger(__name__)
+
+# On-disk dtype of every stored bar field, matching the MT5 rates structure
+BAR_FIELDS = {
+    'time': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'tick_volume': '<i8',
+    'spread': '<i4',
+    'real_volume': '<i8',
+}
+
+def to_epoch(value):
+    """Seconds since the epoch of a datetime-like value, in the terminal's (naive) time."""
+    return int(pd.Timestamp(value).timestamp())
+
+def from_epoch(seconds):
+    return pd.Timestamp(int(seconds), unit='s').to_pydatetime()
+
+def server_time(symbol):
+    """Current trade server time for ``symbol`` (last tick time), falling back to the local clock."""
+    tick = mt5.symbol_info_tick(symbol)
+    try:
+        return int(tick.time)
+    except (AttributeError, TypeError, ValueError):
+        return int(time.time())
+
+def timeframe_seconds(timeframe):
+    if timeframe not in Config.TIMEFRAME_SECONDS:
+        raise ValueError(f"Unsupported timeframe for the bar store: {timeframe}")
+    return Config.TIMEFRAME_SECONDS[timeframe]
+
+def timeframe_name(timeframe):
+    for name, value in Config.TIMEFRAME_DICT.items():
+        if value == timeframe:
+            return name
+    raise ValueError(f"Unsupported timeframe for the bar store: {timeframe}")
+
+class BarArrays(Mapping):
+    """
+    Read-only, zero-copy NumPy views of stored bars, keyed by field name.
+
+    Each field is memory-mapped on first access; ``time`` is exposed as
+    ``datetime64[s]``. Pickling only carries the file location, so worker
+    processes map the same pages instead of receiving a copy.
+    """
+
+    def __init__(self, directory, count, lo, hi):
+        self.directory = directory
+        self.count = count
+        self.lo = lo
+        self.hi = hi
+        self._views = {}
+
+    def __getitem__(self, field):
+        if field not in BAR_FIELDS:
+            raise KeyError(field)
+        if field not in self._views:
+            values = np.memmap(os.path.join(self.directory, f"{field}.bin"), dtype=BAR_FIELDS[field], mode='r',
+                               shape=(self.count,))[self.lo:self.hi]
+            self._views[field] = values.view('datetime64[s]') if field == 'time' else values
+        return self._views[field]
+
+    def __iter__(self):
+        return iter(BAR_FIELDS)
+
+    def __len__(self):
+        return len(BAR_FIELDS)
+
+    @property
+    def num_bars(self):
+        return self.hi - self.lo
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_views'] = {}
+        return state
+
+class BarStore:
+    """
+    Columnar on-disk store of closed OHLC bars, one directory per symbol and timeframe.
+
+    Every field is a flat little-endian binary file that only ever grows at the
+    end; ``meta.json`` records how many bars are valid, the first and last bar
+    times, and how far MT5 has been queried. ``sync`` fetches only the part of a
+    requested range that is not on disk yet, and ``read`` serves it from disk.
+    Bars are only stored once they have closed, so stored data never changes.
+    """
+
+    def __init__(self, root=None, fetch=None):
+        self.root = root or Config.BAR_STORE_DIR
+        self.fetch = fetch or mt5.copy_rates_range
+
+    def directory(self, symbol, timeframe):
+        return os.path.join(self.root, symbol, timeframe_name(timeframe))
+
+    def meta(self, symbol, timeframe):
+        path = os.path.join(self.directory(symbol, timeframe), 'meta.json')
+        if not os.path.exists(path):
+            return {'count': 0, 'first_time': None, 'last_time': None, 'fetched_until': None}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol, timeframe, meta):
+        directory = self.directory(symbol, timeframe)
+        temp_path = os.path.join(directory, 'meta.json.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, os.path.join(directory, 'meta.json'))
+
+    def _columns(self, rates):
+        frame = pd.DataFrame(rates) if rates is not None else pd.DataFrame()
+        if frame.empty or 'time' not in frame:
+            return {field: np.empty(0, dtype=dtype) for field, dtype in BAR_FIELDS.items()}
+        if np.issubdtype(frame['time'].dtype, np.datetime64):
+            frame['time'] = frame['time'].astype('int64') // 10**9
+        frame = frame.sort_values('time', kind='mergesort').drop_duplicates('time', keep='last')
+        return {field: frame[field].to_numpy().astype(dtype) if field in frame else np.zeros(len(frame), dtype=dtype)
+                for field, dtype in BAR_FIELDS.items()}
+
+    def write(self, symbol, timeframe, rates, append=True, fetched_until=None):
+        """
+        Store closed bars. With ``append`` only bars newer than the last stored one
+        are added; otherwise the store is replaced by ``rates``. Returns the number of bars written.
+        """
+        directory = self.directory(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+        meta = self.meta(symbol, timeframe) if append else {'count': 0, 'first_time': None, 'last_time': None, 'fetched_until': None}
+        columns = self._columns(rates)
+        if meta['last_time'] is not None:
+            newer = columns['time'] > meta['last_time']
+            columns = {field: values[newer] for field, values in columns.items()}
+
+        written = len(columns['time'])
+        for field, dtype in BAR_FIELDS.items():
+            with open(os.path.join(directory, f"{field}.bin"), 'ab' if append else 'wb') as f:
+                # Drop anything past the last committed bar, e.g. left by an interrupted write
+                f.truncate(meta['count'] * np.dtype(dtype).itemsize)
+                if written:
+                    columns[field].tofile(f)
+
+        if written:
+            meta['count'] += written
+            meta['first_time'] = meta['first_time'] if meta['first_time'] is not None else int(columns['time'][0])
+            meta['last_time'] = int(columns['time'][-1])
+        if fetched_until is not None:
+            meta['fetched_until'] = max(fetched_until, meta['fetched_until'] or fetched_until)
+        self._write_meta(symbol, timeframe, meta)
+        return written
+
+    def open_arrays(self, symbol, timeframe, start=None, end=None, limit=None):
+        """
+        Zero-copy read-only views (``BarArrays``) of the stored bars with ``start <= time <= end``, or None.
+
+        ``limit`` keeps only the last ``limit`` bars of the range. Nothing is
+        copied or cleaned, so memory use does not grow with the length of the
+        history or the number of processes reading it.
+        """
+        meta = self.meta(symbol, timeframe)
+        if meta['count'] == 0:
+            return None
+        directory = self.directory(symbol, timeframe)
+        times = np.memmap(os.path.join(directory, 'time.bin'), dtype=BAR_FIELDS['time'], mode='r', shape=(meta['count'],))
+        lo = 0 if start is None else int(np.searchsorted(times, to_epoch(start), side='left'))
+        hi = meta['count'] if end is None else int(np.searchsorted(times, to_epoch(end), side='right'))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        if hi <= lo:
+            return None
+        return BarArrays(directory, meta['count'], lo, hi)
+
+    def read(self, symbol, timeframe, start=None, end=None, limit=None):
+        """
+        Stored bars with ``start <= time <= end`` copied into a DataFrame shaped like MT5 rates, or None.
+        """
+        arrays = self.open_arrays(symbol, timeframe, start, end, limit)
+        if arrays is None:
+            return None
+        data = pd.DataFrame({field: np.array(arrays[field]) for field in BAR_FIELDS})
+        data['time'] = pd.to_datetime(data['time'])
+        return data
+
+    def sync(self, symbol, timeframe, start, end):
+        """
+        Make sure every closed bar of ``[start, end]`` is on disk, fetching only what is missing.
+
+        Returns the bars of the fetched range that have not closed yet (possibly
+        empty), which are never stored.
+        """
+        bar_seconds = timeframe_seconds(timeframe)
+        start, end = to_epoch(start), to_epoch(end)
+        meta = self.meta(symbol, timeframe)
+        append = meta['count'] > 0 and start >= meta['first_time']
+        if append:
+            fetch_from = meta['fetched_until'] if meta['fetched_until'] is not None else meta['last_time']
+            fetch_to = end
+        else:
+            # Nothing stored yet, or the range starts before the stored history: rebuild it from ``start``
+            fetch_from = start
+            fetch_to = max(end, meta['fetched_until'] or end)
+        if fetch_from >= fetch_to:
+            return pd.DataFrame(columns=list(BAR_FIELDS))
+
+        now = server_time(symbol)
+        try:
+            rates = self.fetch(symbol, timeframe, from_epoch(fetch_from), from_epoch(fetch_to))
+        except Exception as e:
+            handle_error(e, f"Failed to fetch bars for {symbol} from {from_epoch(fetch_from)} to {from_epoch(fetch_to)}")
+            return pd.DataFrame(columns=list(BAR_FIELDS))
+        # The terminal returns no bars while it is still downloading the history; nothing is marked fetched then
+        if rates is None or len(rates) == 0:
+            logger.warning("No bars returned for %s from %s to %s: %s", symbol, from_epoch(fetch_from),
+                           from_epoch(fetch_to), mt5.last_error())
+            return pd.DataFrame(columns=list(BAR_FIELDS))
+
+        columns = self._columns(rates)
+        closed = columns['time'] + bar_seconds <= now
+        fetched_until = None
+        if closed.any():
+            # Never past the close of the last bar received, in case the rest of the range is still downloading
+            fetched_until = min(fetch_to, now - bar_seconds, int(columns['time'][closed][-1]) + bar_seconds)
+        written = self.write(symbol, timeframe, {field: values[closed] for field, values in columns.items()},
+                             append=append, fetched_until=fetched_until)
+        logger.info("Bar store for %s %s: fetched %s bars, stored %s new closed bars", symbol,
+                    timeframe_name(timeframe), len(closed), written)
+
+        forming = pd.DataFrame({field: values[~closed] for field, values in columns.items()})
+        forming['time'] = pd.to_datetime(forming['time'], unit='s')
+        return forming
+
+    def latest(self, symbol, timeframe, num_candles):
+        """
+        The last ``num_candles`` bars, including the one still forming, syncing only the missing tail.
+        """
+        bar_seconds = timeframe_seconds(timeframe)
+        now = server_time(symbol)
+        forming = self.sync(symbol, timeframe, from_epoch(now - num_candles * bar_seconds), from_epoch(now + bar_seconds))
+        stored = self.read(symbol, timeframe, limit=num_candles)
+        frames = [frame for frame in (stored, forming) if frame is not None and not frame.empty]
+        if not frames:
+            return None
+        return pd.concat(frames).tail(num_candles).reset_index(drop=True)
+
+_bar_store = None
+
+def get_bar_store():
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = BarStore()
+    return _bar_store
@@ -2,11 +2,12 @@ import MetaTrader5 as mt5
 # import MetaTrader4 as mt4
 import win32com.client
 import time
+from metatrader.session import get_session
 
 def connect(login, password, server, path, mt_version):
     if mt_version == 5:
-        if not mt5.initialize(path=path, login=login, password=password, server=server):
-            print("initialize() failed for MT5, error code =", mt5.last_error())
+        if not get_session().initialize(path, login=login, password=password, server=server):
+            print("initialize() failed for MT5, error code =", get_session().call(mt5.last_error))
             return False
         return True
     # elif mt_version == 4:
@@ -22,7 +23,7 @@ def connect(login, password, server, path, mt_version):
 
 def disconnect(mt_version):
     if mt_version == 5:
-        mt5.shutdown()
+        get_session().shutdown()
     # elif mt_version == 4:
     #     try:
     #         mt4_client = mt4.MT4()
@@ -32,7 +33,7 @@ def disconnect(mt_version):
 
 def check_connection(mt_version):
     if mt_version == 5:
-        return mt5.terminal_info() is not None
+        return get_session().call(mt5.terminal_info) is not None
     # elif mt_version == 4:
     #     try:
     #         mt4_client = mt4.MT4()
@@ -48,9 +49,8 @@ def initialize_mt5(mt5_path):
         print("Invalid path provided for MetaTrader 5 terminal.")
         return False
 
-    if not mt5.initialize(path=mt5_path):
+    if not get_session().initialize(mt5_path):
         print("Failed to initialize MetaTrader 5 terminal.")
-        mt5.shutdown()
         return False
     else:
         print("MetaTrader 5 terminal initialized successfully.")
@@ -59,5 +59,5 @@ def initialize_mt5(mt5_path):
 
 def shutdown_mt5():
     # Shutdown MetaTrader 5
-    mt5.shutdown()
+    get_session().shutdown()
     print("MetaTrader 5 connection gracefully shut down.")
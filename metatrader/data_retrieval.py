@@ -4,17 +4,18 @@ import MetaTrader5 as mt5
 import pandas as pd
 from datetime import datetime, timedelta
 from utils.error_handling import handle_error
+from config import Config
+from metatrader.bar_store import get_bar_store
+from metatrader.data_sources import get_data_source
+from metatrader.session import get_session
+from metatrader.symbol_cache import symbol_cache
 import logging
 
 def initialize_mt5():
-    if not mt5.initialize():
-        logging.error("Failed to initialize MetaTrader5")
-        mt5.shutdown()
-        return False
-    return True
+    return get_session().connect()
 
 def shutdown_mt5():
-    mt5.shutdown()
+    get_session().shutdown()
 
 def get_historical_data(symbol, timeframe, start_time, end_time):
     """
@@ -28,13 +29,71 @@ def get_historical_data(symbol, timeframe, start_time, end_time):
 
         data = pd.DataFrame(rates)
         data['time'] = pd.to_datetime(data['time'], unit='s')
-        data = data.dropna()
-        data = data[(data['open'] > 0) & (data['high'] > 0) & (data['low'] > 0) & (data['close'] > 0)]
-        return data
+        return clean_bars(data)
     except Exception as e:
         handle_error(e, f"Failed to retrieve historical data for {symbol}")
         return None
 
+def get_historical_ticks(symbol, start_time, end_time):
+    """
+    Bid/ask ticks between ``start_time`` and ``end_time`` from MT5, as ``time_msc``, ``bid`` and ``ask`` columns.
+    """
+    try:
+        ticks = mt5.copy_ticks_range(symbol, start_time, end_time, mt5.COPY_TICKS_ALL)
+        if ticks is None or len(ticks) == 0:
+            raise ValueError(f"Failed to retrieve ticks for {symbol} from {start_time} to {end_time}")
+        logging.info(f"Fetched {len(ticks)} ticks for {symbol}")
+        return pd.DataFrame({'time_msc': ticks['time_msc'], 'bid': ticks['bid'], 'ask': ticks['ask']})
+    except Exception as e:
+        handle_error(e, f"Failed to retrieve ticks for {symbol}")
+        return None
+
+def clean_bars(data):
+    data = data.dropna()
+    return data[(data['open'] > 0) & (data['high'] > 0) & (data['low'] > 0) & (data['close'] > 0)]
+
+def get_stored_data(symbol, timeframe, start_time=None, end_time=None, num_candles=None):
+    """
+    Serve bars from the on-disk bar store, fetching only the bars it does not hold yet.
+
+    With ``num_candles`` the latest bars (including the one still forming) are
+    returned; otherwise the closed bars between ``start_time`` and ``end_time``.
+    """
+    try:
+        store = get_bar_store()
+        if num_candles is not None:
+            data = store.latest(symbol, timeframe, num_candles)
+        else:
+            store.sync(symbol, timeframe, start_time, end_time)
+            data = store.read(symbol, timeframe, start_time, end_time)
+        if data is None or data.empty:
+            raise ValueError(f"No stored data for {symbol} with timeframe {timeframe} from {start_time} to {end_time}")
+        logging.info(f"Loaded {len(data)} candles for {symbol} from the bar store")
+        return clean_bars(data).reset_index(drop=True)
+    except Exception as e:
+        handle_error(e, f"Failed to retrieve stored data for {symbol}")
+        return None
+
+def get_bar_arrays(symbol, timeframe, start_time, end_time):
+    """
+    Read-only memory-mapped views of the stored bars between ``start_time`` and ``end_time``.
+
+    The bar store is synced first. Unlike ``get_data`` nothing is copied or
+    filtered, which keeps memory flat for multi-year histories; the result is a
+    mapping of column name to NumPy array that the backtest accepts as ``data``.
+    """
+    try:
+        store = get_bar_store()
+        store.sync(symbol, timeframe, start_time, end_time)
+        arrays = store.open_arrays(symbol, timeframe, start_time, end_time)
+        if arrays is None:
+            raise ValueError(f"No stored data for {symbol} with timeframe {timeframe} from {start_time} to {end_time}")
+        logging.info(f"Mapped {arrays.num_bars} candles for {symbol} from the bar store")
+        return arrays
+    except Exception as e:
+        handle_error(e, f"Failed to map stored data for {symbol}")
+        return None
+
 def get_current_price(symbol):
     """
     This function gets the current price for a symbol.
@@ -65,7 +124,7 @@ def get_available_symbols():
         return None
 
 def get_symbol_info(symbol):
-    symbol_info = mt5.symbol_info(symbol)
+    symbol_info = symbol_cache.get(symbol)
     if symbol_info:
         return symbol_info._asdict()
     else:
@@ -88,36 +147,54 @@ def get_orders():
         logging.info("No pending orders found")
         return []
 
+def get_live_data(symbol, timeframe=mt5.TIMEFRAME_H1, num_candles=200):
+    """
+    The latest MT5 bars plus a synthetic row with the current price.
+    """
+    if Config.BAR_STORE_ENABLED and timeframe in Config.TIMEFRAME_SECONDS:
+        historical_data = get_stored_data(symbol, timeframe, num_candles=num_candles)
+    else:
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=num_candles)
+        historical_data = get_historical_data(symbol, timeframe, start_time, end_time)
+    current_price = get_current_price(symbol)
+
+    if historical_data is not None and current_price is not None:
+        # Add current price to historical data
+        current_data = pd.DataFrame([{
+            'time': current_price['time'],
+            'open': current_price['last'],
+            'high': current_price['last'],
+            'low': current_price['last'],
+            'close': current_price['last'],
+            'tick_volume': 0,
+            'spread': current_price['ask'] - current_price['bid'],
+            'real_volume': 0
+        }])
+        historical_data = pd.concat([historical_data, current_data]).reset_index(drop=True)
+
+    return historical_data
+
+def get_backtest_data(symbol, timeframe, start_date, end_date):
+    """
+    MT5 bars between ``start_date`` and ``end_date``.
+    """
+    if Config.BAR_STORE_ENABLED and timeframe in Config.TIMEFRAME_SECONDS:
+        return get_stored_data(symbol, timeframe, start_date, end_date)
+    return get_historical_data(symbol, timeframe, start_date, end_date)
+
 def get_data(symbol, mode='live', start_date=None, end_date=None, timeframe=mt5.TIMEFRAME_H1, num_candles=200):
     """
-    Unified function to get either historical or live data.
+    Unified function to get either historical or live data from the configured data source.
     """
     try:
+        source = get_data_source()
         if mode == 'live':
-            end_time = datetime.now()
-            start_time = end_time - timedelta(hours=num_candles)
-            historical_data = get_historical_data(symbol, timeframe, start_time, end_time)
-            current_price = get_current_price(symbol)
-
-            if historical_data is not None and current_price is not None:
-                # Add current price to historical data
-                current_data = pd.DataFrame([{
-                    'time': current_price['time'],
-                    'open': current_price['last'],
-                    'high': current_price['last'],
-                    'low': current_price['last'],
-                    'close': current_price['last'],
-                    'tick_volume': 0,
-                    'spread': current_price['ask'] - current_price['bid'],
-                    'real_volume': 0
-                }])
-                historical_data = pd.concat([historical_data, current_data]).reset_index(drop=True)
-
-            return historical_data
+            return source.get_latest(symbol, timeframe, num_candles)
         elif mode == 'backtest':
             if start_date is None or end_date is None:
                 raise ValueError("start_date and end_date must be provided for backtest mode")
-            return get_historical_data(symbol, timeframe, start_date, end_date)
+            return source.get_bars(symbol, timeframe, start_date, end_date)
         else:
             raise ValueError("Invalid mode. Use 'live' or 'backtest'")
     except Exception as e:
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+from collections import deque
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import numpy as np
+import pandas as pd
+from config import Config
+from metatrader.bar_store import timeframe_name
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only needed for Parquet files
+    pq = None
+
+# Columns of a bar frame, in the order MT5 returns them
+BAR_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume']
+
+# Columns of a tick frame: epoch milliseconds and the two quotes
+TICK_COLUMNS = ['time_msc', 'bid', 'ask']
+
+# Vendor column names accepted for the MT5 ones
+COLUMN_ALIASES = {
+    'timestamp': 'time',
+    'datetime': 'time',
+    'date': 'time',
+    'volume': 'tick_volume',
+}
+
+def _naive_times(times, timezone=None):
+    """Parse vendor times (epoch seconds, strings or datetimes) into naive datetimes in ``timezone``."""
+    if pd.api.types.is_numeric_dtype(times):
+        parsed = pd.to_datetime(times, unit='s')
+    elif not pd.api.types.is_datetime64_any_dtype(times):
+        parsed = pd.to_datetime(times)
+        if parsed.dtype == object:
+            # Mixed UTC offsets
+            parsed = pd.to_datetime(times, utc=True)
+    else:
+        parsed = times
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_convert(timezone or Config.DATA_TIMEZONE).dt.tz_localize(None)
+    return parsed
+
+def _lower_columns(data):
+    data = data.rename(columns=lambda column: str(column).strip().lower())
+    return data.rename(columns={alias: column for alias, column in COLUMN_ALIASES.items() if column not in data})
+
+def normalize_bars(data, timezone=None):
+    """
+    Turn a vendor bar frame into the MT5 layout: lower-case names, naive ``time``, numeric prices.
+
+    Epoch numbers are read as seconds. Timezone-aware times (or strings with UTC
+    offsets) are converted to ``timezone`` (default ``Config.DATA_TIMEZONE``) and
+    made naive, like MT5 bar times. Missing volume/spread columns are zero.
+    """
+    data = _lower_columns(data)
+    bars = pd.DataFrame({'time': _naive_times(data['time'], timezone)})
+    for column in BAR_COLUMNS[1:]:
+        bars[column] = pd.to_numeric(data[column], errors='coerce') if column in data else 0
+    return bars.reset_index(drop=True)
+
+def normalize_ticks(data, timezone=None):
+    """
+    Turn a vendor tick frame into ``time_msc`` (epoch milliseconds of the naive
+    terminal time), ``bid`` and ``ask``. ``time`` is parsed like bar times when
+    there is no ``time_msc`` column.
+    """
+    data = _lower_columns(data)
+    if 'time_msc' in data:
+        time_msc = pd.to_numeric(data['time_msc']).astype('int64').to_numpy()
+    else:
+        time_msc = _naive_times(data['time'], timezone).to_numpy().astype('datetime64[ms]').astype('int64')
+    ticks = pd.DataFrame({'time_msc': time_msc})
+    for column in TICK_COLUMNS[1:]:
+        ticks[column] = pd.to_numeric(data[column], errors='coerce').to_numpy()
+    return ticks.dropna()
+
+def _clean(data):
+    data = data.dropna()
+    return data[(data['open'] > 0) & (data['high'] > 0) & (data['low'] > 0) & (data['close'] > 0)]
+
+def _in_range(data, start, end):
+    mask = pd.Series(True, index=data.index)
+    if start is not None:
+        mask &= data['time'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= data['time'] <= pd.Timestamp(end)
+    return data[mask]
+
+def _epoch_msc(value):
+    return pd.Timestamp(value).value // 10 ** 6
+
+class MT5DataSource:
+    """Bars from the MetaTrader5 terminal, through the bar store when it is enabled."""
+
+    def get_bars(self, symbol, timeframe, start, end):
+        from metatrader.data_retrieval import get_backtest_data
+        return get_backtest_data(symbol, timeframe, start, end)
+
+    def get_latest(self, symbol, timeframe, num_candles):
+        from metatrader.data_retrieval import get_live_data
+        return get_live_data(symbol, timeframe, num_candles)
+
+    def get_ticks(self, symbol, start, end):
+        from metatrader.data_retrieval import get_historical_ticks
+        return get_historical_ticks(symbol, start, end)
+
+class FileDataSource:
+    """
+    Bars from CSV or Parquet files named ``<symbol>_<timeframe>.<ext>`` in ``directory``,
+    and ticks from ``<symbol>_ticks.<ext>``.
+
+    Files are streamed in chunks of ``chunk_rows`` rows, so histories larger than
+    memory can be scanned; only the bars of the requested range are kept.
+    Files are expected in time order.
+    """
+
+    EXTENSIONS = ('.parquet', '.csv', '.csv.gz')
+
+    def __init__(self, directory=None, chunk_rows=None, timezone=None):
+        self.directory = directory or Config.DATA_DIR
+        self.chunk_rows = chunk_rows or Config.DATA_CHUNK_ROWS
+        self.timezone = timezone or Config.DATA_TIMEZONE
+
+    def _find(self, stem):
+        for extension in self.EXTENSIONS:
+            path = os.path.join(self.directory, f"{stem}{extension}")
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No data file for {stem} in {self.directory}")
+
+    def path(self, symbol, timeframe):
+        return self._find(f"{symbol}_{timeframe_name(timeframe)}")
+
+    def tick_path(self, symbol):
+        return self._find(f"{symbol}_ticks")
+
+    def _raw_chunks(self, path):
+        if path.endswith('.parquet'):
+            if pq is None:
+                raise ImportError("pyarrow is required to read Parquet data files")
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunk_rows):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, chunksize=self.chunk_rows)
+
+    def iter_bars(self, symbol, timeframe, start=None, end=None):
+        """Yield the bars of ``[start, end]`` chunk by chunk, stopping once past ``end``."""
+        for chunk in self._raw_chunks(self.path(symbol, timeframe)):
+            bars = normalize_bars(chunk, self.timezone)
+            selected = _in_range(bars, start, end)
+            if not selected.empty:
+                yield selected
+            if end is not None and len(bars) and bars['time'].iloc[-1] > pd.Timestamp(end):
+                break
+
+    def get_bars(self, symbol, timeframe, start, end):
+        chunks = list(self.iter_bars(symbol, timeframe, start, end))
+        if not chunks:
+            logging.error(f"No bars for {symbol} from {start} to {end} in {self.path(symbol, timeframe)}")
+            return None
+        return _clean(pd.concat(chunks, ignore_index=True))
+
+    def iter_ticks(self, symbol, start=None, end=None):
+        """Yield the ticks of ``[start, end]`` chunk by chunk, stopping once past ``end``."""
+        lo = _epoch_msc(start) if start is not None else None
+        hi = _epoch_msc(end) if end is not None else None
+        for chunk in self._raw_chunks(self.tick_path(symbol)):
+            ticks = normalize_ticks(chunk, self.timezone)
+            mask = np.ones(len(ticks), dtype=bool)
+            if lo is not None:
+                mask &= ticks['time_msc'].to_numpy() >= lo
+            if hi is not None:
+                mask &= ticks['time_msc'].to_numpy() <= hi
+            if mask.any():
+                yield ticks[mask]
+            if hi is not None and len(ticks) and ticks['time_msc'].iloc[-1] > hi:
+                break
+
+    def get_ticks(self, symbol, start, end):
+        chunks = list(self.iter_ticks(symbol, start, end))
+        if not chunks:
+            logging.error(f"No ticks for {symbol} from {start} to {end} in {self.tick_path(symbol)}")
+            return None
+        return pd.concat(chunks, ignore_index=True)
+
+    def get_latest(self, symbol, timeframe, num_candles):
+        tail = deque(maxlen=num_candles)
+        for chunk in self.iter_bars(symbol, timeframe):
+            tail.append(chunk.tail(num_candles))
+        if not tail:
+            return None
+        return _clean(pd.concat(tail, ignore_index=True)).tail(num_candles).reset_index(drop=True)
+
+class HTTPDataSource:
+    """
+    Bars from a local HTTP service.
+
+    ``GET <url>/bars?symbol=..&timeframe=..&start=..&end=..`` (or ``&count=..``
+    for the latest bars) must return JSON: a list of bars, or an object with a
+    ``bars`` list and an optional ``next`` URL for the following page.
+    """
+
+    def __init__(self, url=None, timeout=None, timezone=None):
+        self.url = (url or Config.DATA_API_URL).rstrip('/')
+        self.timeout = timeout or Config.DATA_API_TIMEOUT
+        self.timezone = timezone or Config.DATA_TIMEZONE
+
+    def _fetch(self, params):
+        url = f"{self.url}/bars?{urlencode(params)}"
+        pages = []
+        while url:
+            with urlopen(url, timeout=self.timeout) as response:
+                payload = json.loads(response.read().decode('utf-8'))
+            if isinstance(payload, dict):
+                pages.append(pd.DataFrame(payload.get('bars', [])))
+                url = payload.get('next')
+            else:
+                pages.append(pd.DataFrame(payload))
+                url = None
+        pages = [page for page in pages if not page.empty]
+        if not pages:
+            return None
+        return _clean(normalize_bars(pd.concat(pages, ignore_index=True), self.timezone))
+
+    def get_bars(self, symbol, timeframe, start, end):
+        return self._fetch({'symbol': symbol, 'timeframe': timeframe_name(timeframe),
+                            'start': pd.Timestamp(start).isoformat(), 'end': pd.Timestamp(end).isoformat()})
+
+    def get_latest(self, symbol, timeframe, num_candles):
+        return self._fetch({'symbol': symbol, 'timeframe': timeframe_name(timeframe), 'count': num_candles})
+
+DATA_SOURCES = {
+    'MT5': MT5DataSource,
+    'CSV': FileDataSource,
+    'API': HTTPDataSource,
+}
+
+def get_data_source(name=None):
+    """The data source selected by ``name`` (default ``Config.DATA_SOURCE``)."""
+    name = name or Config.DATA_SOURCE
+    if name not in DATA_SOURCES:
+        raise ValueError(f"Invalid DATA_SOURCE value: {name}. Expected one of {list(DATA_SOURCES)}.")
+    return DATA_SOURCES[name]()
@@ -1,32 +1,233 @@
 import pandas as pd
 import numpy as np
 import logging
+from collections import deque
+
+try:
+    from numba import njit
+except ImportError:  # only where numba has no build; the pure Python recurrence is used instead
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+def _ema_recurrence_py(values, out, seed, period):
+    # Iterating a plain list of floats is an order of magnitude faster than
+    # indexing a Series, and performs exactly the same IEEE operations.
+    multiplier = 2 / (period + 1)
+    ema = seed
+    tail = []
+    append = tail.append
+    for price in values[period:].tolist():
+        ema = (price - ema) * multiplier + ema
+        append(ema)
+    out[period:] = tail
+    return out
+
+def _ema_recurrence_nb(values, out, seed, period):
+    multiplier = 2 / (period + 1)
+    ema = seed
+    for i in range(period, values.shape[0]):
+        ema = (values[i] - ema) * multiplier + ema
+        out[i] = ema
+    return out
+
+_ema_recurrence = njit(cache=True)(_ema_recurrence_nb) if njit is not None else _ema_recurrence_py
+
+def _as_float_array(values):
+    if isinstance(values, np.ndarray) and values.dtype == np.float64:
+        return values
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+def ema_array(values, period):
+    """
+    Calculate the SMA-seeded EMA of ``values`` and return it as a float64 array.
+
+    The first ``period - 1`` values are NaN and the value at ``period - 1`` is the
+    simple mean of the first ``period`` prices (NaNs skipped, as pandas does).
+    The output is bit-for-bit identical to the original per-bar loop.
+    """
+    values = _as_float_array(values)
+    ema_values = np.full(len(values), np.nan, dtype=np.float64)
+    if len(values) < period:
+        logger.warning("Not enough data for EMA calculation. Required: %d, Available: %d", period, len(values))
+        return ema_values
+
+    seed = pd.Series(values[:period]).mean()
+    ema_values[period - 1] = seed
+    return _ema_recurrence(values, ema_values, seed, period)
+
+def calculate_emas(data, specs, cache=None):
+    """
+    Calculate several EMAs over several columns of ``data`` in one call.
+
+    ``specs`` maps an output name to a ``(column, period)`` pair. Every source
+    column is converted to float once and every distinct ``(column, period)``
+    pair is computed once. Passing the same ``cache`` dict on later calls over
+    the same data reuses EMAs computed earlier. Returns a dict of float64 arrays
+    keyed like ``specs``.
+    """
+    columns = {}
+    computed = {} if cache is None else cache
+    results = {}
+    for name, (column, period) in specs.items():
+        if column not in columns:
+            columns[column] = _as_float_array(data[column])
+        key = (column, period)
+        if key not in computed:
+            computed[key] = ema_array(columns[column], period)
+        results[name] = computed[key]
+
+    logger.debug("Calculated %d EMAs over %d columns", len(computed), len(columns))
+    return results
+
+def sliding_max(values, window):
+    """
+    Maximum of every ``window``-long slice of ``values`` (van Herk/Gil-Werman, O(n) for any window).
+
+    Element ``j`` of the result is ``max(values[j:j + window])``; a NaN inside a
+    window makes that window's maximum NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if window <= 0 or n < window:
+        return np.empty(0, dtype=np.float64)
+    if window == 1:
+        return values.copy()
+
+    padded = np.concatenate([values, np.full((-n) % window, -np.inf)])
+    blocks = padded.reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+
+def sliding_min(values, window):
+    """
+    Minimum of every ``window``-long slice of ``values``; see ``sliding_max``.
+    """
+    return -sliding_max(-np.asarray(values, dtype=np.float64), window)
 
 def calculate_ema(prices, period):
     if not isinstance(prices, (list, np.ndarray, pd.Series)):
         raise ValueError("Invalid input type for prices. Expected list, numpy array, or pandas Series.")
-    
-    logging.debug(f"Calculating EMA for period: {period}, prices: {prices}")
-    
+
     # Convert input to a pandas Series to ensure consistency
     prices = pd.Series(prices)
-    
+
     # Ensure that the series is numeric
     prices = pd.to_numeric(prices, errors='coerce')
-    logging.debug(f"Prices converted to numeric: {prices}")
-
-    ema_values = np.full(len(prices), np.nan, dtype=np.float64)
-    if len(prices) < period:
-        return pd.Series(ema_values, index=prices.index)
-    
-    sma = np.mean(prices[:period])
-    ema_values[period - 1] = sma
-    logging.debug(f"Initial SMA: {sma}")
-    
-    multiplier = 2 / (period + 1)
-    for i in range(period, len(prices)):
-        ema_values[i] = (prices[i] - ema_values[i - 1]) * multiplier + ema_values[i - 1]
-        logging.debug(f"EMA value at index {i}: {ema_values[i]}")
-    
-    ema_series = pd.Series(ema_values, index=prices.index)
+
+    ema_series = pd.Series(ema_array(prices, period), index=prices.index)
     return ema_series
+
+class EMAState:
+    """
+    Incremental SMA-seeded EMA.
+
+    Feeding the same prices through ``update`` yields exactly the values of
+    ``ema_array``; ``peek`` returns the value a price would produce without
+    committing it, for the bar that is still forming.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.value = np.nan
+        self.count = 0
+        self._seed_prices = []
+
+    def _next(self, price):
+        if self.count >= self.period:
+            return (price - self.value) * self.multiplier + self.value
+        if self.count == self.period - 1:
+            return pd.Series(self._seed_prices + [price], dtype=np.float64).mean()
+        return np.nan
+
+    def update(self, price):
+        value = self._next(price)
+        if self.count < self.period - 1:
+            self._seed_prices.append(price)
+        else:
+            self._seed_prices = []
+        self.value = value
+        self.count += 1
+        return value
+
+    def peek(self, price):
+        return self._next(price)
+
+class RollingStdState:
+    """
+    Incremental rolling sample standard deviation (``Series.rolling(window).std()``).
+
+    Keeps running sums of the window, shifted by an anchor price to limit
+    cancellation, and re-anchors every ``window`` updates so rounding errors
+    do not accumulate over long sessions.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque(maxlen=window)
+        self._anchor = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._nans = 0
+        self._since_anchor = 0
+
+    def _reanchor(self):
+        finite = [value for value in self._values if value == value]
+        self._anchor = finite[-1] if finite else None
+        self._sum = sum(value - self._anchor for value in finite) if finite else 0.0
+        self._sum_sq = sum((value - self._anchor) ** 2 for value in finite) if finite else 0.0
+        self._since_anchor = 0
+
+    def _add(self, value, sign):
+        if value != value:
+            self._nans += sign
+            return
+        shifted = value - self._anchor
+        self._sum += sign * shifted
+        self._sum_sq += sign * shifted * shifted
+
+    def _std(self, total, total_sq, nans, count):
+        if count < self.window or nans or count < 2:
+            return np.nan
+        variance = (total_sq - total * total / count) / (count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def update(self, price):
+        if self._anchor is None and price == price:
+            self._anchor = price
+        if len(self._values) == self.window:
+            self._add(self._values[0], -1)
+        self._values.append(price)
+        if self._anchor is not None:
+            self._add(price, 1)
+        elif price != price:
+            self._nans += 1
+        self._since_anchor += 1
+        if self._since_anchor >= self.window:
+            self._reanchor()
+            self._nans = sum(1 for value in self._values if value != value)
+        return self.value
+
+    @property
+    def value(self):
+        return self._std(self._sum, self._sum_sq, self._nans, len(self._values))
+
+    def peek(self, price):
+        total, total_sq, nans, count = self._sum, self._sum_sq, self._nans, len(self._values) + 1
+        anchor = self._anchor if self._anchor is not None else price
+        if count > self.window:
+            oldest = self._values[0]
+            count -= 1
+            if oldest != oldest:
+                nans -= 1
+            else:
+                total -= oldest - anchor
+                total_sq -= (oldest - anchor) ** 2
+        if price != price:
+            nans += 1
+        else:
+            total += price - anchor
+            total_sq += (price - anchor) ** 2
+        return self._std(total, total_sq, nans, count)
@@ -0,0 +1,140 @@
+import logging
+import math
+import threading
+from collections import defaultdict
+import numpy as np
+import MetaTrader5 as mt5
+from metatrader.symbol_cache import symbol_cache
+
+logger = logging.getLogger(__name__)
+
+FILLED_RETCODE = 10009
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of non-negative integers.
+
+    Values are counted in log-linear buckets that keep ``significant_digits``
+    decimal digits of precision from 0 up to ``highest`` (larger values are
+    clamped), so recording is O(1) in fixed memory however many values arrive.
+    """
+
+    def __init__(self, highest=60_000_000, significant_digits=2):
+        self.highest = highest
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.sub_bucket_count = 1 << self.sub_bucket_bits
+        self.half_count = self.sub_bucket_count // 2
+        self.counts = np.zeros(self._index(highest) + 1, dtype=np.int64)
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value):
+        bucket = max(0, value.bit_length() - self.sub_bucket_bits)
+        return bucket * self.half_count + (value >> bucket)
+
+    def _highest_equivalent(self, index):
+        if index < self.sub_bucket_count:
+            return index
+        bucket = (index - self.sub_bucket_count) // self.half_count + 1
+        return ((index - bucket * self.half_count) << bucket) + (1 << bucket) - 1
+
+    def record(self, value):
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile):
+        """The value ``percentile`` percent of the recorded values are at or below (within the precision)."""
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * self.total))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self._highest_equivalent(index), self.max)
+
+class OrderLatencyRecorder:
+    """
+    Per-symbol histograms of the order round trip.
+
+    Stages, in milliseconds: ``signal_to_send`` (signal until the first
+    ``order_send``), ``send_to_ack`` (every ``order_send`` round trip) and
+    ``signal_to_fill`` (signal until the fill; market deals fill on the ack).
+    ``slippage`` is the adverse distance of the fill from the requested price,
+    in points. Latencies are kept in microseconds.
+    """
+
+    LATENCY_STAGES = ('signal_to_send', 'send_to_ack', 'signal_to_fill')
+
+    def __init__(self, significant_digits=2):
+        self.significant_digits = significant_digits
+        self._histograms = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def _record(self, symbol, stage, value):
+        with self._lock:
+            histogram = self._histograms[symbol].get(stage)
+            if histogram is None:
+                histogram = self._histograms[symbol][stage] = LatencyHistogram(significant_digits=self.significant_digits)
+            histogram.record(value)
+
+    def record_latency(self, symbol, stage, seconds):
+        self._record(symbol, stage, round(seconds * 1e6))
+
+    def record_order_send(self, request, result, sent, acked, signal_time=None, first_send=True):
+        """
+        Record one ``order_send`` of ``request`` that was sent at ``sent`` and
+        answered with ``result`` at ``acked`` (``time.monotonic`` seconds, like
+        ``signal_time``). Never raises, so it cannot disturb order placement.
+        """
+        try:
+            symbol = request['symbol']
+            self.record_latency(symbol, 'send_to_ack', acked - sent)
+            if signal_time is not None and first_send:
+                self.record_latency(symbol, 'signal_to_send', sent - signal_time)
+            if result is None or result.retcode != FILLED_RETCODE:
+                return
+            if signal_time is not None:
+                self.record_latency(symbol, 'signal_to_fill', acked - signal_time)
+            info = symbol_cache.get(symbol)
+            if info is not None and request.get('price') and result.price:
+                slippage = float(result.price) - float(request['price'])
+                if request['type'] != mt5.ORDER_TYPE_BUY:
+                    slippage = -slippage
+                self._record(symbol, 'slippage', round(max(slippage, 0.0) / info.point))
+        except Exception as e:
+            logger.warning("Failed to record order latency: %s", e)
+
+    def percentiles(self, symbol, stage, percentiles=(50, 99)):
+        """``{percentile: value}`` for ``stage`` of ``symbol``: milliseconds for latencies, points for slippage."""
+        with self._lock:
+            histogram = self._histograms.get(symbol, {}).get(stage)
+            if histogram is None:
+                return {p: None for p in percentiles}
+            scale = 1e-3 if stage in self.LATENCY_STAGES else 1
+            return {p: histogram.percentile(p) * scale for p in percentiles}
+
+    def summary(self):
+        """``{symbol: {stage: {'count', 'p50', 'p99', 'max'}}}`` of everything recorded."""
+        with self._lock:
+            stages = {symbol: dict(histograms) for symbol, histograms in self._histograms.items()}
+        summary = {}
+        for symbol, histograms in stages.items():
+            summary[symbol] = {}
+            for stage, histogram in histograms.items():
+                p50, p99 = self.percentiles(symbol, stage).values()
+                scale = 1e-3 if stage in self.LATENCY_STAGES else 1
+                summary[symbol][stage] = {'count': histogram.total, 'p50': p50, 'p99': p99, 'max': histogram.max * scale}
+        return summary
+
+    def log_summary(self):
+        for symbol, stages in self.summary().items():
+            for stage, stats in stages.items():
+                unit = 'ms' if stage in self.LATENCY_STAGES else 'points'
+                logger.info("Order %s for %s: p50 %.3f %s, p99 %.3f %s, max %.3f %s over %s orders", stage, symbol,
+                            stats['p50'], unit, stats['p99'], unit, stats['max'], unit, stats['count'])
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+order_latency = OrderLatencyRecorder()
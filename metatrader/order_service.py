@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+import MetaTrader5 as mt5
+from config import Config
+from metatrader.latency import order_latency
+from metatrader.session import get_session
+from metatrader.symbol_cache import symbol_cache
+
+logger = logging.getLogger(__name__)
+
+# Resent at once with a fresh price while the latency budget lasts: requote, price changed, off quotes
+REPRICE_RETCODES = {10004, 10020, 10021}
+INVALID_STOPS_RETCODE = 10016
+
+class PendingOrder:
+    def __init__(self, request, submitted, signal_time=None):
+        self.request = request
+        self.submitted = submitted
+        self.signal_time = submitted if signal_time is None else signal_time
+        self.future = Future()
+        self.sends = 0
+        self.transport_errors = 0
+
+class OrderService:
+    """
+    Sends market orders without blocking the caller.
+
+    ``submit`` queues a trade request and returns a ``concurrent.futures.Future``
+    of the terminal's ``order_send`` result (None if the order never reached
+    the terminal). A dispatcher thread sends the queued orders on the session's
+    terminal thread, priced from the symbol's last tick. Requotes, price changes
+    and invalid stops are resent immediately with a fresh price while the order
+    is younger than ``latency_budget`` seconds, at most ``max_resends`` times,
+    and invalid stops only while widening them changes the request; only
+    transport failures (no
+    answer from the terminal) are retried later, with exponential backoff, and
+    other orders are sent in the meantime.
+
+    Every send is timed into ``order_latency``, from the ``signal_time`` passed
+    to ``submit`` (``clock`` seconds; the submit time by default).
+    """
+
+    def __init__(self, session=None, latency_budget=None, transport_retries=None, backoff=None, max_resends=None,
+                 clock=time.monotonic):
+        self.session = session or get_session()
+        self.latency_budget = Config.ORDER_LATENCY_BUDGET_SECONDS if latency_budget is None else latency_budget
+        self.max_resends = Config.ORDER_MAX_RESENDS if max_resends is None else max_resends
+        self.transport_retries = Config.ORDER_TRANSPORT_RETRIES if transport_retries is None else transport_retries
+        self.backoff = Config.ORDER_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+        self.clock = clock
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def submit(self, trade_request, signal_time=None):
+        """Queue ``trade_request`` and return the Future of its result."""
+        order = PendingOrder(dict(trade_request), self.clock(), signal_time)
+        with self._wakeup:
+            if self._closed:
+                raise RuntimeError("The order service is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='orders', daemon=True)
+                self._thread.start()
+            self._schedule(order, order.submitted)
+        return order.future
+
+    def _schedule(self, order, due):
+        with self._wakeup:
+            heapq.heappush(self._queue, (due, next(self._sequence), order))
+            self._wakeup.notify()
+
+    def close(self):
+        """Stop the dispatcher; orders still waiting for a retry are cancelled."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._closed and (not self._queue or self._queue[0][0] > self.clock()):
+                    self._wakeup.wait(self._queue[0][0] - self.clock() if self._queue else None)
+                if self._closed:
+                    for _, _, order in self._queue:
+                        order.future.cancel()
+                    self._queue.clear()
+                    return
+                _, _, order = heapq.heappop(self._queue)
+            self._dispatch(order)
+
+    def _dispatch(self, order):
+        symbol = order.request['symbol']
+        try:
+            result = self.session.call(self._send, order)
+        except Exception as e:
+            logger.error("Order for %s failed to reach the terminal: %s", symbol, e)
+            result = None
+        if result is None and order.transport_errors < self.transport_retries:
+            delay = self.backoff * 2 ** order.transport_errors
+            order.transport_errors += 1
+            logger.warning("Retrying the %s order in %s seconds... Current attempt: %s/%s", symbol, delay,
+                           order.transport_errors, self.transport_retries)
+            self._schedule(order, self.clock() + delay)
+            return
+        order.future.set_result(result)
+
+    def _send(self, order):
+        """Send ``order`` until it is not requoted or its latency budget is spent; runs on the terminal thread."""
+        request = order.request
+        symbol = request['symbol']
+        if not symbol_cache.select(symbol):
+            return None
+        while True:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is None:
+                logger.error("No price for %s: %s", symbol, mt5.last_error())
+                return None
+            request['action'] = mt5.TRADE_ACTION_DEAL
+            request['price'] = tick.ask if request['type'] == mt5.ORDER_TYPE_BUY else tick.bid
+            logger.info("Sending %s order at %s, SL: %s, TP: %s, volume: %s", symbol, request['price'], request['sl'],
+                        request['tp'], request['volume'])
+            sent = self.clock()
+            result = mt5.order_send(dict(request))
+            order_latency.record_order_send(request, result, sent, self.clock(), order.signal_time, order.sends == 0)
+            order.sends += 1
+            if result is None:
+                logger.error("mt5.order_send returned None. Error code: %s", mt5.last_error())
+                return None
+            if result.retcode not in REPRICE_RETCODES and result.retcode != INVALID_STOPS_RETCODE:
+                return result
+            if self.clock() - order.submitted >= self.latency_budget:
+                logger.error("%s order still rejected with retcode %s after %s send(s); latency budget of %s seconds spent.",
+                             symbol, result.retcode, order.sends, self.latency_budget)
+                return result
+            if order.sends > self.max_resends:
+                logger.error("%s order still rejected with retcode %s after %s send(s).", symbol, result.retcode,
+                             order.sends)
+                return result
+            if result.retcode == INVALID_STOPS_RETCODE:
+                if not self._widen_stops(request):
+                    logger.error("Invalid stops for %s and no wider SL/TP to try: %s", symbol, result.comment)
+                    return result
+                logger.warning("Invalid stops for %s. Adjusting SL and TP.", symbol)
+            else:
+                logger.warning("%s order requoted (retcode %s). Resending at the new price.", symbol, result.retcode)
+
+    def _widen_stops(self, request):
+        """Move SL and TP at least the broker's stops level away from the price; False if they did not change."""
+        stops = (request['sl'], request['tp'])
+        distance = symbol_cache.min_stop_distance(request['symbol'])
+        if request['type'] == mt5.ORDER_TYPE_BUY:
+            request['sl'] = min(request['sl'], request['price'] - distance)
+            request['tp'] = max(request['tp'], request['price'] + distance)
+        else:
+            request['sl'] = max(request['sl'], request['price'] + distance)
+            request['tp'] = min(request['tp'], request['price'] - distance)
+        return (request['sl'], request['tp']) != stops
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import MetaTrader5 as mt5
+from config import Config
+from metatrader.symbol_cache import symbol_cache
+
+logger = logging.getLogger(__name__)
+
+class MT5Session:
+    """
+    The one connection to the MetaTrader 5 terminal.
+
+    The MetaTrader5 package is not thread-safe, so every terminal call goes
+    through ``call`` (or ``submit``), which runs it on the session's single
+    terminal thread; calls made from that thread run directly. ``connect``
+    initializes the terminal only when it is not connected yet, and
+    ``heartbeat`` checks it with one ``terminal_info`` call, reconnecting with
+    exponential backoff when the terminal or its broker connection is gone.
+    """
+
+    def __init__(self, path=None, reconnect_attempts=None, backoff=None, max_backoff=None, sleep=time.sleep):
+        self.path = Config.MT5_PATH if path is None else path
+        self.reconnect_attempts = Config.MT5_RECONNECT_ATTEMPTS if reconnect_attempts is None else reconnect_attempts
+        self.backoff = Config.MT5_RECONNECT_BACKOFF_SECONDS if backoff is None else backoff
+        self.max_backoff = Config.MT5_RECONNECT_MAX_BACKOFF_SECONDS if max_backoff is None else max_backoff
+        self.sleep = sleep
+        self.credentials = {}
+        self.connected = False
+        self._thread_id = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mt5', initializer=self._register_thread)
+
+    def _register_thread(self):
+        self._thread_id = threading.get_ident()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func`` on the terminal thread and return its Future."""
+        return self._executor.submit(func, *args, **kwargs)
+
+    def call(self, func, *args, **kwargs):
+        """Run ``func`` on the terminal thread and return its result."""
+        if threading.get_ident() == self._thread_id:
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def _initialize(self):
+        kwargs = dict(self.credentials, path=self.path) if self.path else dict(self.credentials)
+        if not mt5.initialize(**kwargs):
+            logger.error("Failed to initialize MetaTrader5: %s", mt5.last_error())
+            mt5.shutdown()
+            self.connected = False
+            return False
+        # Symbol settings are re-read after every (re)connection
+        symbol_cache.invalidate()
+        self.connected = True
+        logger.info("MetaTrader5 terminal initialized.")
+        return True
+
+    def initialize(self, path=None, **credentials):
+        """
+        Initialize the terminal (again), optionally at another ``path`` or with
+        ``login``, ``password`` and ``server``, which reconnects then reuse.
+        """
+        if path is not None:
+            self.path = path
+        if credentials:
+            self.credentials = credentials
+        return self.call(self._initialize)
+
+    def connect(self):
+        """Initialize the terminal unless this session already did; True when connected."""
+        return self.call(lambda: self.connected or self._initialize())
+
+    def shutdown(self):
+        def close():
+            mt5.shutdown()
+            self.connected = False
+        self.call(close)
+
+    def _healthy(self):
+        info = mt5.terminal_info()
+        return info is not None and bool(info.connected)
+
+    def _reconnect(self):
+        delay = self.backoff
+        for attempt in range(1, self.reconnect_attempts + 1):
+            mt5.shutdown()
+            self.connected = False
+            if self._initialize() and self._healthy():
+                logger.info("Reconnected to the MetaTrader5 terminal after %s attempt(s).", attempt)
+                return True
+            if attempt < self.reconnect_attempts:
+                logger.warning("Reconnect attempt %s/%s failed, retrying in %s seconds.", attempt,
+                               self.reconnect_attempts, delay)
+                self.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        logger.error("Could not reconnect to the MetaTrader5 terminal.")
+        return False
+
+    def heartbeat(self):
+        """Check the terminal connection and reconnect if it dropped; False if it stays down."""
+        def check():
+            if self.connected and self._healthy():
+                return True
+            logger.warning("MetaTrader5 terminal connection lost, reconnecting...")
+            return self._reconnect()
+        return self.call(check)
+
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = MT5Session()
+    return _session
@@ -0,0 +1,74 @@
+import logging
+import threading
+import time
+import MetaTrader5 as mt5
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class SymbolCache:
+    """
+    ``mt5.symbol_info`` per symbol, fetched once and reused for ``ttl`` seconds.
+
+    Point, digits, stops level, filling modes, volume limits and trade mode
+    only change between sessions, so orders read them from here instead of
+    asking the terminal on every attempt. ``invalidate`` drops everything
+    cached; call it whenever the terminal is (re)initialized.
+    """
+
+    def __init__(self, ttl=None, clock=time.monotonic):
+        self.ttl = Config.SYMBOL_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.clock = clock
+        self._entries = {}
+        self._selected = set()
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        """The terminal's symbol info for ``symbol``, or None if the terminal does not know it."""
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                return entry[1]
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            logger.warning("Symbol info unavailable for %s: %s", symbol, mt5.last_error())
+            return None
+        with self._lock:
+            self._entries[symbol] = (self.clock(), info)
+        return info
+
+    def select(self, symbol):
+        """Make ``symbol`` visible in Market Watch once per session; False if it cannot be traded."""
+        if symbol in self._selected:
+            return True
+        info = self.get(symbol)
+        if info is None:
+            logger.error("Symbol %s is not available.", symbol)
+            return False
+        if not info.visible:
+            logger.info("Symbol %s is not visible, attempting to make it visible.", symbol)
+            if not mt5.symbol_select(symbol, True):
+                logger.error("Failed to select symbol %s", symbol)
+                return False
+            self.invalidate(symbol)
+        with self._lock:
+            self._selected.add(symbol)
+        return True
+
+    def min_stop_distance(self, symbol):
+        """The broker's minimum SL/TP distance from the price for ``symbol``, in price units."""
+        info = self.get(symbol)
+        if info is None:
+            return 0.0
+        return info.trade_stops_level * info.point
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                self._selected.clear()
+            else:
+                self._entries.pop(symbol, None)
+                self._selected.discard(symbol)
+
+symbol_cache = SymbolCache()
@@ -1,4 +1,6 @@
+import time
 import MetaTrader5 as mt5
+from metatrader.latency import order_latency
 
 def place_order(symbol, order_type, volume, price=None, sl=None, tp=None):
     try:
@@ -17,7 +19,9 @@ def place_order(symbol, order_type, volume, price=None, sl=None, tp=None):
             "type_time": mt5.ORDER_TIME_GTC,
             "type_filling": mt5.ORDER_FILLING_IOC,
         }
+        sent = time.monotonic()
         result = mt5.order_send(request)
+        order_latency.record_order_send(request, result, sent, time.monotonic())
         return result.comment if result else 'Order failed'
     except Exception as e:
         return f'Order failed: {str(e)}'
@@ -0,0 +1 @@
+from .terminal import SimulatedTerminal, install, uninstall
@@ -0,0 +1,899 @@
+import logging
+import random
+import sys
+import threading
+import time
+import types
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from backtesting.exits import TIE_BREAK_RULES, exit_fill, first_crossing
+
+logger = logging.getLogger(__name__)
+
+# Constants of the MetaTrader5 package, with the terminal's own values
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60,
+    TIMEFRAME_M5: 300,
+    TIMEFRAME_M15: 900,
+    TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600,
+    TIMEFRAME_H4: 14400,
+    TIMEFRAME_D1: 86400,
+}
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_REMOVE = 8
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_TRADE_DISABLED = 10017
+TRADE_RETCODE_MARKET_CLOSED = 10018
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_REASON_EXPERT = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL_CONNECT = -10004
+
+CONSTANT_PREFIXES = ('TIMEFRAME_', 'ORDER_', 'POSITION_', 'SYMBOL_', 'TRADE_', 'DEAL_', 'COPY_TICKS_', 'RES_')
+
+# Functions of the MetaTrader5 package the simulated terminal implements
+API = (
+    'initialize', 'login', 'shutdown', 'version', 'last_error', 'last_error_description',
+    'terminal_info', 'account_info', 'symbols_total', 'symbols_get', 'symbol_info',
+    'symbol_info_tick', 'symbol_select', 'copy_rates_from', 'copy_rates_from_pos',
+    'copy_rates_range', 'copy_ticks_from', 'copy_ticks_range', 'order_check', 'order_send',
+    'orders_total', 'orders_get', 'positions_total', 'positions_get', 'history_deals_get',
+)
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+TICKS_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last', 'volume', 'time_msc', 'flags', 'volume_real'])
+SymbolInfo = namedtuple('SymbolInfo', [
+    'name', 'visible', 'select', 'point', 'digits', 'spread', 'trade_stops_level', 'trade_freeze_level',
+    'trade_contract_size', 'volume_min', 'volume_max', 'volume_step', 'filling_mode', 'bid', 'ask', 'time',
+])
+AccountInfo = namedtuple('AccountInfo', [
+    'login', 'trade_allowed', 'leverage', 'balance', 'profit', 'equity', 'margin', 'margin_free',
+    'margin_level', 'currency', 'server', 'name', 'company',
+])
+TerminalInfo = namedtuple('TerminalInfo', ['connected', 'trade_allowed', 'build', 'name', 'company', 'path', 'ping_last'])
+TradePosition = namedtuple('TradePosition', [
+    'ticket', 'time', 'time_msc', 'type', 'magic', 'identifier', 'reason', 'volume', 'price_open',
+    'sl', 'tp', 'price_current', 'swap', 'profit', 'symbol', 'comment',
+])
+TradeOrder = namedtuple('TradeOrder', [
+    'ticket', 'time_setup', 'time_setup_msc', 'type', 'magic', 'volume_initial', 'volume_current',
+    'price_open', 'sl', 'tp', 'price_current', 'symbol', 'comment',
+])
+TradeDeal = namedtuple('TradeDeal', [
+    'ticket', 'order', 'time', 'time_msc', 'type', 'entry', 'magic', 'position_id', 'reason',
+    'volume', 'price', 'profit', 'symbol', 'comment',
+])
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment', 'request_id',
+    'retcode_external', 'request',
+])
+OrderCheckResult = namedtuple('OrderCheckResult', [
+    'retcode', 'balance', 'equity', 'profit', 'margin', 'margin_free', 'margin_level', 'comment', 'request',
+])
+
+RETCODE_COMMENTS = {
+    TRADE_RETCODE_REQUOTE: 'Requote',
+    TRADE_RETCODE_DONE: 'Request executed',
+    TRADE_RETCODE_INVALID: 'Invalid request',
+    TRADE_RETCODE_INVALID_VOLUME: 'Invalid volume',
+    TRADE_RETCODE_INVALID_PRICE: 'Invalid price',
+    TRADE_RETCODE_INVALID_STOPS: 'Invalid stops',
+    TRADE_RETCODE_TRADE_DISABLED: 'Trade disabled',
+    TRADE_RETCODE_MARKET_CLOSED: 'Market closed',
+    TRADE_RETCODE_NO_MONEY: 'No money',
+    TRADE_RETCODE_POSITION_CLOSED: "Position doesn't exist",
+}
+
+def to_epoch(value):
+    """Seconds since the epoch of a datetime-like value or a number of seconds."""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    return int(pd.Timestamp(value).timestamp())
+
+def epoch_array(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[s]').astype(np.int64)
+    if values.dtype == object:
+        return pd.to_datetime(values).values.astype('datetime64[s]').astype(np.int64)
+    return values.astype(np.int64)
+
+def resample_rates(rates, seconds):
+    """Aggregate consecutive rates into ``seconds``-long bars aligned to the epoch."""
+    if len(rates) == 0:
+        return np.empty(0, dtype=RATES_DTYPE)
+    buckets = rates['time'] // seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rates)] - 1
+    result = np.empty(len(starts), dtype=RATES_DTYPE)
+    result['time'] = buckets[starts] * seconds
+    result['open'] = rates['open'][starts]
+    result['high'] = np.maximum.reduceat(rates['high'], starts)
+    result['low'] = np.minimum.reduceat(rates['low'], starts)
+    result['close'] = rates['close'][ends]
+    result['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    result['spread'] = np.minimum.reduceat(rates['spread'], starts)
+    result['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    return result
+
+class SymbolSpec:
+    """Static contract specification of a simulated symbol."""
+
+    def __init__(self, name, point=0.00001, digits=5, spread=0, stops_level=0, contract_size=100000,
+                 volume_min=0.01, volume_max=100.0, volume_step=0.01, filling_mode=SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC):
+        self.name = name
+        self.point = point
+        self.digits = digits
+        self.spread = spread
+        self.stops_level = stops_level
+        self.contract_size = contract_size
+        self.volume_min = volume_min
+        self.volume_max = volume_max
+        self.volume_step = volume_step
+        self.filling_mode = filling_mode
+        self.visible = True
+
+class PriceFeed:
+    """
+    Replay of one symbol as a series of events (bar closes or ticks), each
+    with the bid/ask range traded since the previous event.
+
+    ``pos`` counts the events already replayed; they are the only ones the
+    terminal shows.
+    """
+
+    def __init__(self, event_msc, bid_open, bid_low, bid_high, bid_close, spread, rates=None, timeframe=None, ticks=None):
+        self.event_msc = event_msc
+        self.bid_open, self.bid_low, self.bid_high, self.bid_close = bid_open, bid_low, bid_high, bid_close
+        self.ask_open, self.ask_low, self.ask_high, self.ask_close = (
+            bid_open + spread, bid_low + spread, bid_high + spread, bid_close + spread)
+        self.rates = rates
+        self.timeframe = timeframe
+        self.ticks = ticks
+        self.pos = 0
+
+    @classmethod
+    def from_bars(cls, data, timeframe, point, default_spread=0):
+        seconds = TIMEFRAME_SECONDS[timeframe]
+        rates = np.zeros(len(data['time']), dtype=RATES_DTYPE)
+        rates['time'] = epoch_array(data['time'])
+        for field in ('open', 'high', 'low', 'close', 'tick_volume', 'real_volume'):
+            if field in data:
+                rates[field] = np.asarray(data[field])
+        rates['spread'] = np.asarray(data['spread']) if 'spread' in data else default_spread
+        spread = rates['spread'] * point
+        return cls((rates['time'] + seconds) * 1000, rates['open'], rates['low'], rates['high'], rates['close'],
+                   spread, rates=rates, timeframe=timeframe)
+
+    @classmethod
+    def from_ticks(cls, data):
+        ticks = np.zeros(len(data['bid']), dtype=TICKS_DTYPE)
+        ticks['time_msc'] = np.asarray(data['time_msc']) if 'time_msc' in data else epoch_array(data['time']) * 1000
+        ticks['time'] = ticks['time_msc'] // 1000
+        for field in ('bid', 'ask', 'last', 'volume', 'flags', 'volume_real'):
+            if field in data:
+                ticks[field] = np.asarray(data[field])
+        bid = ticks['bid']
+        return cls(ticks['time_msc'], bid, bid, bid, bid, ticks['ask'] - bid, ticks=ticks)
+
+    @property
+    def exhausted(self):
+        return self.pos >= len(self.event_msc)
+
+    def visible_rates(self, timeframe, point):
+        seconds = TIMEFRAME_SECONDS.get(timeframe)
+        if seconds is None:
+            return None
+        if self.rates is not None:
+            base = self.rates[:self.pos]
+            if timeframe == self.timeframe:
+                return base
+            base_seconds = TIMEFRAME_SECONDS[self.timeframe]
+            if seconds < base_seconds or seconds % base_seconds:
+                return None
+            return resample_rates(base, seconds)
+        ticks = self.ticks[:self.pos]
+        rates = np.zeros(len(ticks), dtype=RATES_DTYPE)
+        rates['time'] = ticks['time']
+        for field in ('open', 'high', 'low', 'close'):
+            rates[field] = ticks['bid']
+        rates['tick_volume'] = 1
+        rates['spread'] = np.rint((ticks['ask'] - ticks['bid']) / point)
+        rates['real_volume'] = ticks['volume']
+        return resample_rates(rates, seconds)
+
+    def visible_ticks(self):
+        if self.ticks is not None:
+            return self.ticks[:self.pos]
+        ticks = np.zeros(self.pos, dtype=TICKS_DTYPE)
+        ticks['time_msc'] = self.event_msc[:self.pos]
+        ticks['time'] = ticks['time_msc'] // 1000
+        ticks['bid'] = self.bid_close[:self.pos]
+        ticks['ask'] = self.ask_close[:self.pos]
+        return ticks
+
+class SimulatedTerminal:
+    """
+    Offline stand-in for the MetaTrader5 package.
+
+    Replays stored bars or ticks per symbol, keeps positions, pending orders
+    and account equity, closes positions at their SL/TP as prices cross them
+    (with the same fills and tie-break as the backtest) and answers
+    ``order_send`` with the terminal's retcodes. ``latency`` (seconds, a
+    ``(low, high)`` range or a callable) delays every trade request and
+    ``call_latency`` every other call, to mimic the IPC round trip.
+
+    Bar feeds step from one bar close to the next, so the newest rate is
+    always the bar that just closed and the quote is its close.
+    """
+
+    def __init__(self, balance=10000.0, leverage=100, currency='USD', latency=0.0, call_latency=0.0,
+                 requote_rate=0.0, tie_break='stop_first', trade_allowed=True, seed=None, sleep=time.sleep):
+        if tie_break not in TIE_BREAK_RULES:
+            raise ValueError(f"Unknown tie_break {tie_break!r}. Expected one of {TIE_BREAK_RULES}")
+        self.balance = float(balance)
+        self.leverage = leverage
+        self.currency = currency
+        self.latency = latency
+        self.call_latency = call_latency
+        self.requote_rate = requote_rate
+        self.tie_break = tie_break
+        self.trade_allowed = trade_allowed
+        self.sleep = sleep
+        self.symbols = {}
+        self.feeds = {}
+        self.positions = {}
+        self.orders = {}
+        self.deals = []
+        self.connected = False
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._error = (RES_S_OK, 'Success')
+        self._next_ticket = 1
+        self._now_msc = 0
+
+    @classmethod
+    def from_source(cls, source, symbols, timeframe, start_date, end_date, **kwargs):
+        """A terminal replaying ``source.get_bars`` (any data source) for each symbol."""
+        terminal = cls(**kwargs)
+        for symbol in symbols:
+            data = source.get_bars(symbol, timeframe, start_date, end_date)
+            if data is None or len(data) == 0:
+                logger.warning(f"No bars to replay for {symbol}")
+                continue
+            terminal.add_bars(symbol, data, timeframe)
+        return terminal
+
+    # Replay data and clock
+
+    def add_symbol(self, name, **spec):
+        self.symbols[name] = SymbolSpec(name, **spec)
+        return self.symbols[name]
+
+    def add_bars(self, symbol, data, timeframe=TIMEFRAME_H1):
+        """Replay ``data`` (a DataFrame or mapping of OHLC arrays, spread in points) for ``symbol``."""
+        spec = self.symbols.get(symbol) or self.add_symbol(symbol)
+        with self._lock:
+            self.feeds[symbol] = PriceFeed.from_bars(data, timeframe, spec.point, spec.spread)
+
+    def add_ticks(self, symbol, data):
+        """Replay bid/ask ticks (``time`` or ``time_msc``, ``bid``, ``ask``) for ``symbol``."""
+        if symbol not in self.symbols:
+            self.add_symbol(symbol)
+        with self._lock:
+            self.feeds[symbol] = PriceFeed.from_ticks(data)
+
+    @property
+    def now(self):
+        return self._now_msc // 1000
+
+    def step(self):
+        """Advance to the next bar close or tick of any symbol; False once every feed is replayed."""
+        with self._lock:
+            upcoming = [int(feed.event_msc[feed.pos]) for feed in self.feeds.values() if not feed.exhausted]
+            if not upcoming:
+                return False
+            self._advance(min(upcoming))
+            return True
+
+    def advance_to(self, when):
+        """Replay every event up to ``when`` (a datetime or epoch seconds)."""
+        with self._lock:
+            self._advance(to_epoch(when) * 1000)
+
+    def advance(self, seconds):
+        with self._lock:
+            self._advance(self._now_msc + int(seconds * 1000))
+
+    def _advance(self, until_msc):
+        for symbol, feed in self.feeds.items():
+            end = int(np.searchsorted(feed.event_msc, until_msc, side='right'))
+            while feed.pos < end:
+                index = self._next_trigger(symbol, feed, end)
+                if index < 0:
+                    feed.pos = end
+                    break
+                feed.pos = index + 1
+                self._trigger(symbol, feed, index)
+        self._now_msc = max(self._now_msc, until_msc)
+
+    def _next_trigger(self, symbol, feed, end):
+        """Index of the first event before ``end`` that reaches an SL/TP or pending order price; -1 if none."""
+        hits = []
+        for position in self.positions.values():
+            if position['symbol'] != symbol:
+                continue
+            is_buy = position['type'] == POSITION_TYPE_BUY
+            if position['sl']:
+                hits.append(first_crossing(feed.bid_low if is_buy else feed.ask_high, position['sl'], feed.pos, end, above=not is_buy))
+            if position['tp']:
+                hits.append(first_crossing(feed.bid_high if is_buy else feed.ask_low, position['tp'], feed.pos, end, above=is_buy))
+        for order in self.orders.values():
+            if order['symbol'] == symbol:
+                values, above = self._order_trigger(feed, order['type'])
+                hits.append(first_crossing(values, order['price_open'], feed.pos, end, above=above))
+        hits = [hit for hit in hits if hit >= 0]
+        return min(hits) if hits else -1
+
+    @staticmethod
+    def _order_trigger(feed, order_type):
+        if order_type == ORDER_TYPE_BUY_LIMIT:
+            return feed.ask_low, False
+        if order_type == ORDER_TYPE_SELL_LIMIT:
+            return feed.bid_high, True
+        if order_type == ORDER_TYPE_BUY_STOP:
+            return feed.ask_high, True
+        return feed.bid_low, False
+
+    def _trigger(self, symbol, feed, index):
+        when = int(feed.event_msc[index])
+        for position in [p for p in self.positions.values() if p['symbol'] == symbol]:
+            is_buy = position['type'] == POSITION_TYPE_BUY
+            sl, tp = position['sl'], position['tp']
+            if is_buy:
+                hit_sl = bool(sl) and feed.bid_low[index] <= sl
+                hit_tp = bool(tp) and feed.bid_high[index] >= tp
+                bar_open = feed.bid_open[index]
+            else:
+                hit_sl = bool(sl) and feed.ask_high[index] >= sl
+                hit_tp = bool(tp) and feed.ask_low[index] <= tp
+                bar_open = feed.ask_open[index]
+            if hit_sl or hit_tp:
+                price, reason = exit_fill(bar_open, is_buy, sl, tp, hit_sl, hit_tp, self.tie_break)
+                self._close(position, position['volume'], float(price),
+                            DEAL_REASON_SL if reason == 'stop_loss' else DEAL_REASON_TP, when)
+        for order in [o for o in self.orders.values() if o['symbol'] == symbol]:
+            values, above = self._order_trigger(feed, order['type'])
+            level = order['price_open']
+            if (values[index] >= level) if above else (values[index] <= level):
+                is_buy = order['type'] in (ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_BUY_STOP)
+                bar_open = feed.ask_open[index] if is_buy else feed.bid_open[index]
+                # A gap through the order price fills at the open, whichever side of it that lands
+                gapped = (bar_open >= level) if above else (bar_open <= level)
+                del self.orders[order['ticket']]
+                self._open(symbol, POSITION_TYPE_BUY if is_buy else POSITION_TYPE_SELL, order['volume_current'],
+                           float(bar_open if gapped else level), order['sl'], order['tp'], order['magic'],
+                           order['comment'], when, order=order['ticket'])
+
+    # Account bookkeeping
+
+    def _ticket(self):
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _quote(self, symbol):
+        feed = self.feeds.get(symbol)
+        if feed is None or feed.pos == 0:
+            return None
+        index = feed.pos - 1
+        return float(feed.bid_close[index]), float(feed.ask_close[index]), int(feed.event_msc[index])
+
+    def _position_profit(self, position, bid, ask):
+        contract = self.symbols[position['symbol']].contract_size * position['volume']
+        if position['type'] == POSITION_TYPE_BUY:
+            return (bid - position['price_open']) * contract
+        return (position['price_open'] - ask) * contract
+
+    def _margin(self, symbol, volume, price):
+        return volume * self.symbols[symbol].contract_size * price / self.leverage
+
+    def _floating(self):
+        profit = margin = 0.0
+        for position in self.positions.values():
+            bid, ask, _ = self._quote(position['symbol'])
+            profit += self._position_profit(position, bid, ask)
+            margin += self._margin(position['symbol'], position['volume'], position['price_open'])
+        return profit, margin
+
+    def _deal(self, position, deal_type, entry, volume, price, profit, reason, when, order):
+        deal = TradeDeal(self._ticket(), order, when // 1000, when, deal_type, entry, position['magic'],
+                         position['ticket'], reason, volume, price, profit, position['symbol'], position['comment'])
+        self.deals.append(deal)
+        return deal
+
+    def _open(self, symbol, position_type, volume, price, sl, tp, magic, comment, when, order=None):
+        ticket = self._ticket()
+        order = ticket if order is None else order
+        position = {
+            'ticket': ticket, 'time': when // 1000, 'time_msc': when, 'type': position_type, 'magic': magic,
+            'identifier': ticket, 'reason': DEAL_REASON_EXPERT, 'volume': volume, 'price_open': price,
+            'sl': sl or 0.0, 'tp': tp or 0.0, 'swap': 0.0, 'symbol': symbol, 'comment': comment,
+        }
+        self.positions[ticket] = position
+        deal_type = DEAL_TYPE_BUY if position_type == POSITION_TYPE_BUY else DEAL_TYPE_SELL
+        return self._deal(position, deal_type, DEAL_ENTRY_IN, volume, price, 0.0, DEAL_REASON_EXPERT, when, order)
+
+    def _close(self, position, volume, price, reason, when, order=None):
+        profit = self._position_profit(dict(position, volume=volume), price, price)
+        self.balance += profit
+        if volume >= position['volume'] - 1e-9:
+            del self.positions[position['ticket']]
+        else:
+            position['volume'] = round(position['volume'] - volume, 8)
+        deal_type = DEAL_TYPE_SELL if position['type'] == POSITION_TYPE_BUY else DEAL_TYPE_BUY
+        deal = self._deal(position, deal_type, DEAL_ENTRY_OUT, volume, price, profit, reason, when,
+                          position['ticket'] if order is None else order)
+        logger.debug(f"Closed position {position['ticket']} on {position['symbol']} at {price} ({profit:.2f})")
+        return deal
+
+    # MetaTrader5 API
+
+    def _delay(self, latency):
+        if callable(latency):
+            seconds = latency()
+        elif isinstance(latency, tuple):
+            seconds = self._random.uniform(*latency)
+        else:
+            seconds = latency
+        if seconds > 0:
+            self.sleep(seconds)
+
+    def _ipc(self, latency=None):
+        """Apply the call latency; False (with last_error set) when the terminal is not initialized."""
+        self._delay(self.call_latency if latency is None else latency)
+        if not self.connected:
+            self._error = (RES_E_INTERNAL_FAIL_CONNECT, 'IPC initialize failed, MetaTrader 5 x64 not found')
+            return False
+        return True
+
+    def _fail(self, code, description):
+        self._error = (code, description)
+        return None
+
+    def initialize(self, *args, **kwargs):
+        self._delay(self.call_latency)
+        self.connected = True
+        self._error = (RES_S_OK, 'Success')
+        return True
+
+    def login(self, *args, **kwargs):
+        return self._ipc()
+
+    def shutdown(self):
+        self.connected = False
+        return True
+
+    def version(self):
+        if not self._ipc():
+            return None
+        return (500, 4000, '1 Jan 2024')
+
+    def last_error(self):
+        return self._error
+
+    def last_error_description(self):
+        return self._error[1]
+
+    def terminal_info(self):
+        if not self._ipc():
+            return None
+        latency = self.latency if isinstance(self.latency, (int, float)) else 0
+        return TerminalInfo(self.connected, self.trade_allowed, 4000, 'MetaTrader 5 Simulator', 'Simulator', '', int(latency * 1e6))
+
+    def account_info(self):
+        if not self._ipc():
+            return None
+        with self._lock:
+            profit, margin = self._floating()
+            equity = self.balance + profit
+            return AccountInfo(1, self.trade_allowed, self.leverage, self.balance, profit, equity, margin,
+                               equity - margin, equity / margin * 100 if margin else 0.0, self.currency,
+                               'Simulator', 'Simulator', 'Simulator')
+
+    def _symbol_info(self, spec):
+        quote = self._quote(spec.name)
+        bid, ask, when = quote if quote else (0.0, 0.0, 0)
+        return SymbolInfo(spec.name, spec.visible, spec.visible, spec.point, spec.digits, spec.spread,
+                          spec.stops_level, 0, spec.contract_size, spec.volume_min, spec.volume_max,
+                          spec.volume_step, spec.filling_mode, bid, ask, when // 1000)
+
+    def symbols_total(self):
+        if not self._ipc():
+            return None
+        return len(self.symbols)
+
+    def symbols_get(self, group=None):
+        if not self._ipc():
+            return None
+        with self._lock:
+            return tuple(self._symbol_info(spec) for spec in self.symbols.values())
+
+    def symbol_info(self, symbol):
+        if not self._ipc():
+            return None
+        with self._lock:
+            if symbol not in self.symbols:
+                return self._fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+            return self._symbol_info(self.symbols[symbol])
+
+    def symbol_info_tick(self, symbol):
+        if not self._ipc():
+            return None
+        with self._lock:
+            quote = self._quote(symbol)
+            if quote is None:
+                return self._fail(RES_E_NOT_FOUND, f'No ticks for {symbol}')
+            bid, ask, when = quote
+            return Tick(when // 1000, bid, ask, bid, 0, when, 0, 0.0)
+
+    def symbol_select(self, symbol, enable=True):
+        if not self._ipc():
+            return False
+        if symbol not in self.symbols:
+            self._fail(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+            return False
+        self.symbols[symbol].visible = enable
+        return True
+
+    def _rates(self, symbol, timeframe):
+        if not self._ipc():
+            return None
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            return self._fail(RES_E_NOT_FOUND, f'No rates for {symbol}')
+        rates = feed.visible_rates(timeframe, self.symbols[symbol].point)
+        if rates is None:
+            return self._fail(RES_E_INVALID_PARAMS, f'Timeframe {timeframe} cannot be built from the replayed data')
+        return rates
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        with self._lock:
+            rates = self._rates(symbol, timeframe)
+            if rates is None:
+                return None
+            end = int(np.searchsorted(rates['time'], to_epoch(date_from), side='right'))
+            return rates[max(end - count, 0):end].copy()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        with self._lock:
+            rates = self._rates(symbol, timeframe)
+            if rates is None:
+                return None
+            end = max(len(rates) - start_pos, 0)
+            return rates[max(end - count, 0):end].copy()
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        with self._lock:
+            rates = self._rates(symbol, timeframe)
+            if rates is None:
+                return None
+            lo = int(np.searchsorted(rates['time'], to_epoch(date_from), side='left'))
+            hi = int(np.searchsorted(rates['time'], to_epoch(date_to), side='right'))
+            return rates[lo:hi].copy()
+
+    def _ticks(self, symbol):
+        if not self._ipc():
+            return None
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            return self._fail(RES_E_NOT_FOUND, f'No ticks for {symbol}')
+        return feed.visible_ticks()
+
+    def copy_ticks_from(self, symbol, date_from, count, flags=COPY_TICKS_ALL):
+        with self._lock:
+            ticks = self._ticks(symbol)
+            if ticks is None:
+                return None
+            start = int(np.searchsorted(ticks['time_msc'], to_epoch(date_from) * 1000, side='left'))
+            return ticks[start:start + count].copy()
+
+    def copy_ticks_range(self, symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+        with self._lock:
+            ticks = self._ticks(symbol)
+            if ticks is None:
+                return None
+            lo = int(np.searchsorted(ticks['time_msc'], to_epoch(date_from) * 1000, side='left'))
+            hi = int(np.searchsorted(ticks['time_msc'], to_epoch(date_to) * 1000, side='right'))
+            return ticks[lo:hi].copy()
+
+    def positions_total(self):
+        if not self._ipc():
+            return None
+        return len(self.positions)
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        if not self._ipc():
+            return None
+        with self._lock:
+            result = []
+            for position in self.positions.values():
+                if (symbol is not None and position['symbol'] != symbol) or (ticket is not None and position['ticket'] != ticket):
+                    continue
+                bid, ask, _ = self._quote(position['symbol'])
+                current = bid if position['type'] == POSITION_TYPE_BUY else ask
+                result.append(TradePosition(price_current=current, profit=self._position_profit(position, bid, ask), **position))
+            return tuple(result)
+
+    def orders_total(self):
+        if not self._ipc():
+            return None
+        return len(self.orders)
+
+    def orders_get(self, symbol=None, group=None, ticket=None):
+        if not self._ipc():
+            return None
+        with self._lock:
+            return tuple(TradeOrder(**order) for order in self.orders.values()
+                         if (symbol is None or order['symbol'] == symbol) and (ticket is None or order['ticket'] == ticket))
+
+    def history_deals_get(self, date_from=None, date_to=None, position=None, ticket=None):
+        if not self._ipc():
+            return None
+        with self._lock:
+            lo = to_epoch(date_from) if date_from is not None else None
+            hi = to_epoch(date_to) if date_to is not None else None
+            return tuple(deal for deal in self.deals
+                         if (lo is None or deal.time >= lo) and (hi is None or deal.time <= hi)
+                         and (position is None or deal.position_id == position) and (ticket is None or deal.ticket == ticket))
+
+    def _result(self, retcode, request, deal=0, order=0, volume=0.0, price=0.0, quote=None):
+        bid, ask = quote[:2] if quote else (0.0, 0.0)
+        return OrderSendResult(retcode, deal, order, volume, price, bid, ask, RETCODE_COMMENTS.get(retcode, ''),
+                               self.request_count, 0, request)
+
+    def _stops_valid(self, spec, position_type, sl, tp, bid, ask):
+        """MT5 checks buy stops against the bid and sell stops against the ask, at least stops_level away."""
+        distance = spec.stops_level * spec.point
+        if position_type == POSITION_TYPE_BUY:
+            return (not sl or sl <= bid - distance) and (not tp or tp >= bid + distance)
+        return (not sl or sl >= ask + distance) and (not tp or tp <= ask - distance)
+
+    def _volume_valid(self, spec, volume):
+        if volume is None or not spec.volume_min <= volume <= spec.volume_max:
+            return False
+        steps = volume / spec.volume_step
+        return abs(steps - round(steps)) < 1e-6
+
+    def _requoted(self, spec, request, market):
+        price, deviation = request.get('price'), request.get('deviation') or 0
+        if price and abs(price - market) > deviation * spec.point + 1e-12:
+            return True
+        return self.requote_rate > 0 and self._random.random() < self.requote_rate
+
+    def _check(self, request):
+        """Validate a trade request; returns ``(retcode, spec, quote)``."""
+        if not self.trade_allowed:
+            return TRADE_RETCODE_TRADE_DISABLED, None, None
+        spec = self.symbols.get(request.get('symbol'))
+        if spec is None:
+            return TRADE_RETCODE_INVALID, None, None
+        quote = self._quote(spec.name)
+        if quote is None:
+            return TRADE_RETCODE_MARKET_CLOSED, spec, None
+        return TRADE_RETCODE_DONE, spec, quote
+
+    def order_check(self, request):
+        if not self._ipc(self.latency):
+            return None
+        with self._lock:
+            retcode, spec, quote = self._check(request) if isinstance(request, dict) else (TRADE_RETCODE_INVALID, None, None)
+            if retcode == TRADE_RETCODE_DONE and not self._volume_valid(spec, request.get('volume')):
+                retcode = TRADE_RETCODE_INVALID_VOLUME
+            profit, margin = self._floating()
+            equity = self.balance + profit
+            if retcode == TRADE_RETCODE_DONE:
+                margin += self._margin(spec.name, request['volume'], quote[1])
+                retcode = 0 if equity - margin >= 0 else TRADE_RETCODE_NO_MONEY
+            return OrderCheckResult(retcode, self.balance, equity, profit, margin, equity - margin,
+                                    equity / margin * 100 if margin else 0.0, 'Done' if retcode == 0 else RETCODE_COMMENTS.get(retcode, ''), request)
+
+    def order_send(self, request):
+        if not self._ipc(self.latency):
+            return None
+        with self._lock:
+            self.request_count += 1
+            action = request.get('action')
+            if action == TRADE_ACTION_DEAL:
+                return self._send_deal(request)
+            if action == TRADE_ACTION_SLTP:
+                return self._send_sltp(request)
+            if action == TRADE_ACTION_PENDING:
+                return self._send_pending(request)
+            if action == TRADE_ACTION_REMOVE:
+                order = self.orders.pop(request.get('order'), None)
+                return self._result(TRADE_RETCODE_DONE if order else TRADE_RETCODE_INVALID, request,
+                                    order=request.get('order') or 0)
+            return self._result(TRADE_RETCODE_INVALID, request)
+
+    def _send_deal(self, request):
+        retcode, spec, quote = self._check(request)
+        if retcode != TRADE_RETCODE_DONE:
+            return self._result(retcode, request, quote=quote)
+        bid, ask, when = quote
+        volume = request.get('volume')
+        order_type = request.get('type')
+        if order_type not in (ORDER_TYPE_BUY, ORDER_TYPE_SELL):
+            return self._result(TRADE_RETCODE_INVALID, request, quote=quote)
+        if not self._volume_valid(spec, volume):
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, quote=quote)
+        market = ask if order_type == ORDER_TYPE_BUY else bid
+        if request.get('position'):
+            position = self.positions.get(request['position'])
+            if position is None or position['symbol'] != spec.name:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, quote=quote)
+            if self._requoted(spec, request, market):
+                return self._result(TRADE_RETCODE_REQUOTE, request, quote=quote)
+            deal = self._close(position, min(volume, position['volume']), market, DEAL_REASON_EXPERT, when, order=self._ticket())
+            return self._result(TRADE_RETCODE_DONE, request, deal.ticket, deal.order, deal.volume, market, quote)
+
+        position_type = POSITION_TYPE_BUY if order_type == ORDER_TYPE_BUY else POSITION_TYPE_SELL
+        sl, tp = request.get('sl'), request.get('tp')
+        if not self._stops_valid(spec, position_type, sl, tp, bid, ask):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, quote=quote)
+        if self._requoted(spec, request, market):
+            return self._result(TRADE_RETCODE_REQUOTE, request, quote=quote)
+        profit, margin = self._floating()
+        if self.balance + profit - margin < self._margin(spec.name, volume, market):
+            return self._result(TRADE_RETCODE_NO_MONEY, request, quote=quote)
+        deal = self._open(spec.name, position_type, volume, market, sl, tp, request.get('magic', 0),
+                          request.get('comment', ''), when)
+        return self._result(TRADE_RETCODE_DONE, request, deal.ticket, deal.order, volume, market, quote)
+
+    def _send_sltp(self, request):
+        position = self.positions.get(request.get('position'))
+        if position is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request)
+        spec = self.symbols[position['symbol']]
+        quote = self._quote(spec.name)
+        sl, tp = request.get('sl'), request.get('tp')
+        if not self._stops_valid(spec, position['type'], sl, tp, quote[0], quote[1]):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, quote=quote)
+        position['sl'], position['tp'] = sl or 0.0, tp or 0.0
+        return self._result(TRADE_RETCODE_DONE, request, quote=quote)
+
+    def _send_pending(self, request):
+        retcode, spec, quote = self._check(request)
+        if retcode != TRADE_RETCODE_DONE:
+            return self._result(retcode, request, quote=quote)
+        bid, ask, when = quote
+        order_type, price, volume = request.get('type'), request.get('price'), request.get('volume')
+        valid_price = {
+            ORDER_TYPE_BUY_LIMIT: lambda: price < ask,
+            ORDER_TYPE_SELL_LIMIT: lambda: price > bid,
+            ORDER_TYPE_BUY_STOP: lambda: price > ask,
+            ORDER_TYPE_SELL_STOP: lambda: price < bid,
+        }
+        if order_type not in valid_price or not price:
+            return self._result(TRADE_RETCODE_INVALID, request, quote=quote)
+        if not self._volume_valid(spec, volume):
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, quote=quote)
+        if not valid_price[order_type]():
+            return self._result(TRADE_RETCODE_INVALID_PRICE, request, quote=quote)
+        position_type = POSITION_TYPE_BUY if order_type in (ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_BUY_STOP) else POSITION_TYPE_SELL
+        sl, tp = request.get('sl'), request.get('tp')
+        if not self._stops_valid(spec, position_type, sl, tp, price, price):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, quote=quote)
+        ticket = self._ticket()
+        self.orders[ticket] = {
+            'ticket': ticket, 'time_setup': when // 1000, 'time_setup_msc': when, 'type': order_type,
+            'magic': request.get('magic', 0), 'volume_initial': volume, 'volume_current': volume,
+            'price_open': price, 'sl': sl or 0.0, 'tp': tp or 0.0, 'price_current': ask if position_type == POSITION_TYPE_BUY else bid,
+            'symbol': spec.name, 'comment': request.get('comment', ''),
+        }
+        return self._result(TRADE_RETCODE_DONE, request, order=ticket, volume=volume, price=price, quote=quote)
+
+    def as_module(self):
+        """A ``MetaTrader5`` module object whose functions are bound to this terminal."""
+        module = types.ModuleType('MetaTrader5', 'Simulated MetaTrader5 terminal')
+        for name, value in globals().items():
+            if name.startswith(CONSTANT_PREFIXES):
+                setattr(module, name, value)
+        for name in API:
+            setattr(module, name, getattr(self, name))
+        module.terminal = self
+        return module
+
+def install(terminal=None, **kwargs):
+    """
+    Make ``import MetaTrader5`` resolve to a simulated terminal and return it.
+
+    Modules that already imported the package as ``mt5`` are rebound too, so
+    the strategy, data retrieval and main loop talk to the simulator unchanged.
+    """
+    terminal = terminal or SimulatedTerminal(**kwargs)
+    module = terminal.as_module()
+    module.replaced = sys.modules.get('MetaTrader5')
+    _rebind(module.replaced, module)
+    sys.modules['MetaTrader5'] = module
+    return terminal
+
+def uninstall():
+    """Restore the MetaTrader5 module that ``install`` replaced."""
+    module = sys.modules.get('MetaTrader5')
+    if getattr(module, 'terminal', None) is None:
+        return
+    _rebind(module, module.replaced)
+    if module.replaced is None:
+        del sys.modules['MetaTrader5']
+    else:
+        sys.modules['MetaTrader5'] = module.replaced
+
+def _rebind(old, new):
+    if old is None or new is None:
+        return
+    for loaded in list(sys.modules.values()):
+        if getattr(loaded, 'mt5', None) is old:
+            loaded.mt5 = new
+    # Symbol settings cached from one terminal do not apply to the other
+    cache = sys.modules.get('metatrader.symbol_cache')
+    if cache is not None:
+        cache.symbol_cache.invalidate()
@@ -0,0 +1,85 @@
+import logging
+from metatrader.indicators import EMAState, RollingStdState
+from strategy.tunnel_strategy import WAVY_TUNNEL_EMAS
+
+logger = logging.getLogger(__name__)
+
+class WavyTunnelState:
+    """
+    Streaming Wavy Tunnel indicators for one symbol.
+
+    Keeps the last EMA values and the rolling std window so that a closed bar
+    advances the state in O(1) instead of recomputing the whole history. The
+    bar that is still forming is evaluated with ``provisional`` and only
+    committed once a newer bar shows up in ``on_bar``.
+    """
+
+    def __init__(self, symbol, specs=None, std_window=20):
+        self.symbol = symbol
+        self.specs = specs or WAVY_TUNNEL_EMAS
+        self._emas = {name: EMAState(period) for name, (column, period) in self.specs.items()}
+        self._std = RollingStdState(std_window)
+        self.last_closed_time = None
+        self._forming = None
+        self.values = self._snapshot()
+
+    def _snapshot(self, bar=None):
+        if bar is None:
+            values = {name: ema.value for name, ema in self._emas.items()}
+            values['std_dev'] = self._std.value
+        else:
+            values = {name: self._emas[name].peek(bar[column]) for name, (column, period) in self.specs.items()}
+            values['std_dev'] = self._std.peek(bar['close'])
+        return values
+
+    def update(self, bar, time=None):
+        """
+        Commit a closed bar (a mapping with ``high``, ``low`` and ``close``) and return the indicator values.
+        """
+        for name, (column, period) in self.specs.items():
+            self._emas[name].update(bar[column])
+        self._std.update(bar['close'])
+        if time is not None:
+            self.last_closed_time = time
+        self.values = self._snapshot()
+        return self.values
+
+    def provisional(self, bar):
+        """
+        Return the indicator values as if ``bar`` closed now, without changing the state.
+        """
+        return self._snapshot(bar)
+
+    def on_bar(self, time, bar):
+        """
+        Feed the latest snapshot of a bar.
+
+        Snapshots of the forming bar replace each other; the forming bar is
+        committed when a bar with a later time arrives. Bars that are already
+        committed are ignored. Returns the values including the forming bar.
+        """
+        if self.last_closed_time is not None and time <= self.last_closed_time:
+            return self.current()
+        if self._forming is not None and time != self._forming[0]:
+            if time < self._forming[0]:
+                return self.current()
+            self.update(self._forming[1], self._forming[0])
+        self._forming = (time, {'high': bar['high'], 'low': bar['low'], 'close': bar['close']})
+        return self.current()
+
+    def current(self):
+        if self._forming is None:
+            return self.values
+        return self.provisional(self._forming[1])
+
+    def on_frame(self, data):
+        """
+        Feed every row of ``data`` (oldest first) through ``on_bar`` and return the current values.
+        """
+        times = data['time'].tolist()
+        rows = zip(data['high'].tolist(), data['low'].tolist(), data['close'].tolist())
+        for time, (high, low, close) in zip(times, rows):
+            self.on_bar(time, {'high': high, 'low': low, 'close': close})
+        values = self.current()
+        logger.debug("Streaming indicators for %s up to %s", self.symbol, self.last_closed_time)
+        return values
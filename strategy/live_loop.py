@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import time
+from datetime import date
+import numpy as np
+import MetaTrader5 as mt5
+from config import Config
+from metatrader.bar_buffer import BarBuffer
+from metatrader.bar_clock import BarClock
+from metatrader.data_retrieval import get_data
+from metatrader.latency import order_latency
+from metatrader.order_service import OrderService
+from metatrader.session import get_session
+from strategy.indicator_state import WavyTunnelState
+from strategy.position_manager import PositionManager
+from strategy.tunnel_strategy import (
+    calculate_position_size, check_entry_conditions, detect_peaks_and_dips, level_tolerance, strategy_params,
+    wavy_tunnel_ema_specs
+)
+from utils.error_handling import handle_error
+
+logger = logging.getLogger(__name__)
+
+def real_bars(data):
+    """Drop the synthetic current-price row get_data appends in live mode; real bars always carry ticks."""
+    return data[data['tick_volume'] > 0]
+
+class SymbolTrader:
+    """
+    Live state of one symbol: its recent bars, the streaming indicators and
+    the entry decision for the bar that just closed.
+
+    The bars are kept in a ``BarBuffer`` of ``num_candles`` real bars, so a
+    refresh only appends or replaces a bar in place.
+
+    ``load`` and ``refresh`` talk to the terminal; ``entry_request`` only
+    computes on the state they built (including the near-level tolerance
+    ``load`` resolves), so it can run off the terminal thread. The tick
+    replay backtest feeds the bars it builds through ``push_bar`` instead.
+    """
+
+    def __init__(self, symbol, timeframe=None, num_candles=None, params=None, risk_per_trade=None, pip_value=None):
+        self.symbol = symbol
+        self.timeframe = timeframe or Config.MT5_TIMEFRAME_VALUE
+        self.num_candles = num_candles or Config.HISTORICAL_DATA_CANDLES
+        self.params = strategy_params(params)
+        self.risk_per_trade = Config.RISK_PER_TRADE if risk_per_trade is None else risk_per_trade
+        self.pip_value = Config.PIP_VALUE if pip_value is None else pip_value
+        self.history = BarBuffer(self.num_candles)
+        self.indicators = WavyTunnelState(symbol, wavy_tunnel_ema_specs(self.params), self.params['std_window'])
+        self.clock = BarClock(symbol, self.timeframe)
+        self.current_price = None
+        self.tolerance = None
+
+    def load(self):
+        data = get_data(self.symbol, mode='live', timeframe=self.timeframe, num_candles=self.num_candles)
+        if data is None or data.empty:
+            logger.error("Failed to initialize historical data for %s", self.symbol)
+            return False
+        bars = real_bars(data)
+        self.history.extend(bars)
+        self.current_price = data['close'].iloc[-1]
+        self.indicators.on_frame(bars)
+        self.tolerance = level_tolerance(self.symbol)
+        logger.info("Initialized historical data for %s: %s candles", self.symbol, len(data))
+        return True
+
+    def refresh(self):
+        """
+        Fetch the latest bars; True when a bar closed since the last refresh.
+        """
+        # Two candles so that a bar which just closed arrives with its final values
+        new_data = get_data(self.symbol, mode='live', timeframe=self.timeframe, num_candles=2)
+        if new_data is None or new_data.empty:
+            logger.warning("Failed to fetch new data for %s, skipping this iteration", self.symbol)
+            return False
+        last_closed = self.indicators.last_closed_time
+        bars = real_bars(new_data)
+        self.history.extend(bars)
+        self.current_price = new_data['close'].iloc[-1]
+        self.indicators.on_frame(bars)
+        return self.indicators.last_closed_time != last_closed
+
+    def push_bar(self, bar, price):
+        """
+        Take one snapshot of a bar (a mapping of every bar field) and the
+        latest price; True when it closed an earlier bar.
+        """
+        last_closed = self.indicators.last_closed_time
+        self.history.push(bar)
+        self.indicators.on_bar(bar['time'], bar)
+        self.current_price = price
+        return self.indicators.last_closed_time != last_closed
+
+    def entry_request(self, balance):
+        """The trade request for the bar that just closed, or None when no entry condition holds."""
+        indicators = self.indicators.values
+        last_closed = np.datetime64(self.indicators.last_closed_time)
+        closed = self.history.columns(np.searchsorted(self.history['time'], last_closed, side='right'))
+        peaks, dips = detect_peaks_and_dips(closed, self.params['peak_type'])
+
+        row = {field: values[-1] for field, values in closed.items()}
+        row.update(indicators)
+        buy_condition, sell_condition = check_entry_conditions(row, peaks, dips, self.symbol, tolerance=self.tolerance)
+        if not buy_condition and not sell_condition:
+            logger.info("No trade conditions met for %s", self.symbol)
+            return None
+
+        current_price = self.current_price
+        std_dev = indicators['std_dev']
+        sl_distance = max(self.params['sl_std_multiplier'] * std_dev, 20 * self.pip_value)
+        tp_distance = max(self.params['tp_std_multiplier'] * std_dev, 20 * self.pip_value)
+        volume = calculate_position_size(
+            account_balance=balance,
+            risk_per_trade=self.risk_per_trade,
+            stop_loss_pips=sl_distance / self.pip_value,
+            pip_value=self.pip_value
+        )
+        return {
+            'action': mt5.TRADE_ACTION_DEAL,
+            'symbol': self.symbol,
+            'volume': volume,
+            'type': mt5.ORDER_TYPE_BUY if buy_condition else mt5.ORDER_TYPE_SELL,
+            'price': current_price,
+            'sl': current_price - sl_distance if buy_condition else current_price + sl_distance,
+            'tp': current_price + tp_distance if buy_condition else current_price - tp_distance,
+            'deviation': 10,
+            'magic': 12345,
+            'comment': 'Tunnel Strategy',
+            'type_filling': mt5.ORDER_FILLING_FOK,
+            'type_time': mt5.ORDER_TIME_GTC
+        }
+
+def order_side(trade_request):
+    return 1 if trade_request['type'] == mt5.ORDER_TYPE_BUY else -1
+
+class LiveLoop:
+    """
+    Event-driven live trading: one asyncio task per symbol.
+
+    Every MT5 call runs on the terminal thread of the ``MT5Session``, so no
+    symbol waits for another's IPC round trips in the event loop. Each task
+    sleeps until its symbol's bar closes (see ``BarClock``), then refreshes the
+    bars and evaluates entries; nothing is recomputed between closes. Open
+    positions are checked every ``poll_seconds`` (see ``PositionManager``) and
+    the terminal connection every ``Config.MT5_HEARTBEAT_SECONDS`` by separate
+    tasks. Orders go to an ``OrderService`` and are awaited as separate tasks,
+    so neither evaluation nor the terminal thread waits for an order's retries.
+    With a ``journal``, signals, order results, fills, closes and equity
+    snapshots are journaled as they happen.
+    """
+
+    def __init__(self, symbols, starting_balance, poll_seconds=None, max_duration=24 * 3600, session=None,
+                 orders=None, journal=None):
+        self.traders = {symbol: SymbolTrader(symbol) for symbol in symbols}
+        self.session = session or get_session()
+        self.journal = journal
+        self.positions = PositionManager(symbols, journal=journal)
+        self.orders = orders or OrderService(self.session)
+        self.starting_balance = starting_balance
+        self.current_balance = starting_balance
+        self.poll_seconds = Config.LIVE_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.max_duration = max_duration
+        self.daily_trades = 0
+        self.total_trades = 0
+        self.trading_day = date.today()
+        self.max_drawdown_reached = False
+        self._orders = set()
+        self._stop = None
+
+    def load(self):
+        """Fetch the initial history of every symbol; False if any of them failed."""
+        return all(self.session.call(trader.load) for trader in self.traders.values())
+
+    async def call(self, func, *args, **kwargs):
+        """Run a blocking MT5 call on the terminal thread."""
+        return await asyncio.wrap_future(self.session.submit(func, *args, **kwargs))
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        tasks = [asyncio.create_task(self.run_symbol(trader), name=symbol) for symbol, trader in self.traders.items()]
+        tasks.append(asyncio.create_task(self.manage_positions(), name='positions'))
+        tasks.append(asyncio.create_task(self.heartbeat(), name='heartbeat'))
+        try:
+            await asyncio.wait_for(self._stop.wait(), self.max_duration)
+        except asyncio.TimeoutError:
+            logger.info("Live trading session reached its maximum duration.")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self._orders:
+                logger.info("Waiting for %s order(s) in flight...", len(self._orders))
+                await asyncio.gather(*self._orders, return_exceptions=True)
+            self.orders.close()
+            if self.journal is not None:
+                self.journal.flush()
+            order_latency.log_summary()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run_symbol(self, trader):
+        while not self._stop.is_set():
+            try:
+                await asyncio.sleep(await self.call(trader.clock.seconds_until_close))
+                if await self.call(trader.clock.check) and await self.call(trader.refresh):
+                    logger.info("New bar closed for %s at %s", trader.symbol, trader.indicators.last_closed_time)
+                    await self.on_bar_close(trader)
+            except Exception as e:
+                handle_error(e, f"Live trading iteration failed for {trader.symbol}")
+                await asyncio.sleep(trader.clock.grace)
+
+    async def manage_positions(self):
+        while not self._stop.is_set():
+            try:
+                await self.call(self.positions.run_cycle)
+            except Exception as e:
+                handle_error(e, "Failed to manage positions")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def heartbeat(self):
+        while not self._stop.is_set():
+            await asyncio.sleep(Config.MT5_HEARTBEAT_SECONDS)
+            if not await self.call(self.session.heartbeat):
+                logger.error("Lost the MetaTrader5 terminal connection. Stopping live trading.")
+                self.stop()
+
+    async def on_bar_close(self, trader):
+        if date.today() != self.trading_day:
+            self.trading_day = date.today()
+            self.daily_trades = 0
+        if self.daily_trades >= Config.LIMIT_NO_OF_TRADES:
+            logger.info("Maximum number of trades for the day reached. Not entering %s.", trader.symbol)
+            return
+
+        account_info = await self.call(mt5.account_info)
+        if account_info is None:
+            logger.error("Failed to get account info, skipping the entry check for %s", trader.symbol)
+            return
+        trade_request = trader.entry_request(account_info.balance)
+        if trade_request is None:
+            return
+        signal_time = time.monotonic()
+        if self.journal is not None:
+            self.journal.record('signal', trader.symbol, side=order_side(trade_request), price=trade_request['price'],
+                                volume=trade_request['volume'], sl=trade_request['sl'], tp=trade_request['tp'])
+
+        logger.info("Placing order with the following details: %s", trade_request)
+        # Count the order against today's limit now, so concurrent symbols cannot overshoot it
+        self.daily_trades += 1
+        order = asyncio.create_task(self.place_order(trade_request, account_info.balance, signal_time))
+        self._orders.add(order)
+        order.add_done_callback(self._orders.discard)
+
+    async def place_order(self, trade_request, balance_before, signal_time=None):
+        result = await asyncio.wrap_future(self.orders.submit(trade_request, signal_time))
+        logger.info("Order send result: %s", result)
+        if self.journal is not None:
+            self.journal_order(trade_request, result)
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info("Order placed successfully for %s.", trade_request['symbol'])
+            self.total_trades += 1
+        else:
+            logger.error("Order failed with retcode: %s", result.retcode if result else 'Unknown')
+            self.daily_trades -= 1
+
+        account_info = await self.call(mt5.account_info)
+        if account_info is None:
+            logger.error("Failed to get account info after trade")
+            return
+        self.current_balance = account_info.balance
+        logger.info("Balance change: %s", self.current_balance - balance_before)
+        drawdown = (self.starting_balance - self.current_balance) / self.starting_balance
+        if drawdown > Config.MAX_DRAWDOWN:
+            self.max_drawdown_reached = True
+            logger.warning("Maximum drawdown of %s%% reached. Current drawdown: %.2f%%", Config.MAX_DRAWDOWN*100,
+                           drawdown*100)
+            self.stop()
+
+    def journal_order(self, trade_request, result):
+        symbol = trade_request['symbol']
+        side = order_side(trade_request)
+        if result is None:
+            self.journal.record('order', symbol, side=side, volume=trade_request['volume'], reason='no answer')
+            return
+        self.journal.record('order', symbol, side=side, ticket=result.order, price=trade_request['price'],
+                            volume=trade_request['volume'], sl=trade_request['sl'], tp=trade_request['tp'],
+                            retcode=result.retcode)
+        if result.retcode == mt5.TRADE_RETCODE_DONE:
+            self.journal.record('fill', symbol, side=side, ticket=result.order, price=result.price,
+                                volume=result.volume, sl=trade_request['sl'], tp=trade_request['tp'],
+                                retcode=result.retcode)
@@ -0,0 +1,66 @@
+import bisect
+import numpy as np
+
+class LevelIndex:
+    """
+    Sorted, array-backed set of price levels answering "is there a level within tol of price".
+    """
+
+    def __init__(self, levels=()):
+        if isinstance(levels, str):
+            raise TypeError("Levels must be a sequence of prices, not a string.")
+        try:
+            levels = np.asarray(levels, dtype=np.float64).ravel()
+        except ValueError as e:
+            raise TypeError(f"Levels must be numeric: {e}")
+        self.levels = np.sort(levels[~np.isnan(levels)])
+        self._sorted = self.levels.tolist()
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def add(self, level):
+        bisect.insort(self._sorted, float(level))
+        self.levels = np.asarray(self._sorted, dtype=np.float64)
+
+    def has_level_within(self, price, tol):
+        # Only the closest level on either side of the price can be within tol
+        i = bisect.bisect_left(self._sorted, price)
+        if i < len(self._sorted) and abs(price - self._sorted[i]) <= tol:
+            return True
+        return i > 0 and abs(price - self._sorted[i - 1]) <= tol
+
+    def has_levels_within(self, prices, tol):
+        """
+        Vectorized ``has_level_within`` for an array of prices; returns a boolean array.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(self.levels) == 0:
+            return np.zeros(prices.shape, dtype=bool)
+        i = np.searchsorted(self.levels, prices, side='left')
+        above = self.levels[np.minimum(i, len(self.levels) - 1)]
+        below = self.levels[np.maximum(i - 1, 0)]
+        with np.errstate(invalid='ignore'):
+            near_above = (i < len(self.levels)) & (np.abs(prices - above) <= tol)
+            near_below = (i > 0) & (np.abs(prices - below) <= tol)
+        return near_above | near_below
+
+class PeakIndex:
+    """
+    Peak and dip levels of one symbol together with the symbol's "near a level" tolerance.
+    """
+
+    def __init__(self, peaks, dips, tolerance):
+        self.peaks = LevelIndex(peaks)
+        self.dips = LevelIndex(dips)
+        self.tolerance = tolerance
+
+    @classmethod
+    def from_detection(cls, result, tolerance):
+        return cls(result['peaks'], result['dips'], tolerance)
+
+    def near_peak(self, price):
+        return self.peaks.has_level_within(price, self.tolerance)
+
+    def near_dip(self, price):
+        return self.dips.has_level_within(price, self.tolerance)
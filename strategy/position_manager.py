@@ -0,0 +1,112 @@
+import logging
+from collections import defaultdict
+import MetaTrader5 as mt5
+from config import Config
+from strategy.tunnel_strategy import EXIT_MESSAGES, close_request, position_exit_reason
+
+logger = logging.getLogger(__name__)
+
+class PositionSnapshot:
+    """All open positions and the account, read once, with the positions grouped by symbol."""
+
+    def __init__(self, positions, account):
+        self.positions = tuple(positions or ())
+        self.account = account
+        self.by_symbol = defaultdict(list)
+        for position in self.positions:
+            self.by_symbol[position.symbol].append(position)
+
+    @property
+    def equity(self):
+        return self.account.equity
+
+    def __len__(self):
+        return len(self.positions)
+
+class PositionManager:
+    """
+    Applies the live exit rules (see ``position_exit_reason``) to every open
+    position of ``symbols``.
+
+    Each cycle reads one ``positions_get()`` and one ``account_info()``
+    snapshot, evaluates every position against it in memory and then sends
+    all closes back to back, reading one tick per symbol. A cycle costs a
+    fixed number of terminal round trips plus one per close, instead of
+    several per open position.
+
+    With a ``journal`` (see ``utils.journal.TradeJournal``), every cycle
+    journals an equity snapshot and every close sent.
+    """
+
+    def __init__(self, symbols, min_take_profit=None, max_loss_per_day=None, starting_equity=None,
+                 max_trades_per_day=None, journal=None):
+        self.symbols = list(symbols)
+        self.journal = journal
+        self.min_take_profit = Config.MIN_TP_PROFIT if min_take_profit is None else min_take_profit
+        self.max_loss_per_day = Config.MAX_LOSS_PER_DAY if max_loss_per_day is None else max_loss_per_day
+        self.starting_equity = Config.STARTING_EQUITY if starting_equity is None else starting_equity
+        self.max_trades_per_day = Config.LIMIT_NO_OF_TRADES if max_trades_per_day is None else max_trades_per_day
+
+    def snapshot(self):
+        """The current positions and account, or None when the terminal does not answer."""
+        positions = mt5.positions_get()
+        account = mt5.account_info()
+        if positions is None or account is None:
+            logger.error("Failed to read the open positions or the account: %s", mt5.last_error())
+            return None
+        return PositionSnapshot(positions, account)
+
+    def exits(self, snapshot):
+        """``(position, reason)`` for every position of ``symbols`` that an exit rule closes."""
+        exits = []
+        for symbol in self.symbols:
+            for position in snapshot.by_symbol.get(symbol, ()):
+                reason = position_exit_reason(position, snapshot.equity, len(snapshot), self.min_take_profit,
+                                              self.max_loss_per_day, self.starting_equity, self.max_trades_per_day)
+                if reason is not None:
+                    logger.info(EXIT_MESSAGES[reason], symbol)
+                    exits.append((position, reason))
+        return exits
+
+    def close(self, exits, balance=None):
+        """
+        Send the close orders of ``exits``; returns ``{ticket: result}``. With the
+        account ``balance`` before them, each journaled close records the balance after it.
+        """
+        ticks = {}
+        results = {}
+        for position, reason in exits:
+            if position.symbol not in ticks:
+                ticks[position.symbol] = mt5.symbol_info_tick(position.symbol)
+            tick = ticks[position.symbol]
+            if tick is None:
+                logger.error("No price to close position %s of %s", position.ticket, position.symbol)
+                results[position.ticket] = None
+                continue
+            result = mt5.order_send(close_request(position, tick))
+            if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
+                logger.error("Failed to close position %s of %s: %s", position.ticket, position.symbol,
+                             result.comment if result is not None else mt5.last_error())
+            else:
+                logger.info("Closed position %s of %s (%s) at %s, profit: %s", position.ticket, position.symbol, reason,
+                            result.price, position.profit)
+            results[position.ticket] = result
+            if balance is not None and result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+                balance += position.profit
+            if self.journal is not None and result is not None:
+                self.journal.record('close', position.symbol, side=1 if position.type == mt5.ORDER_TYPE_BUY else -1,
+                                    ticket=position.ticket, price=result.price, volume=position.volume,
+                                    profit=position.profit, retcode=result.retcode, reason=reason,
+                                    **({} if balance is None else {'balance': balance}))
+        return results
+
+    def run_cycle(self):
+        """Check every open position once; returns the close results by ticket."""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return {}
+        if self.journal is not None:
+            self.journal.record('equity', balance=snapshot.account.balance, equity=snapshot.equity)
+        if not snapshot.by_symbol:
+            logger.info("No open positions.")
+        return self.close(self.exits(snapshot), snapshot.account.balance)
@@ -7,95 +7,222 @@ from utils.error_handling import handle_error
 import time
 from config import Config
 from metatrader.data_retrieval import get_data
-
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from metatrader.indicators import calculate_emas, ema_array, sliding_max, sliding_min
+from metatrader.latency import order_latency
+from metatrader.symbol_cache import symbol_cache
+from strategy.peak_index import PeakIndex
+
+logger = logging.getLogger(__name__)
+
+# Tunable strategy parameters; these defaults are the classic Wavy Tunnel setup
+DEFAULT_STRATEGY_PARAMS = {
+    'wavy_period': 34,
+    'tunnel1_period': 144,
+    'tunnel2_period': 169,
+    'long_term_period': 200,
+    'peak_type': 21,
+    'std_window': 20,
+    'sl_std_multiplier': 1.5,
+    'tp_std_multiplier': 2,
+}
+
+def strategy_params(params=None):
+    """
+    Return DEFAULT_STRATEGY_PARAMS overridden by ``params``; unknown names raise ValueError.
+    """
+    merged = dict(DEFAULT_STRATEGY_PARAMS)
+    if params:
+        unknown = set(params) - set(DEFAULT_STRATEGY_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown strategy parameters: {sorted(unknown)}")
+        merged.update(params)
+    return merged
+
+def wavy_tunnel_ema_specs(params=None):
+    """
+    EMA specs (name -> (column, period)) for the given strategy parameters.
+    """
+    params = strategy_params(params)
+    return {
+        'wavy_h': ('high', params['wavy_period']),
+        'wavy_c': ('close', params['wavy_period']),
+        'wavy_l': ('low', params['wavy_period']),
+        'tunnel1': ('close', params['tunnel1_period']),
+        'tunnel2': ('close', params['tunnel2_period']),
+        'long_term_ema': ('close', params['long_term_period']),
+    }
+
+def warmup_bars(params=None):
+    """Number of bars before every EMA of ``params`` is defined."""
+    params = strategy_params(params)
+    return max(params['wavy_period'], params['tunnel1_period'], params['tunnel2_period'], params['long_term_period'])
+
+WAVY_TUNNEL_EMAS = wavy_tunnel_ema_specs()
 
 def calculate_ema(prices, period):
-    logging.debug(f"Calculating EMA for period {period}")
-    logging.debug(f"First few prices: {prices.head() if isinstance(prices, pd.Series) else prices[:5]}")
-
     prices = pd.Series(prices)
     prices = pd.to_numeric(prices, errors='coerce')
-    ema_values = np.full(len(prices), np.nan, dtype=np.float64)
-    if len(prices) < period:
-        logging.warning(f"Not enough data for EMA calculation. Required: {period}, Available: {len(prices)}")
-        return pd.Series(ema_values, index=prices.index)
-
-    sma = np.mean(prices[:period])
-    ema_values[period - 1] = sma
-    multiplier = 2 / (period + 1)
-    for i in range(period, len(prices)):
-        ema_values[i] = (prices[i] - ema_values[i - 1]) * multiplier + ema_values[i - 1]
-
-    result = pd.Series(ema_values, index=prices.index)
-    logging.debug(f"Calculated EMA. Last few values: {result.tail()}")
-    return result
+    return pd.Series(ema_array(prices, period), index=prices.index)
 
-def detect_peaks_and_dips(df, peak_type=5):
-    logging.debug(f"Detecting peaks and dips with peak_type: {peak_type}")
-    highs = df['high'].values
-    lows = df['low'].values
+def add_wavy_tunnel_indicators(data, specs=None, cache=None):
+    """
+    Add the Wavy Tunnel EMA columns to ``data`` in place, computing all of them in one pass.
+
+    ``specs`` defaults to WAVY_TUNNEL_EMAS; ``cache`` is passed to ``calculate_emas``.
+    """
+    for name, values in calculate_emas(data, specs or WAVY_TUNNEL_EMAS, cache).items():
+        data[name] = values
+    return data
+
+def _numeric_column(df, column):
+    try:
+        return np.asarray(df[column], dtype=np.float64)
+    except ValueError as e:
+        raise TypeError(f"Column '{column}' must be numeric: {e}")
+
+def find_peaks_and_dips(df, peak_type=5):
+    """
+    Locate peaks and dips with sliding-window extremes.
+
+    A bar is a peak when its high is strictly greater than every other high in
+    the ``peak_type`` window centred on it (dips likewise on lows). Returns a
+    dict with the bar indices, prices and times of the peaks and dips.
+    """
+    highs = _numeric_column(df, 'high')
+    lows = _numeric_column(df, 'low')
     center_index = peak_type // 2
-    peaks = []
-    dips = []
-
-    for i in range(center_index, len(highs) - center_index):
-        peak_window = highs[i - center_index:i + center_index + 1]
-        dip_window = lows[i - center_index:i + center_index + 1]
-
-        logging.debug(f"Analyzing peak window: {peak_window}")
-        logging.debug(f"Analyzing dip window: {dip_window}")
-
-        if all(peak_window[center_index] > peak_window[j] for j in range(len(peak_window)) if j != center_index):
-            peaks.append(highs[i])
-            logging.debug(f"Peak detected at index {i}: {highs[i]}")
-
-        if all(dip_window[center_index] < dip_window[j] for j in range(len(dip_window)) if j != center_index):
-            dips.append(lows[i])
-            logging.debug(f"Dip detected at index {i}: {lows[i]}")
-
-    logging.info(f"Total peaks detected: {len(peaks)}, Peaks: {peaks}")
-    logging.info(f"Total dips detected: {len(dips)}, Dips: {dips}")
-    return peaks, dips
-
-def check_entry_conditions(row, peaks, dips, symbol):
-    wavy_c, wavy_h, wavy_l = row['wavy_c'], row['wavy_h'], row['wavy_l']
-    tunnel1, tunnel2 = row['tunnel1'], row['tunnel2']
-    close_price = row['close']
-
-    logging.info(f"Checking entry conditions for {symbol}:")
-    logging.info(f"Close price: {close_price:.5f}")
-    logging.info(f"Wavy C: {wavy_c:.5f}, Wavy H: {wavy_h:.5f}, Wavy L: {wavy_l:.5f}")
-    logging.info(f"Tunnel1: {tunnel1:.5f}, Tunnel2: {tunnel2:.5f}")
-
-    logging.debug(f"Number of peaks detected: {len(peaks)}, Peaks (first 5): {peaks[:5]}")
-    logging.debug(f"Number of dips detected: {len(dips)}, Dips (first 5): {dips[:5]}")
-
-    buy_condition1 = close_price > max(wavy_c, wavy_h, wavy_l)
-    buy_condition2 = min(wavy_c, wavy_h, wavy_l) > max(tunnel1, tunnel2)
-    buy_condition3 = any(abs(close_price - peak) <= 0.001 for peak in peaks)
-    logging.debug(f"Buy Condition 1 (close > max(Wavy C, Wavy H, Wavy L)): {buy_condition1}")
-    logging.debug(f"Buy Condition 2 (min(Wavy C, Wavy H, Wavy L) > max(Tunnel1, Tunnel2)): {buy_condition2}")
-    logging.debug(f"Buy Condition 3 (close price near peak): {buy_condition3}")
-    sell_condition1 = close_price < min(wavy_c, wavy_h, wavy_l)
-    sell_condition2 = max(wavy_c, wavy_h, wavy_l) < min(tunnel1, tunnel2)
-    sell_condition3 = any(abs(close_price - dip) <= 0.001 for dip in dips)
-    logging.debug(f"Sell Condition 1 (close < min(Wavy C, Wavy H, Wavy L)): {sell_condition1}")
-    logging.debug(f"Sell Condition 2 (max(Wavy C, Wavy H, Wavy L) < min(Tunnel1, Tunnel2)): {sell_condition2}")
-    logging.debug(f"Sell Condition 3 (close price near dip): {sell_condition3}")
-
-    buy_condition = buy_condition1 or buy_condition2 or buy_condition3
-    sell_condition = sell_condition1 or sell_condition2 or sell_condition3
-
-    logging.info(f"Buy conditions: {buy_condition1}, {buy_condition2}, {buy_condition3}")
-    logging.info(f"Sell conditions: {sell_condition1}, {sell_condition2}, {sell_condition3}")
-    logging.info(f"Buy condition met: {buy_condition}")
-    logging.info(f"Sell condition met: {sell_condition}")
-
-    buy_reasons = [f"Condition {i+1}: {cond}" for i, cond in enumerate([buy_condition1, buy_condition2, buy_condition3]) if cond]
-    sell_reasons = [f"Condition {i+1}: {cond}" for i, cond in enumerate([sell_condition1, sell_condition2, sell_condition3]) if cond]
-
-    logging.info(f"Entry conditions for {symbol}: Buy = {buy_condition} (reasons: {', '.join(buy_reasons)}), Sell = {sell_condition} (reasons: {', '.join(sell_reasons)})")
+    n = len(highs)
+    positions = np.arange(center_index, n - center_index)
+
+    if len(positions) == 0:
+        peak_mask = dip_mask = np.zeros(0, dtype=bool)
+    elif center_index == 0:
+        peak_mask = dip_mask = np.ones(len(positions), dtype=bool)
+    else:
+        # Extremes of the bars left and right of each centre, excluding the centre itself
+        side_max = sliding_max(highs, center_index)
+        side_min = sliding_min(lows, center_index)
+        left = slice(0, n - 2 * center_index)
+        right = slice(center_index + 1, n - center_index + 1)
+        peak_mask = highs[positions] > np.maximum(side_max[left], side_max[right])
+        dip_mask = lows[positions] < np.minimum(side_min[left], side_min[right])
+
+    times = np.asarray(df['time']) if 'time' in df else np.asarray(df.index)
+    peak_indices = positions[peak_mask]
+    dip_indices = positions[dip_mask]
+    logger.debug("Total peaks detected: %d, total dips detected: %d", len(peak_indices), len(dip_indices))
+    return {
+        'peak_indices': peak_indices,
+        'peaks': highs[peak_indices],
+        'peak_times': times[peak_indices],
+        'dip_indices': dip_indices,
+        'dips': lows[dip_indices],
+        'dip_times': times[dip_indices],
+    }
+
+def detect_peaks_and_dips(df, peak_type=5):
+    result = find_peaks_and_dips(df, peak_type)
+    return result['peaks'].tolist(), result['dips'].tolist()
+
+DEFAULT_LEVEL_TOLERANCE = 0.001
+
+def level_tolerance(symbol):
+    """
+    Price distance that counts as "near" a peak or dip for ``symbol``: Config.PEAK_TOLERANCE_POINTS points.
+    """
+    symbol_info = symbol_cache.get(symbol)
+    try:
+        point = float(symbol_info.point)
+    except (AttributeError, TypeError, ValueError):
+        logger.warning("Point size unavailable for %s, using default level tolerance %s", symbol,
+                       DEFAULT_LEVEL_TOLERANCE)
+        return DEFAULT_LEVEL_TOLERANCE
+    return Config.PEAK_TOLERANCE_POINTS * point
+
+def build_peak_index(peaks, dips, symbol, tolerance=None):
+    return PeakIndex(peaks, dips, level_tolerance(symbol) if tolerance is None else tolerance)
+
+# Bits of the per-row reason mask returned by compute_entry_signals
+BUY_CLOSE_ABOVE_WAVY = 1
+BUY_WAVY_ABOVE_TUNNEL = 2
+BUY_NEAR_PEAK = 4
+SELL_CLOSE_BELOW_WAVY = 8
+SELL_WAVY_BELOW_TUNNEL = 16
+SELL_NEAR_DIP = 32
+
+ENTRY_REASONS = {
+    BUY_CLOSE_ABOVE_WAVY: "Buy condition 1 (close > max(Wavy C, Wavy H, Wavy L))",
+    BUY_WAVY_ABOVE_TUNNEL: "Buy condition 2 (min(Wavy C, Wavy H, Wavy L) > max(Tunnel1, Tunnel2))",
+    BUY_NEAR_PEAK: "Buy condition 3 (close price near peak)",
+    SELL_CLOSE_BELOW_WAVY: "Sell condition 1 (close < min(Wavy C, Wavy H, Wavy L))",
+    SELL_WAVY_BELOW_TUNNEL: "Sell condition 2 (max(Wavy C, Wavy H, Wavy L) < min(Tunnel1, Tunnel2))",
+    SELL_NEAR_DIP: "Sell condition 3 (close price near dip)",
+}
+
+def _builtin_max(*arrays):
+    # Element-wise equivalent of the builtin max(), including how it treats NaN
+    result = arrays[0]
+    for values in arrays[1:]:
+        result = np.where(values > result, values, result)
+    return result
+
+def _builtin_min(*arrays):
+    result = arrays[0]
+    for values in arrays[1:]:
+        result = np.where(values < result, values, result)
+    return result
+
+def compute_entry_signals(df, peak_index):
+    """
+    Evaluate the buy and sell entry conditions for every row of ``df`` at once.
+
+    Returns ``(buy_signal, sell_signal, reasons)``: two boolean arrays and an
+    integer array whose bits (BUY_* / SELL_* constants) record which
+    conditions held on each row.
+    """
+    close = _numeric_column(df, 'close')
+    wavy_c, wavy_h, wavy_l = _numeric_column(df, 'wavy_c'), _numeric_column(df, 'wavy_h'), _numeric_column(df, 'wavy_l')
+    tunnel1, tunnel2 = _numeric_column(df, 'tunnel1'), _numeric_column(df, 'tunnel2')
+
+    wavy_max = _builtin_max(wavy_c, wavy_h, wavy_l)
+    wavy_min = _builtin_min(wavy_c, wavy_h, wavy_l)
+    conditions = {
+        BUY_CLOSE_ABOVE_WAVY: close > wavy_max,
+        BUY_WAVY_ABOVE_TUNNEL: wavy_min > _builtin_max(tunnel1, tunnel2),
+        BUY_NEAR_PEAK: peak_index.peaks.has_levels_within(close, peak_index.tolerance),
+        SELL_CLOSE_BELOW_WAVY: close < wavy_min,
+        SELL_WAVY_BELOW_TUNNEL: wavy_max < _builtin_min(tunnel1, tunnel2),
+        SELL_NEAR_DIP: peak_index.dips.has_levels_within(close, peak_index.tolerance),
+    }
+
+    reasons = np.zeros(len(close), dtype=np.int64)
+    for bit, condition in conditions.items():
+        reasons |= np.where(condition, bit, 0)
+
+    buy_signal = (reasons & (BUY_CLOSE_ABOVE_WAVY | BUY_WAVY_ABOVE_TUNNEL | BUY_NEAR_PEAK)) != 0
+    sell_signal = (reasons & (SELL_CLOSE_BELOW_WAVY | SELL_WAVY_BELOW_TUNNEL | SELL_NEAR_DIP)) != 0
+    return buy_signal, sell_signal, reasons
+
+def describe_entry_reasons(reasons):
+    """
+    Turn one row's reason mask into the list of conditions that held.
+    """
+    return [description for bit, description in ENTRY_REASONS.items() if reasons & bit]
+
+def check_entry_conditions(row, peaks, dips, symbol, peak_index=None, tolerance=None):
+    if peak_index is None:
+        peak_index = build_peak_index(peaks, dips, symbol, tolerance)
+
+    frame = {column: [row[column]] for column in ('close', 'wavy_c', 'wavy_h', 'wavy_l', 'tunnel1', 'tunnel2')}
+    buy_signal, sell_signal, reasons = compute_entry_signals(frame, peak_index)
+    buy_condition, sell_condition = bool(buy_signal[0]), bool(sell_signal[0])
+
+    logger.debug("Checking entry conditions for %s: Close: %.5f, Wavy C: %.5f, Wavy H: %.5f, Wavy L: %.5f, "
+                 "Tunnel1: %.5f, Tunnel2: %.5f", symbol, frame['close'][0], frame['wavy_c'][0], frame['wavy_h'][0],
+                 frame['wavy_l'][0], frame['tunnel1'][0], frame['tunnel2'][0])
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Entry conditions for %s: Buy = %s, Sell = %s (reasons: %s)", symbol, buy_condition,
+                    sell_condition, ', '.join(describe_entry_reasons(int(reasons[0]))))
 
     return buy_condition, sell_condition
 
@@ -103,52 +230,53 @@ def execute_trade(trade_request, retries=4, delay=6):
     attempt = 0
     while attempt <= retries:
         try:
-            logging.info(f"Attempting to execute trade: {trade_request}")
+            logger.info("Attempting to execute trade: %s", trade_request)
 
             if not ensure_symbol_subscription(trade_request['symbol']):
-                logging.error(f"Failed to subscribe to symbol {trade_request['symbol']}")
+                logger.error("Failed to subscribe to symbol %s", trade_request['symbol'])
                 return None
 
             if not check_broker_connection() or not check_market_open():
-                logging.error("Trade execution aborted due to connection issues or market being closed.")
+                logger.error("Trade execution aborted due to connection issues or market being closed.")
                 return None
 
             current_data = get_data(trade_request['symbol'], mode='live', timeframe=mt5.TIMEFRAME_M1, num_candles=1)
             if current_data is not None and not current_data.empty:
                 current_price = current_data['close'].iloc[-1]
             else:
-                logging.error(f"Failed to get current price for {trade_request['symbol']}")
+                logger.error("Failed to get current price for %s", trade_request['symbol'])
                 return None
 
             modified_request = trade_request.copy()
             modified_request['action'] = mt5.TRADE_ACTION_DEAL
             modified_request['price'] = current_price
 
-            logging.info(f"Setting SL: {modified_request['sl']}, TP: {modified_request['tp']} before sending order.")
-            logging.info(f"Placing order with price: {modified_request['price']} and volume: {modified_request['volume']}")
+            logger.info("Setting SL: %s, TP: %s before sending order.", modified_request['sl'], modified_request['tp'])
+            logger.info("Placing order with price: %s and volume: %s", modified_request['price'], modified_request['volume'])
 
+            sent = time.monotonic()
             result = mt5.order_send(modified_request)
+            order_latency.record_order_send(modified_request, result, sent, time.monotonic())
 
             if result is None:
                 error_code = mt5.last_error()
-                logging.error(f"Failed to place order: mt5.order_send returned None. Error code: {error_code}")
+                logger.error("Failed to place order: mt5.order_send returned None. Error code: %s", error_code)
                 raise ValueError(f"mt5.order_send returned None. Error code: {error_code}")
 
-            logging.info(f"Order response received at {datetime.now()}: {result}")
+            logger.info("Order response received: %s", result)
 
             if result.retcode == mt5.TRADE_RETCODE_DONE:
-                logging.info(f"Trade executed successfully: {result}")
+                logger.info("Trade executed successfully: %s", result)
                 return result
             elif result.retcode == 10009:
-                logging.warning("Order placed successfully, but not yet executed")
+                logger.warning("Order placed successfully, but not yet executed")
                 return result
             elif result.retcode == 10004:  # Requote
-                logging.warning("Requote error. Retrying with updated price.")
+                logger.warning("Requote error. Retrying with updated price.")
                 continue
             elif result.retcode == 10016:  # Invalid stops
-                logging.error("Invalid stops. Adjusting SL and TP.")
-                symbol_info = mt5.symbol_info(trade_request['symbol'])
-                min_stop_level = symbol_info.trade_stops_level * symbol_info.point
+                logger.error("Invalid stops. Adjusting SL and TP.")
+                min_stop_level = symbol_cache.min_stop_distance(trade_request['symbol'])
                 if trade_request['type'] == mt5.ORDER_TYPE_BUY:
                     modified_request['sl'] = min(modified_request['sl'], modified_request['price'] - min_stop_level)
                     modified_request['tp'] = max(modified_request['tp'], modified_request['price'] + min_stop_level)
@@ -157,18 +285,18 @@ def execute_trade(trade_request, retries=4, delay=6):
                     modified_request['tp'] = min(modified_request['tp'], modified_request['price'] - min_stop_level)
                 continue
             else:
-                logging.error(f"Order failed with retcode: {result.retcode}, Comment: {result.comment}")
+                logger.error("Order failed with retcode: %s, Comment: %s", result.retcode, result.comment)
                 raise ValueError(f"Order failed: {result.comment}")
 
         except Exception as e:
-            logging.error(f"Exception occurred during trade execution attempt {attempt + 1}: {str(e)}")
+            logger.error("Exception occurred during trade execution attempt %s: %s", attempt + 1, e)
             attempt += 1
 
         if attempt <= retries:
-            logging.info(f"Retrying in {delay} seconds... Current attempt: {attempt}/{retries}")
+            logger.info("Retrying in %s seconds... Current attempt: %s/%s", delay, attempt, retries)
             time.sleep(delay)
 
-    logging.error("Trade execution failed after maximum retries.")
+    logger.error("Trade execution failed after maximum retries.")
     return None
 
 def place_pending_order(trade_request):
@@ -192,46 +320,59 @@ def place_pending_order(trade_request):
             "type_filling": mt5.ORDER_FILLING_RETURN,
         }
 
-        logging.debug(f"Placing pending order: {pending_order_request}")
+        logger.debug("Placing pending order: %s", pending_order_request)
         result = mt5.order_send(pending_order_request)
-        logging.info(f"Pending order result: {result}")
+        logger.info("Pending order result: %s", result)
 
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logging.error(f"Failed to place pending order for {trade_request['symbol']}: {result.comment}")
+            logger.error("Failed to place pending order for %s: %s", trade_request['symbol'], result.comment)
             return None
-        logging.info(f"Pending order placed successfully for {trade_request['symbol']}")
+        logger.info("Pending order placed successfully for %s", trade_request['symbol'])
         return result
     except Exception as e:
         handle_error(e, "Failed to place pending order")
         return None
 
+# Exit rules of open positions, in the order they are checked
+EXIT_MESSAGES = {
+    'take_profit': "Profit target reached for {symbol}. Closing position.",
+    'loss_limit': "Loss limit reached for {symbol}. Closing position.",
+    'drawdown': "Drawdown limit reached for {symbol}. Closing position.",
+    'trade_limit': "Trade limit reached for the day. Closing position for {symbol}.",
+}
+
+def position_exit_reason(position, equity, open_positions, min_take_profit, max_loss_per_day, starting_equity,
+                         max_trades_per_day):
+    """
+    The EXIT_MESSAGES key of the first exit rule ``position`` meets, or None to keep it open.
+
+    ``open_positions`` may be a number or a callable returning it, so that it is only asked for when needed.
+    """
+    if position.profit >= min_take_profit:
+        return 'take_profit'
+    if position.profit <= -max_loss_per_day:
+        return 'loss_limit'
+    if equity <= starting_equity * 0.9:
+        return 'drawdown'
+    if (open_positions() if callable(open_positions) else open_positions) >= max_trades_per_day:
+        return 'trade_limit'
+    return None
+
 def manage_position(symbol, min_take_profit, max_loss_per_day, starting_equity, max_trades_per_day):
     try:
         positions = mt5.positions_get(symbol=symbol)
         if positions:
             for position in positions:
                 current_equity = mt5.account_info().equity
-                logging.info(f"Managing position for {symbol}. Current profit: {position.profit}, Equity: {current_equity}")
-
-                if position.profit >= min_take_profit:
-                    logging.info(f"Profit target reached for {symbol}. Closing position.")
-                    close_result = close_position(position.ticket)
-                    logging.info(f"Close position result: {close_result}")
+                logger.info("Managing position for %s. Current profit: %s, Equity: %s", symbol, position.profit,
+                            current_equity)
 
-                elif position.profit <= -max_loss_per_day:
-                    logging.info(f"Loss limit reached for {symbol}. Closing position.")
+                reason = position_exit_reason(position, current_equity, mt5.positions_total, min_take_profit,
+                                              max_loss_per_day, starting_equity, max_trades_per_day)
+                if reason is not None:
+                    logger.info(EXIT_MESSAGES[reason], symbol)
                     close_result = close_position(position.ticket)
-                    logging.info(f"Close position result: {close_result}")
-
-                elif current_equity <= starting_equity * 0.9:
-                    logging.info(f"Drawdown limit reached for {symbol}. Closing position.")
-                    close_result = close_position(position.ticket)
-                    logging.info(f"Close position result: {close_result}")
-
-                elif mt5.positions_total() >= max_trades_per_day:
-                    logging.info(f"Trade limit reached for the day. Closing position for {symbol}.")
-                    close_result = close_position(position.ticket)
-                    logging.info(f"Close position result: {close_result}")
+                    logger.info("Close position result: %s", close_result)
 
                 # Log the profit and details of the closed position
                 position_info = {
@@ -239,10 +380,11 @@ def manage_position(symbol, min_take_profit, max_loss_per_day, starting_equity,
                     'exit_price': mt5.symbol_info_tick(symbol).bid,
                     'profit': position.profit
                 }
-                logging.info(f"Position details - Exit Time: {position_info['exit_time']}, Exit Price: {position_info['exit_price']}, Profit: {position_info['profit']}")
+                logger.info("Position details - Exit Time: %s, Exit Price: %s, Profit: %s", position_info['exit_time'],
+                            position_info['exit_price'], position_info['profit'])
 
         else:
-            logging.info(f"No open positions found for {symbol}.")
+            logger.info("No open positions found for %s.", symbol)
     except Exception as e:
         handle_error(e, "Failed to manage position")
 
@@ -265,7 +407,7 @@ def calculate_tunnel_bounds(data, period, deviation_factor):
 def calculate_position_size(account_balance, risk_per_trade, stop_loss_pips, pip_value):
     risk_amount = account_balance * risk_per_trade
     if stop_loss_pips == 0 or pip_value == 0:
-        logging.error("Division by zero: stop_loss_pips or pip_value is zero in calculate_position_size")
+        logger.error("Division by zero: stop_loss_pips or pip_value is zero in calculate_position_size")
         raise ZeroDivisionError("stop_loss_pips or pip_value cannot be zero")
 
     position_size_base = risk_amount / (stop_loss_pips * pip_value)
@@ -274,13 +416,13 @@ def calculate_position_size(account_balance, risk_per_trade, stop_loss_pips, pip
     position_size_lots = min(position_size_lots, 0.1)
     position_size_lots = max(position_size_lots, 0.01)
 
-    logging.info(f"Calculated position size: {position_size_lots} lots")
+    logger.info("Calculated position size: %s lots", position_size_lots)
 
     return round(position_size_lots, 2)
 
 def place_order(symbol, action, volume, price, sl, tp):
     try:
-        logging.info(f"Preparing to place order for {symbol} - Action: {action}, Volume: {volume}, Price: {price}, SL: {sl}, TP: {tp}")
+        logger.info("Preparing to place order for %s - Action: %s, Volume: %s, Price: %s, SL: %s, TP: %s", symbol, action, volume, price, sl, tp)
         order_type = mt5.ORDER_TYPE_BUY if action == 'buy' else mt5.ORDER_TYPE_SELL
         order = {
             "action": mt5.TRADE_ACTION_DEAL,
@@ -296,22 +438,24 @@ def place_order(symbol, action, volume, price, sl, tp):
             "type_time": mt5.ORDER_TIME_GTC,
             "type_filling": mt5.ORDER_FILLING_FOK,
         }
-        logging.debug(f"Placing order: {order}")
+        logger.debug("Placing order: %s", order)
+        sent = time.monotonic()
         result = mt5.order_send(order)
-        logging.info(f"Order send result for {symbol}: {result}")
+        order_latency.record_order_send(order, result, sent, time.monotonic())
+        logger.info("Order send result for %s: %s", symbol, result)
 
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logging.error(f"Failed to place order for {symbol}: {result.comment}")
+            logger.error("Failed to place order for %s: %s", symbol, result.comment)
             return 'Order failed'
-        logging.info(f"Order placed successfully for {symbol}")
+        logger.info("Order placed successfully for %s", symbol)
         return 'Order placed'
     except Exception as e:
-        logging.error(f"Exception occurred while placing order for {symbol}: {str(e)}")
+        logger.error("Exception occurred while placing order for %s: %s", symbol, e)
         return 'Order failed'
 
 def generate_trade_signal(data, period, deviation_factor):
     if len(data) < period:
-        logging.warning(f"Not enough data to generate trade signal. Required: {period}, Available: {len(data)}")
+        logger.warning("Not enough data to generate trade signal. Required: %s, Available: %s", period, len(data))
         return None, None
 
     upper_bound, lower_bound = calculate_tunnel_bounds(data, period, deviation_factor)
@@ -320,16 +464,17 @@ def generate_trade_signal(data, period, deviation_factor):
     upper_bound_last_value = upper_bound.iloc[-1]
     lower_bound_last_value = lower_bound.iloc[-1]
 
-    logging.info(f"Generating trade signal with close price: {last_close}, upper bound: {upper_bound_last_value}, lower bound: {lower_bound_last_value}")
+    logger.info("Generating trade signal with close price: %s, upper bound: %s, lower bound: %s", last_close,
+                upper_bound_last_value, lower_bound_last_value)
 
     if pd.isna(last_close) or pd.isna(upper_bound_last_value) or pd.isna(lower_bound_last_value):
-        logging.error("One or more values are NaN, cannot generate trade signal.")
+        logger.error("One or more values are NaN, cannot generate trade signal.")
         return None, None
 
     buy_condition = last_close >= upper_bound_last_value
     sell_condition = last_close <= lower_bound_last_value
 
-    logging.info(f"Buy condition: {buy_condition}, Sell condition: {sell_condition}")
+    logger.info("Buy condition: %s, Sell condition: %s", buy_condition, sell_condition)
 
     return buy_condition, sell_condition
 
@@ -340,23 +485,14 @@ def adjust_deviation_factor(market_conditions):
         return 2.0
 
 def ensure_symbol_subscription(symbol):
-    symbol_info = mt5.symbol_info(symbol)
-    if not symbol_info:
-        logging.error(f"Symbol {symbol} is not available.")
+    if not symbol_cache.select(symbol):
         return False
-
-    if not symbol_info.visible:
-        logging.info(f"Symbol {symbol} is not visible, attempting to make it visible.")
-        if not mt5.symbol_select(symbol, True):
-            logging.error(f"Failed to select symbol {symbol}")
-            return False
-
-    logging.info(f"Symbol {symbol} is already subscribed and visible.")
+    logger.info("Symbol %s is already subscribed and visible.", symbol)
     return True
 
 def run_strategy(symbols, mt5_init, timeframe, lot_size, min_take_profit, max_loss_per_day, starting_equity, max_trades_per_day, run_backtest, data=None, std_dev=None):
     try:
-        logging.info("Starting strategy execution")
+        logger.info("Starting strategy execution")
         total_profit = 0
         total_loss = 0
         max_drawdown = 0
@@ -364,46 +500,44 @@ def run_strategy(symbols, mt5_init, timeframe, lot_size, min_take_profit, max_lo
         peak_balance = starting_equity
 
         for symbol in symbols:
-            logging.info(f"Processing symbol: {symbol}")
+            logger.info("Processing symbol: %s", symbol)
             if data is None:
                 data = get_data(symbol, mode='live', timeframe=timeframe, num_candles=Config.HISTORICAL_DATA_CANDLES)
                 if data is None or data.empty:
-                    logging.error(f"Failed to retrieve data for {symbol}")
+                    logger.error("Failed to retrieve data for %s", symbol)
                     continue
             else:
-                logging.info(f"Using provided data for {symbol}")
+                logger.info("Using provided data for %s", symbol)
 
             period = 20
             market_conditions = 'volatile'
             deviation_factor = adjust_deviation_factor(market_conditions)
 
-            logging.info("Calculating Wavy Tunnel indicators...")
-            data['wavy_h'] = calculate_ema(data['high'], 34)
-            data['wavy_c'] = calculate_ema(data['close'], 34)
-            data['wavy_l'] = calculate_ema(data['low'], 34)
-            data['tunnel1'] = calculate_ema(data['close'], 144)
-            data['tunnel2'] = calculate_ema(data['close'], 169)
-            data['long_term_ema'] = calculate_ema(data['close'], 200)
+            logger.info("Calculating Wavy Tunnel indicators...")
+            add_wavy_tunnel_indicators(data)
 
-            logging.info("Detecting peaks and dips...")
-            peak_type = 21
+            logger.info("Detecting peaks and dips...")
+            peak_type = DEFAULT_STRATEGY_PARAMS['peak_type']
             peaks, dips = detect_peaks_and_dips(data, peak_type)
-            logging.info(f"Detected peaks: {peaks[:5]} (total: {len(peaks)}), dips: {dips[:5]} (total: {len(dips)})")
+            logger.debug("Detected peaks: %s (total: %d), dips: %s (total: %d)", peaks[:5], len(peaks), dips[:5], len(dips))
+            peak_index = build_peak_index(peaks, dips, symbol)
 
-            logging.info("Generating entry signals...")
-            data['buy_signal'], data['sell_signal'] = zip(*data.apply(lambda x: check_entry_conditions(x, peaks, dips, symbol), axis=1))
+            logger.info("Generating entry signals...")
+            data['buy_signal'], data['sell_signal'], data['entry_reasons'] = compute_entry_signals(data, peak_index)
 
             buy_condition, sell_condition = generate_trade_signal(data, period, deviation_factor)
 
-            logging.info(f"Buy Condition: {buy_condition}, Sell Condition: {sell_condition}")
+            logger.info("Buy Condition: %s, Sell Condition: %s", buy_condition, sell_condition)
 
             if buy_condition or sell_condition:
                 current_data = get_data(symbol, mode='live', timeframe=mt5.TIMEFRAME_M1, num_candles=1)
                 if current_data is None or current_data.empty:
-                    logging.error(f"Failed to get current data for {symbol}")
+                    logger.error("Failed to get current data for %s", symbol)
                     continue
                 current_price = current_data['close'].iloc[-1]
-                logging.info(f"Latest price data for {symbol}: {current_price}")
+                logger.info("Latest price data for %s: %s", symbol, current_price)
+                sl_multiplier = DEFAULT_STRATEGY_PARAMS['sl_std_multiplier']
+                tp_multiplier = DEFAULT_STRATEGY_PARAMS['tp_std_multiplier']
 
                 trade_request = {
                     'action': mt5.TRADE_ACTION_DEAL,
@@ -411,8 +545,8 @@ def run_strategy(symbols, mt5_init, timeframe, lot_size, min_take_profit, max_lo
                     'volume': lot_size,
                     'type': mt5.ORDER_TYPE_BUY if buy_condition else mt5.ORDER_TYPE_SELL,
                     'price': current_price,
-                    'sl': current_price - (1.5 * std_dev) if buy_condition else current_price + (1.5 * std_dev),
-                    'tp': current_price + (2 * std_dev) if buy_condition else current_price - (2 * std_dev),
+                    'sl': current_price - (sl_multiplier * std_dev) if buy_condition else current_price + (sl_multiplier * std_dev),
+                    'tp': current_price + (tp_multiplier * std_dev) if buy_condition else current_price - (tp_multiplier * std_dev),
                     'deviation': 10,
                     'magic': 12345,
                     'comment': 'Tunnel Strategy',
@@ -420,7 +554,7 @@ def run_strategy(symbols, mt5_init, timeframe, lot_size, min_take_profit, max_lo
                     'type_time': mt5.ORDER_TIME_GTC
                 }
 
-                logging.info(f"Trade request: {trade_request}")
+                logger.info("Trade request: %s", trade_request)
                 result = execute_trade(trade_request)
                 if result:
                     profit = trade_request['tp'] - trade_request['price'] if buy_condition else trade_request['price'] - trade_request['tp']
@@ -429,13 +563,14 @@ def run_strategy(symbols, mt5_init, timeframe, lot_size, min_take_profit, max_lo
                     peak_balance = max(peak_balance, current_balance)
                     drawdown = peak_balance - current_balance
                     max_drawdown = max(max_drawdown, drawdown)
-                    logging.info(f"Trade executed successfully. Profit: {profit:.2f}, Current Balance: {current_balance:.2f}, Drawdown: {drawdown:.2f}")
+                    logger.info("Trade executed successfully. Profit: %.2f, Current Balance: %.2f, Drawdown: %.2f",
+                                profit, current_balance, drawdown)
                 else:
-                    logging.error("Trade execution failed")
+                    logger.error("Trade execution failed")
 
             manage_position(symbol, min_take_profit, max_loss_per_day, starting_equity, max_trades_per_day)
 
-        logging.info("Strategy execution completed")
+        logger.info("Strategy execution completed")
         return {
             'total_profit': total_profit,
             'total_loss': total_loss,
@@ -448,9 +583,11 @@ def run_strategy(symbols, mt5_init, timeframe, lot_size, min_take_profit, max_lo
 
 def check_broker_connection():
     if not mt5.terminal_info().connected:
-        logging.error("Broker is not connected.")
+        logger.error("Broker is not connected.")
+        # Symbol settings may change by the time the terminal reconnects
+        symbol_cache.invalidate()
         return False
-    logging.info("Broker is connected.")
+    logger.info("Broker is connected.")
     return True
 
 def check_market_open():
@@ -458,38 +595,42 @@ def check_market_open():
     market_open = dtime(0, 0)
     market_close = dtime(23, 59)
     if not (market_open <= current_time <= market_close):
-        logging.error("Market is closed.")
+        logger.error("Market is closed.")
         return False
-    logging.info("Market is open.")
+    logger.info("Market is open.")
     return True
 
+def close_request(position, tick):
+    """The market order closing ``position`` at the price of ``tick``."""
+    is_buy = position.type == mt5.ORDER_TYPE_BUY
+    return {
+        'action': mt5.TRADE_ACTION_DEAL,
+        'symbol': position.symbol,
+        'volume': position.volume,
+        'type': mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY,
+        'position': position.ticket,
+        'price': tick.bid if is_buy else tick.ask,
+        'deviation': 10,
+        'magic': 12345,
+        'comment': 'Tunnel Strategy Close',
+        'type_time': mt5.ORDER_TIME_GTC,
+        'type_filling': mt5.ORDER_FILLING_FOK,
+    }
+
 def close_position(ticket):
     try:
         position = mt5.positions_get(ticket=ticket)
         if position:
-            close_request = {
-                'action': mt5.TRADE_ACTION_DEAL,
-                'symbol': position[0].symbol,
-                'volume': position[0].volume,
-                'type': mt5.ORDER_TYPE_SELL if position[0].type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY,
-                'position': ticket,
-                'price': mt5.symbol_info_tick(position[0].symbol).bid if position[0].type == mt5.ORDER_TYPE_BUY else mt5.symbol_info_tick(position[0].symbol).ask,
-                'deviation': 10,
-                'magic': 12345,
-                'comment': 'Tunnel Strategy Close',
-                'type_time': mt5.ORDER_TIME_GTC,
-                'type_filling': mt5.ORDER_FILLING_FOK,
-            }
-
-            logging.debug(f"Closing position with request: {close_request}")
-            result = mt5.order_send(close_request)
-            logging.info(f"Close position result: {result}")
+            request = close_request(position[0], mt5.symbol_info_tick(position[0].symbol))
+            logger.debug("Closing position with request: %s", request)
+            result = mt5.order_send(request)
+            logger.info("Close position result: %s", result)
 
             if result.retcode != mt5.TRADE_RETCODE_DONE:
-                logging.error(f"Failed to close position: {result.comment}")
+                logger.error("Failed to close position: %s", result.comment)
                 return 'Close failed'
             return 'Position closed'
         return 'Position not found'
     except Exception as e:
-        logging.error(f"Failed to close position: {str(e)}")
+        logger.error("Failed to close position: %s", e)
         return 'Close failed'
\ No newline at end of file
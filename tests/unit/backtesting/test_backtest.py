@@ -3,6 +3,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
 from backtesting.backtest import run_backtest, calculate_max_drawdown, calculate_position_size
+from tests.unit.helpers import make_history
 
 class TestBacktest(unittest.TestCase):
 
@@ -41,7 +42,39 @@ class TestBacktest(unittest.TestCase):
         mock_generate_trade_signal.assert_called()
         mock_execute_trade.assert_called()
         mock_manage_position.assert_called()
-    
+
+    def test_vectorized_and_event_modes_produce_identical_trades(self):
+        data = make_history(1500)
+        common = dict(symbol='EURUSD', initial_balance=10000, risk_percent=0.01, min_take_profit=50,
+                      max_loss_per_day=1000, starting_equity=10000, stop_loss_pips=20, pip_value=0.0001,
+                      data=data)
+        for max_trades_per_day in (None, 3):
+            event = run_backtest(mode='event', max_trades_per_day=max_trades_per_day, **common)
+            vectorized = run_backtest(mode='vectorized', max_trades_per_day=max_trades_per_day, **common)
+            self.assertGreater(event['num_trades'], 0)
+            self.assertEqual(event['trades'], vectorized['trades'])
+            self.assertEqual(event['total_profit'], vectorized['total_profit'])
+
+    def test_run_backtest_accepts_column_arrays(self):
+        data = make_history(1500)
+        original = data.copy()
+        common = dict(symbol='EURUSD', initial_balance=10000, risk_percent=0.01, min_take_profit=50,
+                      max_loss_per_day=1000, starting_equity=10000, stop_loss_pips=20, pip_value=0.0001)
+        arrays = {column: data[column].to_numpy() for column in data.columns}
+        for values in arrays.values():
+            values.flags.writeable = False
+
+        from_frame = run_backtest(data=data, **common)
+        from_arrays = run_backtest(data=arrays, **common)
+        self.assertEqual(from_frame['trades'], from_arrays['trades'])
+        pd.testing.assert_frame_equal(data, original)
+
+    def test_run_backtest_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            run_backtest(symbol='EURUSD', initial_balance=10000, risk_percent=0.01, min_take_profit=50,
+                         max_loss_per_day=1000, starting_equity=10000, stop_loss_pips=20, pip_value=0.0001,
+                         data=make_history(1500), mode='bogus')
+
     def test_calculate_max_drawdown(self):
         trades = [
             {'profit': 100},
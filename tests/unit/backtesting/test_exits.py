@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from backtesting.exits import first_crossing, scan_exit, simulate_exits
+
+class TestExits(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(1)
+        n = 3000
+        self.close = 1.1 + np.random.randn(n).cumsum() * 0.001
+        self.open = np.r_[self.close[0], self.close[:-1]] + np.random.randn(n) * 0.0005
+        self.high = np.maximum(self.open, self.close) + np.random.rand(n) * 0.001
+        self.low = np.minimum(self.open, self.close) - np.random.rand(n) * 0.001
+
+    def test_first_crossing_matches_linear_scan(self):
+        for level in (1.09, 1.1, 1.12, 5.0):
+            for start in (0, 63, 64, 1000):
+                expected = next((i for i in range(start, len(self.high)) if self.high[i] >= level), -1)
+                self.assertEqual(first_crossing(self.high, level, start, above=True), expected)
+                expected = next((i for i in range(start, len(self.low)) if self.low[i] <= level), -1)
+                self.assertEqual(first_crossing(self.low, level, start, above=False), expected)
+
+    def test_simulate_exits_matches_bar_by_bar_scan(self):
+        entry_index = np.sort(np.random.choice(len(self.close) - 1, 400, replace=False))
+        is_buy = np.random.rand(400) > 0.5
+        width = np.random.rand(400) * 0.01
+        entry = self.close[entry_index]
+        sl = np.where(is_buy, entry - width, entry + width)
+        tp = np.where(is_buy, entry + 1.3 * width, entry - 1.3 * width)
+
+        for tie_break in ('stop_first', 'target_first', 'nearest_to_open'):
+            exit_index, exit_price, exit_reason = simulate_exits(self.high, self.low, self.open, self.close,
+                                                                 entry_index, is_buy, sl, tp, tie_break)
+            for k in range(400):
+                expected = scan_exit(self.high, self.low, self.open, self.close, entry_index[k],
+                                     is_buy[k], sl[k], tp[k], tie_break)
+                self.assertEqual((exit_index[k], exit_price[k], exit_reason[k]), expected)
+
+    def test_tie_break_rules(self):
+        # Bar 1 touches both the stop (1.0) and the target (1.3); it opens closer to the target
+        high = np.array([1.1, 1.4])
+        low = np.array([1.1, 0.9])
+        open_ = np.array([1.1, 1.25])
+        close = np.array([1.1, 1.1])
+        args = (high, low, open_, close, np.array([0]), np.array([True]), np.array([1.0]), np.array([1.3]))
+        self.assertEqual(simulate_exits(*args, 'stop_first')[2][0], 'stop_loss')
+        self.assertEqual(simulate_exits(*args, 'target_first')[2][0], 'take_profit')
+        self.assertEqual(simulate_exits(*args, 'nearest_to_open')[2][0], 'take_profit')
+        with self.assertRaises(ValueError):
+            simulate_exits(*args, 'bogus')
+
+    def test_gap_through_stop_fills_at_open(self):
+        high = np.array([1.1, 0.95])
+        low = np.array([1.1, 0.9])
+        open_ = np.array([1.1, 0.95])
+        close = np.array([1.1, 0.92])
+        self.assertEqual(scan_exit(high, low, open_, close, 0, True, 1.0, 1.3), (1, 0.95, 'stop_loss'))
+
+    def test_unresolved_trade_exits_at_end_of_data(self):
+        exit_index, exit_price, exit_reason = simulate_exits(
+            self.high, self.low, self.open, self.close, np.array([10]), np.array([True]),
+            np.array([0.0]), np.array([100.0]))
+        self.assertEqual(exit_index[0], len(self.close) - 1)
+        self.assertEqual(exit_price[0], self.close[-1])
+        self.assertEqual(exit_reason[0], 'end_of_data')
+
+if __name__ == '__main__':
+    unittest.main()
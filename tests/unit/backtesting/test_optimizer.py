@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from backtesting.backtest import run_backtest
+from backtesting.optimizer import parameter_grid, random_parameter_samples, precompute_emas, run_optimization
+from tests.unit.helpers import make_history
+
+class TestOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_history()
+        self.grid = {'wavy_period': [21, 34], 'peak_type': [11, 21], 'sl_std_multiplier': [1.0, 1.5]}
+        self.kwargs = dict(initial_balance=10000, risk_percent=0.01, min_take_profit=50, max_loss_per_day=1000,
+                           starting_equity=10000, stop_loss_pips=20, pip_value=0.0001)
+
+    def test_parameter_grid(self):
+        combinations = parameter_grid(self.grid)
+        self.assertEqual(len(combinations), 8)
+        self.assertIn({'wavy_period': 34, 'peak_type': 11, 'sl_std_multiplier': 1.5}, combinations)
+
+    def test_random_parameter_samples_are_distinct_and_repeatable(self):
+        samples = random_parameter_samples(self.grid, 5, seed=3)
+        self.assertEqual(len(samples), 5)
+        self.assertEqual(len({tuple(sample.items()) for sample in samples}), 5)
+        self.assertEqual(samples, random_parameter_samples(self.grid, 5, seed=3))
+        self.assertEqual(len(random_parameter_samples(self.grid, 100)), 8)
+
+    def test_shared_ema_cache_does_not_change_results(self):
+        combinations = parameter_grid(self.grid)
+        cache = precompute_emas(self.data, combinations)
+        # wavy 21/34 on high, close and low plus tunnel1, tunnel2 and long-term on close
+        self.assertEqual(len(cache), 9)
+        for params in combinations[:3]:
+            cached = run_backtest(symbol='EURUSD', data=self.data, params=params, ema_cache=cache, **self.kwargs)
+            fresh = run_backtest(symbol='EURUSD', data=self.data, params=params, **self.kwargs)
+            self.assertEqual(cached['trades'], fresh['trades'])
+
+    def test_unknown_parameter_raises(self):
+        with self.assertRaises(ValueError):
+            run_backtest(symbol='EURUSD', data=self.data, params={'bogus': 1}, **self.kwargs)
+
+    def test_run_optimization_ranks_and_writes_results(self):
+        combinations = parameter_grid(self.grid)
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, 'results.csv')
+            results = run_optimization('EURUSD', self.data, combinations, max_workers=2,
+                                       output_path=output_path, **self.kwargs)
+            self.assertTrue(os.path.exists(output_path))
+            self.assertEqual(len(pd.read_csv(output_path)), len(combinations))
+
+        self.assertEqual(list(results['rank']), list(range(1, len(combinations) + 1)))
+        self.assertTrue(results['total_profit'].is_monotonic_decreasing)
+        params = {name: results[name].iloc[0] for name in self.grid}
+        expected = run_backtest(symbol='EURUSD', data=self.data, params=params, **self.kwargs)
+        self.assertAlmostEqual(results['total_profit'].iloc[0], expected['total_profit'])
+
+if __name__ == '__main__':
+    unittest.main()
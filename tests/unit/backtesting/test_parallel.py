@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+import pandas as pd
+from backtesting.backtest import run_backtest
+import MetaTrader5 as mt5
+from metatrader.bar_store import BarStore
+from backtesting.parallel import share_history, attach_history, run_parallel_backtests, portfolio_report
+from tests.unit.helpers import make_history
+
+class TestParallelBacktest(unittest.TestCase):
+
+    def setUp(self):
+        self.histories = {'EURUSD': make_history(seed=0, tick_volume=True), 'GBPUSD': make_history(seed=1, tick_volume=True)}
+        self.kwargs = dict(initial_balance=10000, risk_percent=0.01, min_take_profit=50, max_loss_per_day=1000,
+                           starting_equity=10000, stop_loss_pips=20, pip_value=0.0001, max_trades_per_day=3)
+
+    def test_share_and_attach_round_trip(self):
+        data = make_history(periods=50, tick_volume=True)
+        data['comment'] = 'dropped'
+        shm, descriptor = share_history(data)
+        try:
+            restored = attach_history(descriptor)
+        finally:
+            shm.close()
+            shm.unlink()
+        pd.testing.assert_frame_equal(restored, data.drop(columns=['comment']))
+
+    def test_parallel_results_match_sequential_runs(self):
+        results = run_parallel_backtests(self.histories, max_workers=2, **self.kwargs)
+        self.assertEqual(set(results), set(self.histories))
+        for symbol, data in self.histories.items():
+            expected = run_backtest(symbol=symbol, data=data, **self.kwargs)
+            self.assertEqual(results[symbol]['trades'], expected['trades'])
+            self.assertEqual(results[symbol]['total_profit'], expected['total_profit'])
+
+    def test_parallel_backtests_over_bar_store_views(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = BarStore(directory)
+            histories = {}
+            for symbol, data in self.histories.items():
+                rates = data.assign(time=data['time'].astype('int64') // 10**9)
+                store.write(symbol, mt5.TIMEFRAME_H1, rates, append=False)
+                histories[symbol] = store.open_arrays(symbol, mt5.TIMEFRAME_H1)
+
+            results = run_parallel_backtests(histories, max_workers=2, **self.kwargs)
+            for symbol, data in self.histories.items():
+                expected = run_backtest(symbol=symbol, data=data, **self.kwargs)
+                self.assertEqual(results[symbol]['trades'], expected['trades'])
+
+    def test_portfolio_report_merges_symbols(self):
+        results = {
+            'EURUSD': {'total_profit': 50, 'num_trades': 2, 'win_rate': 0.5, 'max_drawdown': 0.01,
+                       'trades': [{'entry_time': 1, 'exit_time': 4, 'profit': 100},
+                                  {'entry_time': 2, 'exit_time': 3, 'profit': -50}]},
+            'GBPUSD': {'total_profit': 20, 'num_trades': 1, 'win_rate': 1.0, 'max_drawdown': 0,
+                       'trades': [{'entry_time': 1, 'exit_time': 2, 'profit': 20}]},
+        }
+        report = portfolio_report(results, 1000)
+        self.assertEqual(report['total_profit'], 70)
+        self.assertEqual(report['final_balance'], 1070)
+        self.assertEqual(report['num_trades'], 3)
+        self.assertEqual([trade['exit_time'] for trade in report['trades']], [2, 3, 4])
+        self.assertAlmostEqual(report['max_drawdown'], 50 / 1020)
+        self.assertEqual(list(report['per_symbol'].index), ['EURUSD', 'GBPUSD'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from backtesting.backtest import run_backtest
+from config import Config
+from backtesting.tick_replay import QuoteIndex, build_bars, first_exit, run_tick_backtest, tick_columns
+from strategy.live_loop import SymbolTrader
+from strategy.tunnel_strategy import warmup_bars
+from tests.unit.helpers import make_history
+
+def bars_tick_by_tick(time_msc, bid, timeframe):
+    """Reference bar building, one tick at a time: ``(revealing tick, closed bar)`` pairs."""
+    seconds = Config.TIMEFRAME_SECONDS[timeframe]
+    bar = None
+    emitted = []
+    for i, (t, b) in enumerate(zip(time_msc.tolist(), bid.tolist())):
+        start = t // 1000 // seconds * seconds
+        if bar is not None and start != bar['time']:
+            emitted.append((i, bar))
+            bar = None
+        if bar is None:
+            bar = {'time': start, 'open': b, 'high': b, 'low': b, 'close': b, 'tick_volume': 1}
+        else:
+            bar.update(high=max(bar['high'], b), low=min(bar['low'], b), close=b, tick_volume=bar['tick_volume'] + 1)
+    return emitted
+
+def ticks_from_bars(bars, spread=0.0):
+    """Four ticks per bar (open, high, low, close), 15 minutes apart."""
+    start = bars['time'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+    time_msc = (start[:, None] + np.arange(4) * 900000).ravel()
+    bid = bars[['open', 'high', 'low', 'close']].to_numpy().ravel()
+    return pd.DataFrame({'time_msc': time_msc, 'bid': bid, 'ask': bid + spread})
+
+class TestTickReplay(unittest.TestCase):
+
+    common = dict(symbol='EURUSD', initial_balance=10000, risk_percent=0.01, stop_loss_pips=20, pip_value=0.0001)
+
+    def test_build_bars_matches_tick_by_tick_building(self):
+        rng = np.random.default_rng(1)
+        time_msc = np.cumsum(rng.integers(1, 600000, 5000)) + 1672617600000
+        bid = 1.1 + rng.standard_normal(5000).cumsum() * 0.0001
+        bars, reveal = build_bars(time_msc, bid, mt5.TIMEFRAME_H1)
+
+        emitted = bars_tick_by_tick(time_msc, bid, mt5.TIMEFRAME_H1)
+        self.assertEqual(list(reveal), [i for i, _ in emitted])
+        for column in ('open', 'high', 'low', 'close', 'tick_volume'):
+            np.testing.assert_array_equal(bars[column], [bar[column] for _, bar in emitted])
+        np.testing.assert_array_equal(bars['time'].astype(np.int64), [bar['time'] for _, bar in emitted])
+
+    def test_quote_index_finds_the_same_exits_as_a_tick_scan(self):
+        rng = np.random.default_rng(2)
+        quotes = 1.1 + rng.standard_normal(5000).cumsum() * 0.0001
+        index = QuoteIndex(quotes, block=64)
+        for start in rng.integers(0, len(quotes), 200).tolist():
+            for is_buy in (True, False):
+                sign = 1 if is_buy else -1
+                sl = quotes[start] - sign * rng.uniform(0, 0.01)
+                tp = quotes[start] + sign * rng.uniform(0, 0.01)
+                self.assertEqual(index.first_exit(start, sl, tp, is_buy), first_exit(quotes, start, sl, tp, is_buy))
+
+    def test_tick_columns_accepts_mt5_tick_arrays(self):
+        ticks = np.zeros(3, dtype=[('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('time_msc', '<i8')])
+        ticks['time_msc'] = [1000, 2000, 3000]
+        time_msc, bid, ask = tick_columns(ticks)
+        self.assertEqual(list(time_msc), [1000, 2000, 3000])
+
+    def test_same_signals_as_the_bar_backtest(self):
+        history = make_history(1500)
+        bar_result = run_backtest(min_take_profit=50, max_loss_per_day=1000, starting_equity=10000,
+                                  data=history, **self.common)
+        tick_result = run_tick_backtest(ticks=ticks_from_bars(history), mode='vectorized', **self.common)
+
+        self.assertEqual(tick_result['num_bars'], len(history) - 1)
+        self.assertGreater(tick_result['num_trades'], 0)
+        # The last bar's signal never gets a tick to trade on
+        bar_trades = [t for t in bar_result['trades'] if t['entry_time'] < history['time'].iloc[-1]]
+        self.assertEqual([(t['action'], t['entry_price']) for t in bar_trades],
+                         [(t['action'], t['signal_price']) for t in tick_result['trades']])
+        for trade in tick_result['trades']:
+            # Orders go out on the first tick of the next bar
+            self.assertEqual(trade['entry_time'].minute, 0)
+
+    def test_incremental_replay_runs_the_live_entry_path(self):
+        ticks = ticks_from_bars(make_history(600))
+        with patch.object(SymbolTrader, 'entry_request', autospec=True, side_effect=SymbolTrader.entry_request) as entry:
+            result = run_tick_backtest(ticks=ticks, **self.common)
+        self.assertGreater(result['num_trades'], 0)
+        self.assertEqual(result['num_bars'], 599)
+        # Once per closed bar after the warmup, as the live loop does
+        self.assertEqual(entry.call_count, result['num_bars'] - warmup_bars() + 1)
+
+    def test_incremental_replay_does_not_look_ahead(self):
+        ticks = ticks_from_bars(make_history(600))
+        full = run_tick_backtest(ticks=ticks, **self.common)
+        cut = ticks.iloc[:1600]
+        partial = run_tick_backtest(ticks=cut, **self.common)
+        last_tick = pd.Timestamp(cut['time_msc'].iloc[-1], unit='ms')
+        entries = lambda result: [(t['action'], t['entry_time'], t['signal_price'], t['volume'])
+                                  for t in result['trades'] if t['entry_time'] <= last_tick]
+        self.assertGreater(len(entries(partial)), 0)
+        self.assertEqual(entries(partial), entries(full))
+
+    def test_spread_and_latency_are_paid(self):
+        history = make_history(1500)
+        tight = run_tick_backtest(ticks=ticks_from_bars(history), **self.common)
+        wide = run_tick_backtest(ticks=ticks_from_bars(history, spread=0.0003), **self.common)
+        self.assertAlmostEqual(wide['average_entry_spread'], 0.0003)
+        self.assertLess(wide['total_profit'], tight['total_profit'])
+
+        late = run_tick_backtest(ticks=ticks_from_bars(history), latency_ms=1000, **self.common)
+        self.assertTrue(all(trade['entry_time'].minute == 15 for trade in late['trades']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from backtesting.optimizer import parameter_grid, precompute_emas
+from backtesting.walk_forward import walk_forward_windows, segment_backtest_args, run_walk_forward
+from metatrader.indicators import ema_array
+from tests.unit.helpers import make_history
+
+class TestWalkForward(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_history(1000)
+        self.combinations = parameter_grid({'wavy_period': [21, 34], 'tunnel1_period': [50], 'tunnel2_period': [60],
+                                            'long_term_period': [80], 'sl_std_multiplier': [1.0, 1.5]})
+        self.kwargs = dict(initial_balance=10000, risk_percent=0.01, min_take_profit=50, max_loss_per_day=1000,
+                           starting_equity=10000, stop_loss_pips=20, pip_value=0.0001)
+
+    def test_walk_forward_windows(self):
+        windows = walk_forward_windows(1000, 300, 100, warmup=80)
+        self.assertEqual(windows[0], (80, 380, 380, 480))
+        self.assertEqual(windows[1], (180, 480, 480, 580))
+        self.assertEqual(windows[-1], (580, 880, 880, 980))
+        self.assertEqual(walk_forward_windows(1000, 300, 100, step=300, warmup=80)[1], (380, 680, 680, 780))
+        self.assertEqual(walk_forward_windows(300, 300, 100), [])
+
+    def test_segments_reuse_full_history_emas(self):
+        cache = precompute_emas(self.data, self.combinations)
+        segment, segment_cache, trade_start = segment_backtest_args(self.data, cache, 500, 600, 80)
+        self.assertEqual(len(segment), 180)
+        self.assertEqual(trade_start, 80)
+        self.assertEqual(segment['time'].iloc[trade_start], self.data['time'].iloc[500])
+        full = ema_array(self.data['close'], 50)
+        np.testing.assert_array_equal(segment_cache[('close', 50)], full[420:600])
+
+    def test_run_walk_forward_trades_only_out_of_sample(self):
+        summary = run_walk_forward('EURUSD', self.data, self.combinations, in_sample=300, out_of_sample=100,
+                                   max_workers=2, **self.kwargs)
+        windows = summary['windows']
+        self.assertEqual(len(windows), 6)
+        self.assertEqual(summary['num_trades'], windows['out_of_sample_num_trades'].sum())
+        self.assertAlmostEqual(summary['total_profit'], windows['out_of_sample_total_profit'].sum())
+        for trade in summary['trades']:
+            in_window = ((windows['out_of_sample_start'] <= trade['entry_time']) &
+                         (trade['entry_time'] <= windows['out_of_sample_end']))
+            self.assertTrue(in_window.any())
+
+    def test_run_walk_forward_not_enough_data(self):
+        with self.assertRaises(ValueError):
+            run_walk_forward('EURUSD', self.data.head(300), self.combinations, in_sample=300, out_of_sample=100,
+                             **self.kwargs)
+
+if __name__ == '__main__':
+    unittest.main()
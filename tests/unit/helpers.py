@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+def random_walk(periods, seed=0, scale=0.002):
+    """Closes of a seeded random walk around 1.1."""
+    np.random.seed(seed)
+    return 1.1 + np.random.randn(periods).cumsum() * scale
+
+def make_history(periods=1200, seed=0, tick_volume=False):
+    """Hourly random-walk OHLC history from 2023-01-02, with a rising ``tick_volume`` column if asked."""
+    close = random_walk(periods, seed)
+    history = pd.DataFrame({
+        'time': pd.date_range(start='2023-01-02', periods=periods, freq='h'),
+        'open': close,
+        'high': close + np.random.rand(periods) * 0.002,
+        'low': close - np.random.rand(periods) * 0.002,
+        'close': close,
+    })
+    if tick_volume:
+        history['tick_volume'] = np.arange(periods, dtype=np.int64)
+    return history
+
+def make_bars(close, start='2024-01-01', spread=1, tick_volume=100, high_offset=0.0005, low_offset=0.0005):
+    """
+    Hourly bars shaped like MT5 rates. ``close`` is the closes, or a number
+    of bars rising by 0.0001 from 1.1.
+    """
+    if np.isscalar(close):
+        close = 1.1 + np.arange(close) * 0.0001
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({
+        'time': pd.date_range(start=start, periods=len(close), freq='h'),
+        'open': close,
+        'high': close + high_offset,
+        'low': close - low_offset,
+        'close': close,
+        'tick_volume': tick_volume,
+        'spread': spread,
+        'real_volume': 0,
+    })
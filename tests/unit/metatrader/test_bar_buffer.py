@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from metatrader.bar_buffer import BarBuffer
+from tests.unit.helpers import make_bars
+
+class TestBarBuffer(unittest.TestCase):
+
+    def test_keeps_the_latest_bars_in_order(self):
+        bars = make_bars(25)
+        buffer = BarBuffer(10)
+        self.assertEqual(buffer.extend(bars.iloc[:4]), 4)
+        self.assertEqual(len(buffer), 4)
+        for start in range(4, 25, 3):
+            buffer.extend(bars.iloc[start:start + 3])
+        self.assertEqual(len(buffer), 10)
+        np.testing.assert_array_equal(buffer['close'], bars['close'].iloc[-10:])
+        np.testing.assert_array_equal(buffer['time'], bars['time'].iloc[-10:])
+        pd.testing.assert_frame_equal(buffer.frame(), bars.iloc[-10:].reset_index(drop=True), check_dtype=False)
+
+    def test_snapshots_replace_the_forming_bar(self):
+        bars = make_bars(12)
+        buffer = BarBuffer(5)
+        buffer.extend(bars.iloc[:10])
+        columns = buffer['close'].base
+
+        forming = bars.iloc[9:10].assign(close=1.5)
+        self.assertEqual(buffer.extend(forming), 0)
+        self.assertEqual(buffer['close'][-1], 1.5)
+        # Older bars are ignored, later ones appended
+        self.assertEqual(buffer.extend(bars.iloc[8:11]), 1)
+        self.assertEqual(buffer['close'][-2], bars['close'].iloc[9])
+        self.assertEqual(buffer.last_time, bars['time'].iloc[10])
+        # Views into the same preallocated columns
+        self.assertIs(buffer['close'].base, columns)
+
+    def test_frame_is_rebuilt_only_after_changes(self):
+        buffer = BarBuffer(3)
+        buffer.extend(make_bars(3))
+        frame = buffer.frame()
+        self.assertIs(buffer.frame(), frame)
+        buffer.replace_last(make_bars(3).iloc[2].to_dict())
+        self.assertIsNot(buffer.frame(), frame)
+        self.assertEqual(list(buffer.columns(2)['close']), list(frame['close'][:2]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+import MetaTrader5 as mt5
+from metatrader.bar_clock import BarClock
+
+HOUR = 3600
+# 2023-01-02 10:00 server time
+BAR = 1672653600
+OFFSET = 2 * HOUR
+
+class TestBarClock(unittest.TestCase):
+
+    def setUp(self):
+        self.bar_time = BAR
+        self.local = BAR - OFFSET + 1200
+        self.terminal = MagicMock()
+        self.terminal.copy_rates_from_pos.side_effect = lambda *args: np.array(
+            [(self.bar_time,)], dtype=[('time', '<i8')])
+        patchers = [
+            patch('metatrader.bar_clock.mt5', self.terminal),
+            # The last tick is three minutes old
+            patch('metatrader.bar_clock.server_time', side_effect=lambda symbol: self.local + OFFSET - 180),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.clock = BarClock('EURUSD', mt5.TIMEFRAME_H1, grace=2, clock=lambda: self.local)
+
+    def test_sleeps_until_the_bar_closes(self):
+        self.assertEqual(self.clock.seconds_until_close(), HOUR - 1200 + 2)
+        self.terminal.copy_rates_from_pos.assert_called_once_with('EURUSD', mt5.TIMEFRAME_H1, 0, 1)
+
+    def test_check_reports_new_bars_once(self):
+        self.assertFalse(self.clock.check())
+        self.assertFalse(self.clock.check())
+        self.bar_time += HOUR
+        self.assertTrue(self.clock.check())
+        self.assertFalse(self.clock.check())
+
+    def test_retries_until_the_new_bar_shows_up(self):
+        self.clock.check()
+        self.local += HOUR
+        # Past the close but no tick of the new bar yet
+        self.assertFalse(self.clock.check())
+        self.assertEqual(self.clock.seconds_until_close(), 2)
+        self.bar_time += HOUR
+        self.assertTrue(self.clock.check())
+        self.assertEqual(self.clock.seconds_until_close(), HOUR - 1200 + 2)
+
+    def test_missing_rates(self):
+        self.terminal.copy_rates_from_pos.side_effect = None
+        self.terminal.copy_rates_from_pos.return_value = None
+        self.assertFalse(self.clock.check())
+        self.assertEqual(self.clock.seconds_until_close(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
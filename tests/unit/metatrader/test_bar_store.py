@@ -0,0 +1,126 @@
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from metatrader.bar_store import BarStore, to_epoch
+
+HOUR = 3600
+START = to_epoch(datetime(2023, 1, 2))
+
+class FakeTerminal:
+    """Hourly bars starting at START, the last of which is still forming at ``now``."""
+
+    def __init__(self, bars=500):
+        self.times = START + HOUR * np.arange(bars)
+        self.close = 1.1 + np.arange(bars) * 0.0001
+        self.now = int(self.times[-1]) + HOUR // 2
+        self.calls = []
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.calls.append((to_epoch(date_from), to_epoch(date_to)))
+        mask = (self.times >= to_epoch(date_from)) & (self.times <= to_epoch(date_to))
+        return pd.DataFrame({
+            'time': self.times[mask], 'open': self.close[mask], 'high': self.close[mask] + 0.001,
+            'low': self.close[mask] - 0.001, 'close': self.close[mask], 'tick_volume': 10,
+            'spread': 1, 'real_volume': 0
+        }).to_records(index=False)
+
+class TestBarStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.terminal = FakeTerminal()
+        self.store = BarStore(self.directory.name, fetch=self.terminal.copy_rates_range)
+        patcher = patch('metatrader.bar_store.server_time', side_effect=lambda symbol: self.terminal.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def dt(self, bar):
+        return datetime.utcfromtimestamp(START + bar * HOUR)
+
+    def test_repeated_range_is_served_from_disk(self):
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(99))
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(99))
+        self.assertEqual(len(self.terminal.calls), 1)
+
+        data = self.store.read('EURUSD', mt5.TIMEFRAME_H1, self.dt(10), self.dt(19))
+        self.assertEqual(len(data), 10)
+        self.assertEqual(data['time'].iloc[0], pd.Timestamp(self.dt(10)))
+        np.testing.assert_array_equal(data['close'].to_numpy(), self.terminal.close[10:20])
+
+    def test_only_missing_tail_is_fetched(self):
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(99))
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(199))
+        self.assertEqual(self.terminal.calls[1], (START + 99 * HOUR, START + 199 * HOUR))
+        self.assertEqual(self.store.meta('EURUSD', mt5.TIMEFRAME_H1)['count'], 200)
+        data = self.store.read('EURUSD', mt5.TIMEFRAME_H1)
+        self.assertTrue(data['time'].is_unique)
+
+    def test_forming_bar_is_returned_but_not_stored(self):
+        latest = self.store.latest('EURUSD', mt5.TIMEFRAME_H1, 50)
+        self.assertEqual(len(latest), 50)
+        self.assertEqual(latest['time'].iloc[-1], pd.Timestamp(self.dt(499)))
+        self.assertEqual(self.store.meta('EURUSD', mt5.TIMEFRAME_H1)['last_time'], START + 498 * HOUR)
+
+        # The forming bar closes and a new one starts; only the tail is refetched
+        self.terminal = FakeTerminal(bars=501)
+        self.store.fetch = self.terminal.copy_rates_range
+        latest = self.store.latest('EURUSD', mt5.TIMEFRAME_H1, 50)
+        self.assertEqual(latest['time'].iloc[-1], pd.Timestamp(self.dt(500)))
+        self.assertEqual(self.store.meta('EURUSD', mt5.TIMEFRAME_H1)['last_time'], START + 499 * HOUR)
+        # Resumes one bar before the previous server time, so bar 499 is refetched but bar 498 is not
+        self.assertEqual(self.terminal.calls[0][0], START + 498 * HOUR + HOUR // 2)
+
+    def test_empty_fetch_is_not_marked_as_fetched(self):
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(99))
+        # The terminal is still downloading the next range and has no bars for it yet
+        fetch = self.store.fetch
+        self.store.fetch = lambda *args: fetch(*args)[:0]
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(199))
+        self.store.fetch = fetch
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(199))
+
+        self.assertEqual(self.terminal.calls[2], (START + 99 * HOUR, START + 199 * HOUR))
+        data = self.store.read('EURUSD', mt5.TIMEFRAME_H1)
+        np.testing.assert_array_equal(data['close'].to_numpy(), self.terminal.close[:200])
+
+    def test_earlier_start_rebuilds_history(self):
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(100), self.dt(199))
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(50), self.dt(199))
+        data = self.store.read('EURUSD', mt5.TIMEFRAME_H1)
+        self.assertEqual(len(data), 150)
+        self.assertEqual(data['time'].iloc[0], pd.Timestamp(self.dt(50)))
+
+    def test_interrupted_write_is_discarded(self):
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(9))
+        directory = self.store.directory('EURUSD', mt5.TIMEFRAME_H1)
+        with open(os.path.join(directory, 'close.bin'), 'ab') as f:
+            f.write(b'\x00' * 12)
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(19))
+        np.testing.assert_array_equal(self.store.read('EURUSD', mt5.TIMEFRAME_H1)['close'].to_numpy(),
+                                      self.terminal.close[:20])
+
+    def test_open_arrays_are_read_only_views(self):
+        self.store.sync('EURUSD', mt5.TIMEFRAME_H1, self.dt(0), self.dt(199))
+        arrays = self.store.open_arrays('EURUSD', mt5.TIMEFRAME_H1, self.dt(50), self.dt(149))
+        self.assertEqual(arrays.num_bars, 100)
+        self.assertIsInstance(arrays['close'], np.memmap)
+        self.assertFalse(arrays['close'].flags.writeable)
+        with self.assertRaises(ValueError):
+            arrays['close'][0] = 0
+        self.assertEqual(arrays['time'].dtype, np.dtype('datetime64[s]'))
+        np.testing.assert_array_equal(arrays['close'], self.terminal.close[50:150])
+
+        # Pickling carries only the file reference; the copy maps the same data
+        payload = pickle.dumps(arrays)
+        self.assertLess(len(payload), 1000)
+        np.testing.assert_array_equal(pickle.loads(payload)['close'], arrays['close'])
+
+if __name__ == '__main__':
+    unittest.main()
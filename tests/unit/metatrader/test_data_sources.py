@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from config import Config
+from metatrader.data_retrieval import get_data
+from metatrader.data_sources import normalize_bars, FileDataSource, HTTPDataSource, get_data_source
+from tests.unit.helpers import make_bars
+
+def make_vendor_bars(periods=100):
+    # Bars as a vendor CSV/API exports them: capitalized columns and tz-aware dates
+    bars = make_bars(periods, start='2023-01-02', high_offset=0.001, low_offset=0.001)
+    return pd.DataFrame({
+        'Date': bars['time'].dt.tz_localize('Europe/Berlin'),
+        'Open': bars['open'], 'High': bars['high'], 'Low': bars['low'], 'Close': bars['close'], 'Volume': 10,
+    })
+
+class TestDataSources(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.bars = make_vendor_bars()
+        self.bars.to_csv(os.path.join(self.directory.name, 'EURUSD_H1.csv'), index=False)
+
+    def test_normalize_bars(self):
+        bars = normalize_bars(self.bars, 'UTC')
+        self.assertEqual(list(bars.columns), ['time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume'])
+        self.assertIsNone(bars['time'].dt.tz)
+        # 2023-01-02 00:00 in Berlin is 2023-01-01 23:00 UTC
+        self.assertEqual(bars['time'].iloc[0], pd.Timestamp('2023-01-01 23:00'))
+        self.assertEqual(bars['tick_volume'].iloc[0], 10)
+        self.assertEqual(bars['spread'].iloc[0], 0)
+
+        epoch = normalize_bars(pd.DataFrame({'timestamp': [1672704000], 'open': [1], 'high': [1], 'low': [1], 'close': [1]}))
+        self.assertEqual(epoch['time'].iloc[0], pd.Timestamp('2023-01-03'))
+
+        mixed = normalize_bars(pd.DataFrame({'time': ['2023-01-02T10:00:00+02:00', '2023-01-02T09:00:00+00:00'],
+                                             'open': 1, 'high': 1, 'low': 1, 'close': 1}), 'UTC')
+        self.assertEqual(list(mixed['time']), [pd.Timestamp('2023-01-02 08:00'), pd.Timestamp('2023-01-02 09:00')])
+
+    def test_file_source_reads_range_in_chunks(self):
+        source = FileDataSource(self.directory.name, chunk_rows=7, timezone='UTC')
+        start, end = pd.Timestamp('2023-01-02 10:00'), pd.Timestamp('2023-01-03 05:00')
+        chunks = list(source.iter_bars('EURUSD', mt5.TIMEFRAME_H1, start, end))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 7 for chunk in chunks))
+
+        bars = source.get_bars('EURUSD', mt5.TIMEFRAME_H1, start, end)
+        expected = normalize_bars(self.bars, 'UTC')
+        expected = expected[(expected['time'] >= start) & (expected['time'] <= end)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(bars.reset_index(drop=True), expected)
+
+        # Reading stops at the first chunk past the end of the range
+        pulled = []
+        read_chunks = source._raw_chunks
+
+        def counting_chunks(path):
+            for chunk in read_chunks(path):
+                pulled.append(len(chunk))
+                yield chunk
+
+        with patch.object(source, '_raw_chunks', counting_chunks):
+            list(source.iter_bars('EURUSD', mt5.TIMEFRAME_H1, start, start))
+        self.assertEqual(len(pulled), 2)
+
+    def test_file_source_latest_and_missing_file(self):
+        source = FileDataSource(self.directory.name, chunk_rows=9, timezone='UTC')
+        latest = source.get_latest('EURUSD', mt5.TIMEFRAME_H1, 20)
+        self.assertEqual(len(latest), 20)
+        self.assertEqual(latest['close'].iloc[-1], self.bars['Close'].iloc[-1])
+        with self.assertRaises(FileNotFoundError):
+            source.get_bars('GBPUSD', mt5.TIMEFRAME_H1, None, None)
+
+    def test_file_source_reads_ticks(self):
+        pd.DataFrame({
+            'Time': pd.date_range('2023-01-02 10:00', periods=50, freq='s', tz='Europe/Berlin'),
+            'Bid': 1.1, 'Ask': 1.1001,
+        }).to_csv(os.path.join(self.directory.name, 'EURUSD_ticks.csv'), index=False)
+        source = FileDataSource(self.directory.name, chunk_rows=8, timezone='UTC')
+        ticks = source.get_ticks('EURUSD', pd.Timestamp('2023-01-02 09:00:10'), pd.Timestamp('2023-01-02 09:00:19'))
+        self.assertEqual(list(ticks.columns), ['time_msc', 'bid', 'ask'])
+        self.assertEqual(len(ticks), 10)
+        self.assertEqual(ticks['time_msc'].iloc[0], pd.Timestamp('2023-01-02 09:00:10').value // 10 ** 6)
+
+    def test_http_source_follows_pages(self):
+        bars = normalize_bars(self.bars, 'UTC').assign(time=lambda frame: frame['time'].astype('int64') // 10**9)
+        records = bars.to_dict('records')
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                requests.append(query)
+                page = int(query.get('page', ['0'])[0])
+                payload = {'bars': records[page * 60:(page + 1) * 60]}
+                if page == 0:
+                    payload['next'] = f"http://127.0.0.1:{self.server.server_port}/bars?page=1"
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        source = HTTPDataSource(f"http://127.0.0.1:{server.server_port}", timeout=5)
+        data = source.get_bars('EURUSD', mt5.TIMEFRAME_H1, '2023-01-01', '2023-01-10')
+        self.assertEqual(len(data), 100)
+        self.assertEqual(requests[0]['symbol'], ['EURUSD'])
+        self.assertEqual(requests[0]['timeframe'], ['H1'])
+        self.assertEqual(len(requests), 2)
+
+    def test_get_data_dispatches_on_config(self):
+        with patch.object(Config, 'DATA_SOURCE', 'CSV'), patch.object(Config, 'DATA_DIR', self.directory.name):
+            self.assertIsInstance(get_data_source(), FileDataSource)
+            data = get_data('EURUSD', mode='backtest', start_date=pd.Timestamp('2023-01-02'),
+                            end_date=pd.Timestamp('2023-01-02 23:00'), timeframe=mt5.TIMEFRAME_H1)
+        self.assertEqual(len(data), 24)
+        with self.assertRaises(ValueError):
+            get_data_source('FTP')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 import numpy as np
 import pandas as pd
-from metatrader.indicators import calculate_ema
+from metatrader.indicators import calculate_ema, calculate_emas, ema_array, _ema_recurrence_py
 
 class TestIndicators(unittest.TestCase):
     def test_calculate_ema_list(self):
@@ -45,5 +45,46 @@ class TestIndicators(unittest.TestCase):
         with self.assertRaises(ValueError):
             calculate_ema(data, period)
 
+    def reference_ema(self, prices, period):
+        # The original per-bar loop, kept here to check the engine bit for bit
+        prices = pd.Series(prices, dtype=float)
+        ema_values = np.full(len(prices), np.nan, dtype=np.float64)
+        if len(prices) < period:
+            return ema_values
+        ema_values[period - 1] = np.mean(prices[:period])
+        multiplier = 2 / (period + 1)
+        for i in range(period, len(prices)):
+            ema_values[i] = (prices[i] - ema_values[i - 1]) * multiplier + ema_values[i - 1]
+        return ema_values
+
+    def test_ema_array_matches_reference_loop(self):
+        np.random.seed(0)
+        prices = 1.1 + np.random.randn(2000).cumsum() * 0.001
+        prices[5] = np.nan
+        for period in (1, 34, 144, 169, 200):
+            expected = self.reference_ema(prices, period)
+            np.testing.assert_array_equal(ema_array(prices, period), expected)
+
+    def test_python_recurrence_matches_reference_loop(self):
+        np.random.seed(1)
+        prices = 1.1 + np.random.randn(500).cumsum() * 0.001
+        period = 34
+        out = np.full(len(prices), np.nan)
+        out[period - 1] = pd.Series(prices[:period]).mean()
+        _ema_recurrence_py(prices, out, out[period - 1], period)
+        np.testing.assert_array_equal(out, self.reference_ema(prices, period))
+
+    def test_calculate_emas_multiple_columns_and_periods(self):
+        np.random.seed(2)
+        data = pd.DataFrame({
+            'high': 1.2 + np.random.rand(300),
+            'close': 1.1 + np.random.rand(300),
+        })
+        specs = {'fast_high': ('high', 34), 'fast_close': ('close', 34), 'slow_close': ('close', 200)}
+        result = calculate_emas(data, specs)
+        self.assertEqual(set(result), set(specs))
+        for name, (column, period) in specs.items():
+            np.testing.assert_array_equal(result[name], self.reference_ema(data[column], period))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+import numpy as np
+from metatrader.latency import LatencyHistogram, OrderLatencyRecorder
+
+Result = namedtuple('Result', ['retcode', 'price'])
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_keep_two_significant_digits(self):
+        values = np.random.default_rng(0).lognormal(mean=9, sigma=1.5, size=20000).astype(np.int64)
+        histogram = LatencyHistogram(significant_digits=2)
+        for value in values:
+            histogram.record(value)
+        for percentile in (50, 90, 99, 99.9):
+            expected = np.percentile(values, percentile, method='inverted_cdf')
+            self.assertAlmostEqual(histogram.percentile(percentile) / expected, 1, delta=0.01)
+        self.assertEqual(histogram.percentile(100), values.max())
+        self.assertEqual(histogram.total, len(values))
+
+    def test_small_values_are_exact_and_large_ones_clamped(self):
+        histogram = LatencyHistogram(highest=10_000)
+        for value in (0, 1, 2, 3, 50_000):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(20), 0)
+        self.assertEqual(histogram.percentile(60), 2)
+        self.assertEqual(histogram.percentile(100), 10_000)
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+class TestOrderLatencyRecorder(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('metatrader.latency.symbol_cache')
+        self.symbol_cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.symbol_cache.get.return_value = MagicMock(point=0.00001)
+        self.recorder = OrderLatencyRecorder()
+
+    def test_stages_per_symbol(self):
+        buy = {'symbol': 'EURUSD', 'type': 0, 'price': 1.10000}
+        sell = {'symbol': 'EURUSD', 'type': 1, 'price': 1.10000}
+        # A requote first, then the fill 3 points worse than requested
+        self.recorder.record_order_send(buy, Result(10004, 0.0), sent=10.002, acked=10.012, signal_time=10.0)
+        self.recorder.record_order_send(buy, Result(10009, 1.10003), sent=10.013, acked=10.043, signal_time=10.0,
+                                        first_send=False)
+        self.recorder.record_order_send(sell, Result(10009, 1.10001), sent=20.0, acked=20.02)
+
+        stats = self.recorder.summary()['EURUSD']
+        self.assertEqual(stats['send_to_ack']['count'], 3)
+        self.assertEqual(stats['signal_to_send']['count'], 1)
+        self.assertAlmostEqual(stats['signal_to_send']['p50'], 2, delta=0.05)
+        self.assertAlmostEqual(stats['signal_to_fill']['p99'], 43, delta=0.5)
+        self.assertAlmostEqual(self.recorder.percentiles('EURUSD', 'send_to_ack')[99], 30, delta=0.3)
+        # The sell filled above its price: no adverse slippage
+        self.assertEqual(self.recorder.percentiles('EURUSD', 'slippage', (50, 100)), {50: 0, 100: 3})
+        self.assertEqual(self.recorder.percentiles('GBPUSD', 'send_to_ack'), {50: None, 99: None})
+
+    def test_recording_never_raises(self):
+        self.recorder.record_order_send({'price': 1.1}, None, 0, 1)
+        self.recorder.record_order_send({'symbol': 'EURUSD', 'type': 0, 'price': 1.1}, Result(10009, 'x'), 0, 1)
+        self.assertEqual(self.recorder.summary()['EURUSD']['send_to_ack']['count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
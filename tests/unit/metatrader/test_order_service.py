@@ -0,0 +1,96 @@
+import unittest
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+from metatrader.order_service import OrderService
+from metatrader.session import MT5Session
+
+Tick = namedtuple('Tick', ['bid', 'ask'])
+Result = namedtuple('Result', ['retcode', 'price', 'comment'])
+
+def buy(**overrides):
+    request = {'symbol': 'EURUSD', 'type': 0, 'volume': 0.1, 'price': 1.1, 'sl': 1.099, 'tp': 1.102}
+    request.update(overrides)
+    return request
+
+class TestOrderService(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('metatrader.order_service.mt5')
+        self.mt5 = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mt5.ORDER_TYPE_BUY = 0
+        self.mt5.symbol_info_tick.return_value = Tick(1.1000, 1.1002)
+        self.mt5.order_send.return_value = Result(10009, 1.1002, 'done')
+        cache = patch('metatrader.order_service.symbol_cache')
+        self.symbol_cache = cache.start()
+        self.addCleanup(cache.stop)
+        self.symbol_cache.min_stop_distance.return_value = 0.0005
+        self.service = OrderService(MT5Session(), latency_budget=5, transport_retries=2, backoff=0.01)
+        self.addCleanup(self.service.close)
+
+    def sent(self):
+        return [c.args[0] for c in self.mt5.order_send.call_args_list]
+
+    def test_orders_are_priced_from_the_last_tick(self):
+        result = self.service.submit(buy()).result(timeout=5)
+        self.assertEqual(result.retcode, 10009)
+        self.assertEqual(self.sent()[0]['price'], 1.1002)
+        self.service.submit(buy(type=1)).result(timeout=5)
+        self.assertEqual(self.sent()[1]['price'], 1.1000)
+
+    def test_requotes_are_resent_at_once(self):
+        self.mt5.symbol_info_tick.side_effect = [Tick(1.1000, 1.1002), Tick(1.1001, 1.1003)]
+        self.mt5.order_send.side_effect = [Result(10004, 0, 'Requote'), Result(10009, 1.1003, 'done')]
+        self.assertEqual(self.service.submit(buy()).result(timeout=5).retcode, 10009)
+        self.assertEqual([request['price'] for request in self.sent()], [1.1002, 1.1003])
+
+    def test_invalid_stops_are_widened(self):
+        self.mt5.order_send.side_effect = [Result(10016, 0, 'Invalid stops'), Result(10009, 1.1002, 'done')]
+        self.service.submit(buy(sl=1.1, tp=1.1004)).result(timeout=5)
+        second = self.sent()[1]
+        self.assertAlmostEqual(second['sl'], 1.0997)
+        self.assertAlmostEqual(second['tp'], 1.1007)
+
+    def test_requotes_stop_when_the_budget_is_spent(self):
+        now = [0.0]
+        service = OrderService(MT5Session(), latency_budget=1, transport_retries=0, clock=lambda: now[0])
+        self.addCleanup(service.close)
+
+        def requote(request):
+            now[0] += 0.4
+            return Result(10004, 0, 'Requote')
+
+        self.mt5.order_send.side_effect = requote
+        self.assertEqual(service.submit(buy()).result(timeout=5).retcode, 10004)
+        self.assertEqual(self.mt5.order_send.call_count, 3)
+
+    def test_resends_are_capped(self):
+        self.mt5.order_send.return_value = Result(10004, 0, 'Requote')
+        service = OrderService(MT5Session(), latency_budget=60, transport_retries=0, max_resends=3)
+        self.addCleanup(service.close)
+        self.assertEqual(service.submit(buy()).result(timeout=5).retcode, 10004)
+        self.assertEqual(self.mt5.order_send.call_count, 4)
+
+    def test_invalid_stops_stop_when_nothing_to_widen(self):
+        # No symbol info: the minimum stop distance is unknown
+        self.symbol_cache.min_stop_distance.return_value = 0.0
+        self.mt5.order_send.return_value = Result(10016, 0, 'Invalid stops')
+        self.assertEqual(self.service.submit(buy()).result(timeout=5).retcode, 10016)
+        self.assertEqual(self.mt5.order_send.call_count, 1)
+
+    def test_transport_errors_back_off_without_blocking_other_orders(self):
+        responses = {'EURUSD': [None, None, Result(10009, 1.1002, 'done')], 'GBPUSD': [Result(10009, 1.3, 'done')]}
+        self.mt5.order_send.side_effect = lambda request: responses[request['symbol']].pop(0)
+        first = self.service.submit(buy())
+        second = self.service.submit(buy(symbol='GBPUSD'))
+        self.assertEqual(second.result(timeout=5).price, 1.3)
+        self.assertEqual(first.result(timeout=5).retcode, 10009)
+        self.assertEqual([request['symbol'] for request in self.sent()], ['EURUSD', 'GBPUSD', 'EURUSD', 'EURUSD'])
+
+    def test_gives_up_after_the_transport_retries(self):
+        self.mt5.order_send.return_value = None
+        self.assertIsNone(self.service.submit(buy()).result(timeout=5))
+        self.assertEqual(self.mt5.order_send.call_count, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from metatrader.session import MT5Session
+
+class TestMT5Session(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('metatrader.session.mt5')
+        self.mt5 = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mt5.initialize.return_value = True
+        self.mt5.terminal_info.return_value = MagicMock(connected=True)
+        self.sleep = MagicMock()
+        self.session = MT5Session(path='terminal64.exe', reconnect_attempts=4, backoff=1, max_backoff=3,
+                                  sleep=self.sleep)
+
+    def test_connect_initializes_once(self):
+        self.assertTrue(self.session.connect())
+        self.assertTrue(self.session.connect())
+        self.mt5.initialize.assert_called_once_with(path='terminal64.exe')
+        self.assertTrue(self.session.heartbeat())
+        self.mt5.initialize.assert_called_once()
+
+    def test_calls_run_on_one_thread(self):
+        threads = set()
+
+        def record():
+            threads.add(threading.current_thread().name)
+            # Nested calls from the terminal thread run in place instead of deadlocking
+            return self.session.call(threading.current_thread)
+
+        workers = [threading.Thread(target=self.session.call, args=(record,)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads.pop().startswith('mt5'))
+
+    def test_heartbeat_reconnects_with_backoff(self):
+        self.session.connect()
+        self.mt5.terminal_info.return_value = MagicMock(connected=False)
+        self.mt5.initialize.side_effect = [False, False, False, True]
+        self.mt5.terminal_info.side_effect = [MagicMock(connected=False), MagicMock(connected=True)]
+        self.assertTrue(self.session.heartbeat())
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [1, 2, 3])
+        self.assertTrue(self.session.connected)
+
+    def test_heartbeat_gives_up(self):
+        self.mt5.initialize.return_value = False
+        self.assertFalse(self.session.heartbeat())
+        self.assertEqual(self.mt5.initialize.call_count, 4)
+        self.assertEqual(self.sleep.call_count, 3)
+        self.assertFalse(self.session.connected)
+
+    def test_errors_reach_the_caller(self):
+        self.mt5.initialize.side_effect = RuntimeError("IPC timeout")
+        with self.assertRaises(RuntimeError):
+            self.session.initialize()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from metatrader.symbol_cache import SymbolCache
+
+class TestSymbolCache(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('metatrader.symbol_cache.mt5')
+        self.mt5 = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mt5.symbol_info.return_value = MagicMock(point=0.00001, trade_stops_level=30, visible=True)
+        self.now = 0.0
+        self.cache = SymbolCache(ttl=60, clock=lambda: self.now)
+
+    def test_symbol_info_is_fetched_once_per_ttl(self):
+        self.assertEqual(self.cache.get('EURUSD').point, 0.00001)
+        self.assertAlmostEqual(self.cache.min_stop_distance('EURUSD'), 0.0003)
+        self.now = 59
+        self.cache.get('EURUSD')
+        self.assertEqual(self.mt5.symbol_info.call_count, 1)
+        self.now = 60
+        self.cache.get('EURUSD')
+        self.assertEqual(self.mt5.symbol_info.call_count, 2)
+
+    def test_invalidate_refetches(self):
+        self.cache.get('EURUSD')
+        self.cache.invalidate()
+        self.cache.get('EURUSD')
+        self.assertEqual(self.mt5.symbol_info.call_count, 2)
+
+    def test_missing_symbols_are_not_cached(self):
+        self.mt5.symbol_info.return_value = None
+        self.assertIsNone(self.cache.get('XXXYYY'))
+        self.assertFalse(self.cache.select('XXXYYY'))
+        self.assertEqual(self.cache.min_stop_distance('XXXYYY'), 0.0)
+        self.assertEqual(self.mt5.symbol_info.call_count, 3)
+
+    def test_select_once_per_session(self):
+        self.mt5.symbol_info.return_value.visible = False
+        self.mt5.symbol_select.return_value = True
+        self.assertTrue(self.cache.select('EURUSD'))
+        self.assertTrue(self.cache.select('EURUSD'))
+        self.mt5.symbol_select.assert_called_once_with('EURUSD', True)
+        self.cache.invalidate()
+        self.assertTrue(self.cache.select('EURUSD'))
+        self.assertEqual(self.mt5.symbol_select.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import sys
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+from simulator import SimulatedTerminal, install, uninstall
+from simulator import terminal as sim
+from tests.unit.helpers import make_bars
+
+START = pd.Timestamp('2023-01-02')
+
+class TestSimulatedTerminal(unittest.TestCase):
+
+    def setUp(self):
+        self.terminal = SimulatedTerminal(balance=10000)
+        self.terminal.add_bars('EURUSD', make_bars([1.1000, 1.1010, 1.1020, 1.1030, 1.1040, 1.1050], START, spread=0, tick_volume=10))
+        self.terminal.initialize()
+
+    def buy(self, **overrides):
+        request = {
+            'action': sim.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.1, 'type': sim.ORDER_TYPE_BUY,
+            'sl': 0.0, 'tp': 0.0, 'deviation': 10, 'magic': 12345, 'comment': 'test',
+        }
+        request.update(overrides)
+        return self.terminal.order_send(request)
+
+    def test_calls_fail_until_initialized(self):
+        terminal = SimulatedTerminal()
+        self.assertIsNone(terminal.account_info())
+        self.assertEqual(terminal.last_error()[0], sim.RES_E_INTERNAL_FAIL_CONNECT)
+        self.assertTrue(terminal.initialize())
+        self.assertEqual(terminal.account_info().balance, 10000)
+
+    def test_only_closed_bars_are_visible(self):
+        self.assertIsNone(self.terminal.symbol_info_tick('EURUSD'))
+        self.assertEqual(self.buy().retcode, sim.TRADE_RETCODE_MARKET_CLOSED)
+
+        self.terminal.step()
+        self.terminal.step()
+        rates = self.terminal.copy_rates_from_pos('EURUSD', sim.TIMEFRAME_H1, 0, 10)
+        self.assertEqual(len(rates), 2)
+        self.assertEqual(rates['close'][-1], 1.1010)
+        tick = self.terminal.symbol_info_tick('EURUSD')
+        self.assertEqual(tick.bid, 1.1010)
+        self.assertEqual(tick.time, int(START.timestamp()) + 2 * 3600)
+
+        self.terminal.advance_to(START + pd.Timedelta(hours=6))
+        self.assertFalse(self.terminal.step())
+        h4 = self.terminal.copy_rates_from_pos('EURUSD', sim.TIMEFRAME_H4, 0, 10)
+        self.assertEqual(list(h4['close']), [1.1030, 1.1050])
+        self.assertEqual(h4['high'][0], 1.1035)
+        self.assertIsNone(self.terminal.copy_rates_from_pos('EURUSD', sim.TIMEFRAME_M1, 0, 10))
+
+    def test_market_order_updates_positions_and_equity(self):
+        self.terminal.step()
+        result = self.buy(price=1.1000)
+        self.assertEqual(result.retcode, sim.TRADE_RETCODE_DONE)
+        self.assertEqual(result.price, 1.1000)
+
+        self.terminal.step()
+        position, = self.terminal.positions_get(symbol='EURUSD')
+        self.assertAlmostEqual(position.profit, 10.0)
+        self.assertAlmostEqual(self.terminal.account_info().equity, 10010.0)
+
+        close = self.buy(type=sim.ORDER_TYPE_SELL, position=position.ticket)
+        self.assertEqual(close.retcode, sim.TRADE_RETCODE_DONE)
+        self.assertEqual(self.terminal.positions_get(), ())
+        self.assertAlmostEqual(self.terminal.account_info().balance, 10010.0)
+
+    def test_retcodes(self):
+        self.terminal.add_symbol('EURUSD', stops_level=50)
+        self.terminal.add_bars('EURUSD', make_bars([1.1000, 1.1010], START, spread=0, tick_volume=10))
+        self.terminal.step()
+
+        self.assertEqual(self.buy(sl=1.0998).retcode, sim.TRADE_RETCODE_INVALID_STOPS)
+        self.assertEqual(self.buy(sl=1.1010).retcode, sim.TRADE_RETCODE_INVALID_STOPS)
+        requote = self.buy(price=1.0990)
+        self.assertEqual(requote.retcode, sim.TRADE_RETCODE_REQUOTE)
+        self.assertEqual(requote.bid, 1.1000)
+        self.assertEqual(self.buy(volume=0.015).retcode, sim.TRADE_RETCODE_INVALID_VOLUME)
+        self.assertEqual(self.buy(volume=50).retcode, sim.TRADE_RETCODE_NO_MONEY)
+        self.assertEqual(self.buy(sl=1.0990, tp=1.1100).retcode, sim.TRADE_RETCODE_DONE)
+
+        self.terminal.requote_rate = 1.0
+        self.assertEqual(self.buy().retcode, sim.TRADE_RETCODE_REQUOTE)
+
+    def test_stop_loss_and_take_profit_close_positions(self):
+        terminal = SimulatedTerminal(balance=10000)
+        terminal.add_bars('EURUSD', make_bars([1.1000, 1.1000, 1.0950, 1.1000, 1.1100], START, spread=0, tick_volume=10, low_offset=0.0002))
+        terminal.initialize()
+        terminal.step()
+        buy = dict(action=sim.TRADE_ACTION_DEAL, symbol='EURUSD', volume=0.1, deviation=10)
+        terminal.order_send(dict(buy, type=sim.ORDER_TYPE_BUY, sl=1.0990, tp=1.1200))
+        terminal.order_send(dict(buy, type=sim.ORDER_TYPE_SELL, sl=1.1050, tp=1.0980))
+
+        terminal.advance_to(START + pd.Timedelta(hours=5))
+        self.assertEqual(terminal.positions_get(), ())
+        exits = [deal for deal in terminal.history_deals_get() if deal.entry == sim.DEAL_ENTRY_OUT]
+        # The gap down fills the buy stop at the open and the sell target at its level
+        self.assertEqual([(deal.reason, deal.price) for deal in exits],
+                         [(sim.DEAL_REASON_SL, 1.0950), (sim.DEAL_REASON_TP, 1.0980)])
+        self.assertAlmostEqual(terminal.account_info().balance, 10000 - 50 + 20)
+
+    def test_pending_order_fills_when_price_reaches_it(self):
+        self.terminal.step()
+        result = self.terminal.order_send({
+            'action': sim.TRADE_ACTION_PENDING, 'symbol': 'EURUSD', 'volume': 0.1,
+            'type': sim.ORDER_TYPE_BUY_STOP, 'price': 1.1025, 'sl': 1.1000, 'tp': 1.1100,
+        })
+        self.assertEqual(result.retcode, sim.TRADE_RETCODE_DONE)
+        self.assertEqual(len(self.terminal.orders_get()), 1)
+
+        self.terminal.advance(3 * 3600)
+        self.assertEqual(self.terminal.orders_get(), ())
+        position, = self.terminal.positions_get()
+        self.assertEqual(position.price_open, 1.1025)
+
+    def test_tick_replay_uses_bid_and_ask(self):
+        terminal = SimulatedTerminal()
+        times = START.value // 10 ** 6 + np.arange(4) * 500
+        terminal.add_ticks('EURUSD', {'time_msc': times, 'bid': [1.1, 1.1001, 1.0995, 1.0990],
+                                      'ask': [1.1001, 1.1002, 1.0996, 1.0991]})
+        terminal.initialize()
+        terminal.step()
+        result = terminal.order_send({'action': sim.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 1.0,
+                                      'type': sim.ORDER_TYPE_SELL, 'tp': 1.0996})
+        self.assertEqual(result.price, 1.1)
+
+        terminal.advance_to(START + pd.Timedelta(seconds=5))
+        deal = terminal.history_deals_get()[-1]
+        self.assertEqual((deal.reason, deal.price), (sim.DEAL_REASON_TP, 1.0996))
+        self.assertEqual(len(terminal.copy_ticks_range('EURUSD', START, START + pd.Timedelta(seconds=1))), 3)
+        self.assertEqual(terminal.copy_rates_from_pos('EURUSD', sim.TIMEFRAME_M1, 0, 1)['tick_volume'][0], 4)
+
+    def test_latency_is_injected(self):
+        sleep = MagicMock()
+        terminal = SimulatedTerminal(latency=0.05, call_latency=0.001, sleep=sleep)
+        terminal.initialize()
+        terminal.order_send({'action': sim.TRADE_ACTION_DEAL, 'symbol': 'EURUSD'})
+        terminal.positions_total()
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.001, 0.05, 0.001])
+
+    def test_install_rebinds_modules(self):
+        import strategy.tunnel_strategy as tunnel_strategy
+        original = sys.modules['MetaTrader5']
+        terminal = install(self.terminal)
+        try:
+            import MetaTrader5 as mt5
+            self.assertIs(mt5.terminal, terminal)
+            self.assertIs(tunnel_strategy.mt5, mt5)
+            self.terminal.step()
+            self.assertEqual(tunnel_strategy.place_order('EURUSD', 'buy', 0.1, 1.1, 1.09, 1.12), 'Order placed')
+            ticket = mt5.positions_get()[0].ticket
+            self.assertEqual(tunnel_strategy.close_position(ticket), 'Position closed')
+        finally:
+            uninstall()
+        self.assertIs(sys.modules['MetaTrader5'], original)
+        self.assertIs(tunnel_strategy.mt5, original)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import pandas as pd
+from metatrader.indicators import ema_array, EMAState, RollingStdState
+from strategy.indicator_state import WavyTunnelState
+
+class TestIndicatorState(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        close = 1.1 + np.random.randn(400).cumsum() * 0.001
+        self.data = pd.DataFrame({
+            'time': pd.date_range(start='2024-01-01', periods=400, freq='h'),
+            'high': close + 0.0005,
+            'low': close - 0.0005,
+            'close': close,
+            'tick_volume': 100,
+        })
+
+    def test_ema_state_matches_batch(self):
+        prices = self.data['close'].to_numpy()
+        state = EMAState(34)
+        streamed = [state.update(price) for price in prices]
+        np.testing.assert_array_equal(np.array(streamed), ema_array(prices, 34))
+
+    def test_ema_state_peek_does_not_commit(self):
+        state = EMAState(3)
+        for price in [1.0, 2.0, 3.0]:
+            state.update(price)
+        peeked = state.peek(10.0)
+        self.assertEqual(state.value, 2.0)
+        self.assertEqual(state.update(10.0), peeked)
+
+    def test_rolling_std_state_matches_pandas(self):
+        prices = self.data['close'].to_numpy()
+        state = RollingStdState(20)
+        streamed = np.array([state.update(price) for price in prices])
+        expected = self.data['close'].rolling(window=20).std().to_numpy()
+        np.testing.assert_allclose(streamed, expected, rtol=1e-9)
+        np.testing.assert_allclose(state.peek(1.2), pd.Series(list(prices[-19:]) + [1.2]).std(), rtol=1e-9)
+
+    def test_wavy_tunnel_state_commits_forming_bar_on_new_bar(self):
+        state = WavyTunnelState('EURUSD')
+        state.on_frame(self.data)
+        # Every bar except the last one is committed, the last one is forming
+        self.assertEqual(state.last_closed_time, self.data['time'].iloc[-2])
+        committed = self.data.iloc[:-1]
+        self.assertEqual(state.values['tunnel1'], ema_array(committed['close'].to_numpy(), 144)[-1])
+        self.assertEqual(state.current()['wavy_c'], ema_array(self.data['close'].to_numpy(), 34)[-1])
+
+    def test_wavy_tunnel_state_ignores_stale_bars(self):
+        state = WavyTunnelState('EURUSD')
+        state.on_frame(self.data)
+        values = dict(state.values)
+        state.on_frame(self.data.iloc[:10])
+        self.assertEqual(state.values, values)
+
+if __name__ == '__main__':
+    unittest.main()
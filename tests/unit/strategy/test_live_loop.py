@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import unittest
+from collections import namedtuple
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+from metatrader.bar_clock import BarClock
+from metatrader.session import MT5Session
+from strategy.live_loop import LiveLoop, SymbolTrader, real_bars
+from strategy.position_manager import PositionManager
+from tests.unit.helpers import make_bars, random_walk
+
+Account = namedtuple('Account', ['balance'])
+Result = namedtuple('Result', ['retcode'])
+
+class TestLiveLoop(unittest.TestCase):
+
+    def test_refresh_reports_closed_bars(self):
+        bars = make_bars(random_walk(300, scale=0.001))
+        frames = [bars.iloc[:250], bars.iloc[248:250], bars.iloc[249:251]]
+        with patch('strategy.live_loop.get_data', side_effect=frames):
+            trader = SymbolTrader('EURUSD', timeframe=16385, num_candles=200)
+            self.assertTrue(trader.load())
+            # The same forming bar again: nothing closed
+            self.assertFalse(trader.refresh())
+            self.assertTrue(trader.refresh())
+        self.assertEqual(trader.indicators.last_closed_time, bars['time'].iloc[249])
+        self.assertEqual(len(trader.history), 200)
+
+    def test_entry_request_uses_closed_bars(self):
+        bars = make_bars(random_walk(250, scale=0.001))
+        with patch('strategy.live_loop.get_data', return_value=bars), \
+             patch('strategy.live_loop.level_tolerance', return_value=0.002):
+            trader = SymbolTrader('EURUSD', timeframe=16385, num_candles=200)
+            trader.load()
+        # The tolerance resolved by load is reused, so no terminal call happens off the terminal thread
+        with patch('strategy.tunnel_strategy.level_tolerance') as lookup:
+            trader.entry_request(10000)
+        lookup.assert_not_called()
+        with patch('strategy.live_loop.check_entry_conditions', return_value=(True, False)) as check:
+            request = trader.entry_request(10000)
+        self.assertEqual(check.call_args.kwargs['tolerance'], 0.002)
+        row = check.call_args.args[0]
+        # The last bar is still forming
+        self.assertEqual(row['close'], bars['close'].iloc[-2])
+        self.assertEqual(row['wavy_c'], trader.indicators.values['wavy_c'])
+        self.assertEqual(request['price'], bars['close'].iloc[-1])
+        self.assertLess(request['sl'], request['price'])
+
+    def test_real_bars_drops_synthetic_row(self):
+        bars = make_bars(3)
+        bars.loc[2, 'tick_volume'] = 0
+        self.assertEqual(len(real_bars(bars)), 2)
+
+    def test_orders_do_not_block_other_symbols(self):
+        mt5 = MagicMock(TRADE_RETCODE_DONE=10009)
+        mt5.account_info.return_value = Account(10000)
+        refreshes = {'EURUSD': 0, 'GBPUSD': 0}
+        threads = set()
+        order_started = threading.Event()
+
+        def refresh(trader):
+            threads.add(threading.current_thread().name)
+            refreshes[trader.symbol] += 1
+            # Counting GBPUSD refreshes only while the EURUSD order is pending
+            if order_started.is_set() and trader.symbol == 'GBPUSD':
+                refreshes['during_order'] = refreshes.get('during_order', 0) + 1
+            return refreshes[trader.symbol] == 1
+
+        def submit(request, signal_time):
+            order_started.set()
+            future = Future()
+            threading.Timer(0.1, future.set_result, args=(Result(10009),)).start()
+            return future
+
+        orders = MagicMock()
+        orders.submit.side_effect = submit
+
+        entry = lambda trader, balance: {'symbol': trader.symbol} if trader.symbol == 'EURUSD' else None
+        with patch('strategy.live_loop.mt5', mt5), \
+             patch.object(PositionManager, 'run_cycle'), \
+             patch.object(SymbolTrader, 'refresh', refresh), \
+             patch.object(SymbolTrader, 'entry_request', entry), \
+             patch.object(BarClock, 'seconds_until_close', return_value=0.01), \
+             patch.object(BarClock, 'check', return_value=True):
+            loop = LiveLoop(['EURUSD', 'GBPUSD'], 10000, poll_seconds=0.01, max_duration=0.2,
+                            session=MT5Session(), orders=orders)
+            asyncio.run(loop.run())
+
+        orders.submit.assert_called_once()
+        self.assertEqual(orders.submit.call_args.args[0], {'symbol': 'EURUSD'})
+        orders.close.assert_called_once()
+        self.assertEqual(loop.total_trades, 1)
+        self.assertEqual(loop.daily_trades, 1)
+        self.assertGreater(refreshes.get('during_order', 0), 3)
+        self.assertEqual(threads, {'mt5_0'})
+
+    def test_symbols_wake_only_on_bar_close(self):
+        closes = iter([False, False, True] + [False] * 1000)
+        refresh = MagicMock(return_value=False)
+        with patch.object(PositionManager, 'run_cycle') as run_cycle, \
+             patch.object(SymbolTrader, 'refresh', refresh), \
+             patch.object(BarClock, 'seconds_until_close', return_value=0.01), \
+             patch.object(BarClock, 'check', side_effect=lambda: next(closes)):
+            loop = LiveLoop(['EURUSD'], 10000, poll_seconds=0.05, max_duration=0.2, session=MT5Session())
+            asyncio.run(loop.run())
+        refresh.assert_called_once()
+        self.assertGreaterEqual(run_cycle.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+import numpy as np
+from strategy.peak_index import LevelIndex, PeakIndex
+from strategy import tunnel_strategy
+from strategy.tunnel_strategy import level_tolerance
+from metatrader.symbol_cache import symbol_cache
+
+class TestPeakIndex(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.levels = np.round(1.1 + np.random.rand(500) * 0.05, 5)
+        self.prices = 1.09 + np.random.rand(2000) * 0.07
+
+    def test_has_level_within_matches_linear_scan(self):
+        index = LevelIndex(self.levels)
+        for price in self.prices:
+            expected = any(abs(price - level) <= 0.0001 for level in self.levels)
+            self.assertEqual(index.has_level_within(price, 0.0001), expected)
+
+    def test_has_levels_within_matches_scalar_query(self):
+        index = LevelIndex(self.levels)
+        expected = [index.has_level_within(price, 0.0001) for price in self.prices]
+        self.assertEqual(index.has_levels_within(self.prices, 0.0001).tolist(), expected)
+
+    def test_empty_index(self):
+        index = LevelIndex([])
+        self.assertFalse(index.has_level_within(1.1, 0.001))
+        self.assertEqual(index.has_levels_within([1.1, 1.2], 0.001).tolist(), [False, False])
+
+    def test_add_keeps_levels_sorted(self):
+        index = LevelIndex([1.3, 1.1])
+        index.add(1.2)
+        self.assertEqual(index.levels.tolist(), [1.1, 1.2, 1.3])
+        self.assertTrue(index.has_level_within(1.2004, 0.0005))
+
+    def test_non_numeric_levels(self):
+        with self.assertRaises(TypeError):
+            LevelIndex('not a list')
+
+    def test_peak_index_uses_its_tolerance(self):
+        index = PeakIndex([1.1000], [1.0500], tolerance=0.001)
+        self.assertTrue(index.near_peak(1.1009))
+        self.assertFalse(index.near_peak(1.1011))
+        self.assertTrue(index.near_dip(1.0495))
+
+    @mock.patch('metatrader.symbol_cache.mt5')
+    def test_level_tolerance_scales_with_point_size(self, mock_mt5):
+        symbol_cache.invalidate()
+        self.addCleanup(symbol_cache.invalidate)
+        mock_mt5.symbol_info.return_value = mock.Mock(point=0.001)
+        with mock.patch.object(tunnel_strategy.Config, 'PEAK_TOLERANCE_POINTS', 100):
+            self.assertAlmostEqual(level_tolerance('USDJPY'), 0.1)
+            self.assertAlmostEqual(level_tolerance('USDJPY'), 0.1)
+        # Read through the symbol cache, so its TTL and reconnect invalidation apply
+        mock_mt5.symbol_info.assert_called_once_with('USDJPY')
+
+    @mock.patch('metatrader.symbol_cache.mt5')
+    def test_level_tolerance_falls_back_without_symbol_info(self, mock_mt5):
+        symbol_cache.invalidate()
+        mock_mt5.symbol_info.return_value = None
+        self.assertEqual(level_tolerance('EURUSD'), tunnel_strategy.DEFAULT_LEVEL_TOLERANCE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+from strategy.position_manager import PositionManager
+
+Position = namedtuple('Position', ['ticket', 'symbol', 'type', 'volume', 'profit'])
+Account = namedtuple('Account', ['equity', 'balance'])
+Tick = namedtuple('Tick', ['bid', 'ask'])
+Result = namedtuple('Result', ['retcode', 'price', 'comment'])
+
+class TestPositionManager(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('strategy.position_manager.mt5')
+        self.mt5 = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mt5.TRADE_RETCODE_DONE = 10009
+        self.mt5.positions_get.return_value = (
+            Position(1, 'EURUSD', 0, 0.1, 500),
+            Position(2, 'EURUSD', 1, 0.1, -1500),
+            Position(3, 'GBPUSD', 0, 0.2, 10),
+            Position(4, 'USDJPY', 0, 0.1, 900),
+        )
+        self.mt5.account_info.return_value = Account(10000, 10000)
+        self.mt5.symbol_info_tick.return_value = Tick(1.1, 1.1002)
+        self.mt5.order_send.return_value = Result(10009, 1.1, 'done')
+        self.manager = PositionManager(['EURUSD', 'GBPUSD'], min_take_profit=300, max_loss_per_day=1000,
+                                       starting_equity=10000, max_trades_per_day=5)
+
+    def test_one_snapshot_per_cycle(self):
+        results = self.manager.run_cycle()
+        self.assertEqual(sorted(results), [1, 2])
+        self.mt5.positions_get.assert_called_once_with()
+        self.mt5.account_info.assert_called_once_with()
+        # One tick for both EURUSD closes; positions of other symbols are left alone
+        self.mt5.symbol_info_tick.assert_called_once_with('EURUSD')
+        requests = [c.args[0] for c in self.mt5.order_send.call_args_list]
+        self.assertEqual([(r['position'], r['price']) for r in requests], [(1, 1.1), (2, 1.1002)])
+
+    def test_snapshot_rules(self):
+        self.mt5.account_info.return_value = Account(8000, 10000)
+        exits = self.manager.exits(self.manager.snapshot())
+        self.assertEqual([(position.ticket, reason) for position, reason in exits],
+                         [(1, 'take_profit'), (2, 'loss_limit'), (3, 'drawdown')])
+
+        self.manager.max_trades_per_day = 4
+        self.mt5.account_info.return_value = Account(10000, 10000)
+        exits = self.manager.exits(self.manager.snapshot())
+        self.assertEqual(exits[-1][1], 'trade_limit')
+
+    def test_terminal_errors(self):
+        self.mt5.positions_get.return_value = None
+        self.assertEqual(self.manager.run_cycle(), {})
+        self.mt5.order_send.assert_not_called()
+
+        self.mt5.positions_get.return_value = (Position(1, 'EURUSD', 0, 0.1, 500),)
+        self.mt5.symbol_info_tick.return_value = None
+        self.assertEqual(self.manager.run_cycle(), {1: None})
+    def test_cycle_is_journaled(self):
+        self.manager.journal = MagicMock()
+        self.mt5.ORDER_TYPE_BUY = 0
+        self.mt5.account_info.return_value = MagicMock(equity=10000, balance=9500)
+        self.manager.run_cycle()
+        calls = [(c.args, c.kwargs) for c in self.manager.journal.record.call_args_list]
+        self.assertEqual(calls[0], (('equity',), {'balance': 9500, 'equity': 10000}))
+        self.assertEqual([(args, kwargs['ticket'], kwargs['side'], kwargs['reason'], kwargs['balance'])
+                          for args, kwargs in calls[1:]],
+                         [(('close', 'EURUSD'), 1, 1, 'take_profit', 10000), (('close', 'EURUSD'), 2, -1, 'loss_limit', 8500)])
+
+if __name__ == '__main__':
+    unittest.main()
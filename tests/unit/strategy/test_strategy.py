@@ -4,10 +4,11 @@ import numpy as np
 from unittest import mock
 from unittest.mock import MagicMock
 from strategy.tunnel_strategy import (
-    calculate_ema, calculate_tunnel_bounds, detect_peaks_and_dips, 
-    check_entry_conditions, generate_trade_signal, run_strategy, execute_trade, manage_position, adjust_deviation_factor, calculate_position_size
+    calculate_ema, calculate_tunnel_bounds, detect_peaks_and_dips, find_peaks_and_dips,
+    check_entry_conditions, compute_entry_signals, describe_entry_reasons, BUY_CLOSE_ABOVE_WAVY, SELL_NEAR_DIP, generate_trade_signal, run_strategy, execute_trade, manage_position, adjust_deviation_factor, calculate_position_size
 )
 import MetaTrader5 as mt5
+from strategy.peak_index import PeakIndex
 from unittest.mock import Mock, patch
 
 class TestStrategy(unittest.TestCase):
@@ -104,6 +105,44 @@ class TestStrategy(unittest.TestCase):
         with self.assertRaises(TypeError):
             detect_peaks_and_dips(data, peak_type)
 
+    def reference_peaks_and_dips(self, df, peak_type):
+        # The original O(n*w) scan, kept to check the sliding-window version
+        highs, lows = df['high'].values, df['low'].values
+        center = peak_type // 2
+        peaks, dips = [], []
+        for i in range(center, len(highs) - center):
+            peak_window = highs[i - center:i + center + 1]
+            dip_window = lows[i - center:i + center + 1]
+            if all(peak_window[center] > peak_window[j] for j in range(len(peak_window)) if j != center):
+                peaks.append(i)
+            if all(dip_window[center] < dip_window[j] for j in range(len(dip_window)) if j != center):
+                dips.append(i)
+        return peaks, dips
+
+    def test_find_peaks_and_dips_matches_reference_scan(self):
+        print("Running test_find_peaks_and_dips_matches_reference_scan")
+        np.random.seed(0)
+        close = np.round(1.1 + np.random.randn(3000).cumsum() * 0.001, 3)  # rounding creates ties
+        df = pd.DataFrame({
+            'time': pd.date_range(start='2024-01-01', periods=3000, freq='h'),
+            'high': close + 0.001,
+            'low': close - 0.001,
+        })
+        df.loc[100, 'high'] = np.nan
+        for peak_type in (1, 3, 4, 21):
+            result = find_peaks_and_dips(df, peak_type)
+            expected_peaks, expected_dips = self.reference_peaks_and_dips(df, peak_type)
+            self.assertEqual(result['peak_indices'].tolist(), expected_peaks)
+            self.assertEqual(result['dip_indices'].tolist(), expected_dips)
+            self.assertEqual(list(result['peak_times']), list(df['time'].to_numpy()[expected_peaks]))
+
+    def test_find_peaks_and_dips_short_data(self):
+        print("Running test_find_peaks_and_dips_short_data")
+        df = pd.DataFrame({'high': [1.0, 2.0], 'low': [0.5, 1.5]})
+        result = find_peaks_and_dips(df, 21)
+        self.assertEqual(len(result['peaks']), 0)
+        self.assertEqual(len(result['dips']), 0)
+
     def test_check_entry_conditions_missing_data(self):
         print("Running test_check_entry_conditions_missing_data")
         row = pd.Series({
@@ -158,6 +197,47 @@ class TestStrategy(unittest.TestCase):
         self.assertTrue(buy_condition)
         self.assertFalse(sell_condition)
 
+    def test_compute_entry_signals_matches_row_conditions(self):
+        print("Running test_compute_entry_signals_matches_row_conditions")
+        np.random.seed(3)
+        n = 400
+        df = pd.DataFrame({
+            'close': 1.1 + np.random.rand(n) * 0.01,
+            'wavy_c': 1.1 + np.random.rand(n) * 0.01,
+            'wavy_h': 1.1 + np.random.rand(n) * 0.01,
+            'wavy_l': 1.1 + np.random.rand(n) * 0.01,
+            'tunnel1': 1.1 + np.random.rand(n) * 0.01,
+            'tunnel2': 1.1 + np.random.rand(n) * 0.01,
+        })
+        df.loc[:20, 'tunnel2'] = np.nan  # tunnel2 warms up after tunnel1
+        df.loc[:5, ['wavy_c', 'wavy_h', 'wavy_l']] = np.nan
+        peaks = (1.1 + np.random.rand(30) * 0.01).tolist()
+        dips = (1.1 + np.random.rand(30) * 0.01).tolist()
+        peak_index = PeakIndex(peaks, dips, 0.0002)
+
+        buy_signal, sell_signal, reasons = compute_entry_signals(df, peak_index)
+        for i, row in df.iterrows():
+            wavy = (row['wavy_c'], row['wavy_h'], row['wavy_l'])
+            tunnel = (row['tunnel1'], row['tunnel2'])
+            expected = [
+                row['close'] > max(wavy),
+                min(wavy) > max(tunnel),
+                any(abs(row['close'] - peak) <= 0.0002 for peak in peaks),
+                row['close'] < min(wavy),
+                max(wavy) < min(tunnel),
+                any(abs(row['close'] - dip) <= 0.0002 for dip in dips),
+            ]
+            self.assertEqual([bool(reasons[i] & (1 << bit)) for bit in range(6)], expected)
+            self.assertEqual(buy_signal[i], any(expected[:3]))
+            self.assertEqual(sell_signal[i], any(expected[3:]))
+
+    def test_describe_entry_reasons(self):
+        print("Running test_describe_entry_reasons")
+        reasons = describe_entry_reasons(BUY_CLOSE_ABOVE_WAVY | SELL_NEAR_DIP)
+        self.assertEqual(len(reasons), 2)
+        self.assertTrue(reasons[0].startswith("Buy condition 1"))
+        self.assertTrue(reasons[1].startswith("Sell condition 3"))
+
     def test_generate_trade_signal_buy(self):
         print("Running test_generate_trade_signal_buy")
         data = pd.DataFrame({'close': [100, 200, 300, 400, 500, 600]})
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from utils.journal import TradeJournal, read_journal, EVENT_KINDS, JOURNAL_FIELDS
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class TestTradeJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = os.path.join(self.tmp.name, 'journal')
+        self.clock = FakeClock()
+
+    def test_round_trip(self):
+        journal = TradeJournal(self.directory, clock=self.clock)
+        journal.record('signal', 'EURUSD', side=1, price=1.1, sl=1.09, tp=1.12, volume=0.1)
+        journal.record('fill', 'EURUSD', side=1, ticket=42, price=1.1002, volume=0.1, retcode=10009)
+        journal.record('equity', balance=10000.0, equity=10012.5)
+        journal.close()
+        # Reopening appends after the existing events
+        journal = TradeJournal(self.directory, clock=self.clock)
+        journal.record('close', 'GBPUSD', when='2024-01-02 10:00', side=-1, price=1.27, profit=-3.5, reason='loss_limit')
+        journal.close()
+
+        events = read_journal(self.directory)
+        self.assertEqual(len(events['time']), 4)
+        np.testing.assert_array_equal(events['kind'], [EVENT_KINDS[k] for k in ('signal', 'fill', 'equity', 'close')])
+        self.assertEqual(events['time'].dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(events['time'][3], np.datetime64('2024-01-02T10:00'))
+        self.assertEqual(events['ticket'][1], 42)
+        self.assertEqual(events['reason'][3], b'loss_limit')
+        self.assertTrue(np.isnan(events['price'][2]))
+
+        closes = read_journal(self.directory, kinds=['close', 'fill'], symbol='GBPUSD')
+        self.assertEqual(closes['profit'].tolist(), [-3.5])
+
+    def test_buffered_until_fsync_interval(self):
+        journal = TradeJournal(self.directory, fsync_seconds=5, clock=self.clock)
+        with patch('utils.journal.os.fsync') as fsync:
+            journal.record('equity', equity=1.0)
+            self.assertEqual(len(read_journal(self.directory)['time']), 0)
+            fsync.assert_not_called()
+            self.clock.now += 5
+            journal.record('equity', equity=2.0)
+            self.assertEqual(read_journal(self.directory)['equity'].tolist(), [1.0, 2.0])
+            self.assertEqual(fsync.call_count, len(JOURNAL_FIELDS))
+        journal.close()
+        with self.assertRaises(ValueError):
+            journal.record('equity', equity=3.0)
+        journal = TradeJournal(self.directory)
+        with self.assertRaises(ValueError):
+            journal.record('deposit')
+        journal.close()
+
+    def test_torn_write_is_trimmed(self):
+        journal = TradeJournal(self.directory, clock=self.clock)
+        journal.record('equity', equity=1.0)
+        journal.close()
+        # A crash after only some columns were appended
+        with open(os.path.join(self.directory, 'equity.bin'), 'ab') as f:
+            f.write(np.float64(2.0).tobytes())
+        self.assertEqual(read_journal(self.directory)['equity'].tolist(), [1.0])
+        journal = TradeJournal(self.directory, clock=self.clock)
+        journal.record('equity', equity=3.0)
+        journal.close()
+        self.assertEqual(read_journal(self.directory)['equity'].tolist(), [1.0, 3.0])
+
+    def test_record_backtest_trades(self):
+        trades = [
+            {'entry_time': pd.Timestamp('2024-01-01 10:00'), 'entry_price': 1.1, 'volume': 0.1, 'symbol': 'EURUSD',
+             'action': 'BUY', 'sl': 1.09, 'tp': 1.12, 'profit': 20.0, 'exit_time': pd.Timestamp('2024-01-01 12:00'),
+             'exit_price': 1.12, 'exit_reason': 'take_profit'},
+            {'entry_time': pd.Timestamp('2024-01-02 10:00'), 'entry_price': 1.2, 'volume': 0.1, 'symbol': 'EURUSD',
+             'action': 'SELL', 'sl': 1.21, 'tp': 1.18, 'profit': -10.0, 'exit_time': pd.Timestamp('2024-01-02 11:00'),
+             'exit_price': 1.21, 'exit_reason': 'stop_loss'},
+        ]
+        journal = TradeJournal(self.directory, clock=self.clock)
+        journal.record_trades(trades, initial_balance=1000.0)
+        journal.close()
+        closes = read_journal(self.directory, kinds=['close'])
+        self.assertEqual(closes['balance'].tolist(), [1020.0, 1010.0])
+        self.assertEqual(closes['side'].tolist(), [1, -1])
+        self.assertEqual(len(read_journal(self.directory, kinds=['fill'])['time']), 2)
+
+if __name__ == '__main__':
+    unittest.main()
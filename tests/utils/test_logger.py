@@ -1,8 +1,18 @@
+import io
+import logging
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
-from utils.logger import setup_logging
+from utils.logger import setup_logging, stop_logging, parse_log_levels
 
 class TestLogger(unittest.TestCase):
+    def tearDown(self):
+        stop_logging()
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+        logging.getLogger('strategy.tunnel_strategy').setLevel(logging.NOTSET)
+
     @patch('logging.basicConfig')
     def test_setup_logging(self, mock_logging_basicConfig):
         log_level = 20
@@ -10,5 +20,40 @@ class TestLogger(unittest.TestCase):
         setup_logging(log_level, log_file)
         mock_logging_basicConfig.assert_called_once()
 
+    def test_records_are_written_by_the_listener(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = os.path.join(tmp, "app.log")
+            with patch('sys.stderr', new_callable=io.StringIO):
+                setup_logging(logging.INFO, log_file, module_levels="strategy.tunnel_strategy=WARNING")
+                logging.getLogger('strategy.tunnel_strategy').info("hidden %s", 1)
+                logging.getLogger('metatrader').info("Close: %.5f", 1.234567)
+                stop_logging()
+            with open(log_file) as f:
+                content = f.read()
+        self.assertIn("Close: 1.23457", content)
+        self.assertNotIn("hidden", content)
+
+    def test_disabled_levels_never_stringify_arguments(self):
+        class Frame:
+            calls = 0
+            def __str__(self):
+                Frame.calls += 1
+                return "frame"
+        with tempfile.TemporaryDirectory() as tmp, patch('sys.stderr', new_callable=io.StringIO):
+            setup_logging(logging.INFO, os.path.join(tmp, "app.log"))
+            logging.getLogger('strategy.tunnel_strategy').debug("Data: %s", Frame())
+            self.assertEqual(Frame.calls, 0)
+            logging.getLogger('strategy.tunnel_strategy').info("Data: %s", Frame())
+            # Mutable arguments are formatted before the call returns
+            self.assertEqual(Frame.calls, 1)
+            stop_logging()
+
+    def test_parse_log_levels(self):
+        self.assertEqual(parse_log_levels("strategy=warning, metatrader=DEBUG"),
+                         {'strategy': logging.WARNING, 'metatrader': logging.DEBUG})
+        self.assertEqual(parse_log_levels(""), {})
+        with self.assertRaises(ValueError):
+            parse_log_levels("strategy=LOUD")
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
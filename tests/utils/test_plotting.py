@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch
-from utils.plotting import plot_backtest_results
+import numpy as np
+from utils.plotting import plot_backtest_results, plot_journal
+from utils.journal import EVENT_KINDS
 
 class TestPlotting(unittest.TestCase):
     @patch('matplotlib.pyplot.show')
@@ -21,5 +23,18 @@ class TestPlotting(unittest.TestCase):
         plot_backtest_results(data, trades_without_balance)
         mock_pyplot_show.assert_called()
 
+    @patch('matplotlib.pyplot.show')
+    def test_plot_journal(self, mock_pyplot_show):
+        events = {
+            'time': np.array(['2024-01-01T10', '2024-01-01T11', '2024-01-01T12'], dtype='datetime64[ns]'),
+            'kind': np.array([EVENT_KINDS['fill'], EVENT_KINDS['equity'], EVENT_KINDS['close']], dtype='u1'),
+            'side': np.array([1, 0, 1], dtype='i1'),
+            'price': np.array([1.1, np.nan, 1.12]),
+            'equity': np.array([np.nan, 10005.0, np.nan]),
+            'balance': np.array([np.nan, np.nan, 10020.0]),
+        }
+        plot_journal(events)
+        mock_pyplot_show.assert_called()
+
 if __name__ == '__main__':
     unittest.main()
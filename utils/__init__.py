@@ -1,3 +1,3 @@
 from .data_validation import validate_data, sanitize_data, validate_trade_request, validate_close_request
-from .logger import setup_logging
+from .logger import setup_logging, stop_logging, parse_log_levels
 from .types import TradeAction, OrderType, OrderFilling, OrderTime, Symbol, Timeframe, LotSize
\ No newline at end of file
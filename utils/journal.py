@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# On-disk dtype of every journal field; each field is its own append-only column file
+JOURNAL_FIELDS = {
+    'time': '<i8',      # nanoseconds since the epoch
+    'kind': 'u1',       # EVENT_KINDS code
+    'symbol': 'S16',
+    'side': 'i1',       # 1 buy, -1 sell, 0 none
+    'ticket': '<i8',
+    'price': '<f8',
+    'volume': '<f8',
+    'sl': '<f8',
+    'tp': '<f8',
+    'profit': '<f8',
+    'balance': '<f8',
+    'equity': '<f8',
+    'retcode': '<i4',
+    'reason': 'S16',
+}
+JOURNAL_DTYPE = np.dtype([(field, dtype) for field, dtype in JOURNAL_FIELDS.items()])
+
+EVENT_KINDS = {'signal': 1, 'order': 2, 'fill': 3, 'close': 4, 'equity': 5}
+
+SIDES = {'BUY': 1, 'SELL': -1}
+
+_DEFAULTS = {
+    'symbol': b'', 'side': 0, 'ticket': 0, 'price': np.nan, 'volume': np.nan, 'sl': np.nan, 'tp': np.nan,
+    'profit': np.nan, 'balance': np.nan, 'equity': np.nan, 'retcode': 0, 'reason': b'',
+}
+
+def _column_path(directory, field):
+    return os.path.join(directory, f"{field}.bin")
+
+def _event_count(directory):
+    """Events stored in every column; a crash between column writes leaves some columns longer."""
+    counts = []
+    for field, dtype in JOURNAL_FIELDS.items():
+        path = _column_path(directory, field)
+        counts.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+    return min(counts)
+
+def _to_nanoseconds(when):
+    return int(pd.Timestamp(when).value)
+
+class TradeJournal:
+    """
+    Append-only journal of signals, orders, fills, closes and equity snapshots.
+
+    Events are buffered in memory and appended to one binary column file per
+    field (see ``JOURNAL_FIELDS``) when ``buffer_events`` are waiting; the
+    files are flushed and fsynced when an event arrives at least
+    ``fsync_seconds`` after the last sync, and on ``close``. Opening a journal
+    trims columns a crash left longer than the others, so every column holds
+    the same events. Read it back with ``read_journal``.
+    """
+
+    def __init__(self, directory, fsync_seconds=5.0, buffer_events=4096, clock=time.time):
+        self.directory = directory
+        self.fsync_seconds = fsync_seconds
+        self.buffer_events = buffer_events
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+        count = _event_count(directory)
+        self._files = {}
+        for field, dtype in JOURNAL_FIELDS.items():
+            handle = open(_column_path(directory, field), 'ab')
+            handle.truncate(count * np.dtype(dtype).itemsize)
+            self._files[field] = handle
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_sync = clock()
+
+    def record(self, kind, symbol='', when=None, **values):
+        """
+        Journal one ``kind`` event (a key of ``EVENT_KINDS``) for ``symbol`` at
+        ``when`` (any datetime-like; now by default). ``values`` are the other
+        ``JOURNAL_FIELDS``; unset fields are NaN, 0 or empty.
+        """
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown journal event kind: {kind}")
+        unknown = set(values) - set(_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown journal fields: {', '.join(sorted(unknown))}")
+        event = dict(_DEFAULTS, **values)
+        event['time'] = int(self.clock() * 1e9) if when is None else _to_nanoseconds(when)
+        event['kind'] = EVENT_KINDS[kind]
+        event['symbol'] = symbol
+        self._append([tuple(event[field] for field in JOURNAL_FIELDS)])
+
+    def record_trades(self, trades, initial_balance=0.0):
+        """Journal the fill and the close of every backtest trade (see ``run_backtest``), with the running balance."""
+        rows = []
+        balance = initial_balance
+        for trade in trades:
+            side = SIDES.get(trade['action'], 0)
+            common = dict(_DEFAULTS, symbol=trade['symbol'], side=side, volume=trade['volume'], sl=trade['sl'],
+                          tp=trade['tp'])
+            rows.append(dict(common, time=_to_nanoseconds(trade['entry_time']), kind=EVENT_KINDS['fill'],
+                             price=trade['entry_price']))
+            if trade.get('exit_time') is not None:
+                balance += trade.get('profit', 0)
+                rows.append(dict(common, time=_to_nanoseconds(trade['exit_time']), kind=EVENT_KINDS['close'],
+                                 price=trade['exit_price'], profit=trade.get('profit', 0), balance=balance,
+                                 reason=trade.get('exit_reason', '')))
+        self._append([tuple(row[field] for field in JOURNAL_FIELDS) for row in rows])
+
+    def _append(self, rows):
+        with self._lock:
+            if self._files is None:
+                raise ValueError("The journal is closed")
+            self._pending.extend(rows)
+            sync = self.clock() - self._last_sync >= self.fsync_seconds
+            if sync or len(self._pending) >= self.buffer_events:
+                self._write(sync)
+
+    def _write(self, sync):
+        if self._pending:
+            events = np.array(self._pending, dtype=JOURNAL_DTYPE)
+            self._pending = []
+            for field, handle in self._files.items():
+                handle.write(events[field].tobytes())
+        for handle in self._files.values():
+            handle.flush()
+            if sync:
+                os.fsync(handle.fileno())
+        if sync:
+            self._last_sync = self.clock()
+
+    def flush(self, sync=True):
+        """Write out every buffered event, and fsync the columns unless ``sync`` is False."""
+        with self._lock:
+            if self._files is not None:
+                self._write(sync)
+
+    def close(self):
+        with self._lock:
+            if self._files is None:
+                return
+            try:
+                self._write(True)
+            except OSError as e:
+                logging.error(f"Failed to write the trade journal: {e}")
+            for handle in self._files.values():
+                handle.close()
+            self._files = None
+
+def read_journal(directory, kinds=None, symbol=None):
+    """
+    Load a journal as ``{field: array}``, in the order the events were written.
+
+    ``time`` is ``datetime64[ns]``, ``kind`` the ``EVENT_KINDS`` codes, and
+    ``symbol`` and ``reason`` are bytes. ``kinds`` (names) and ``symbol``
+    select events; without them the columns are read-only memory maps of the
+    files, so even millions of events load without copying.
+    """
+    count = _event_count(directory) if os.path.isdir(directory) else 0
+    columns = {}
+    for field, dtype in JOURNAL_FIELDS.items():
+        if count:
+            values = np.memmap(_column_path(directory, field), dtype=dtype, mode='r', shape=(count,))
+        else:
+            values = np.zeros(0, dtype=dtype)
+        columns[field] = values.view('datetime64[ns]') if field == 'time' else values
+
+    mask = None
+    if kinds is not None:
+        mask = np.isin(columns['kind'], [EVENT_KINDS[kind] for kind in kinds])
+    if symbol is not None:
+        symbol_mask = columns['symbol'] == symbol.encode()
+        mask = symbol_mask if mask is None else mask & symbol_mask
+    if mask is not None:
+        columns = {field: values[mask] for field, values in columns.items()}
+    return columns
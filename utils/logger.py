@@ -1,10 +1,60 @@
+import atexit
+import datetime
 import logging
+import numbers
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
-def setup_logging(log_level=logging.INFO, log_file="app.log"):
+# Log record arguments of these types cannot change after the call, so formatting them can wait
+_IMMUTABLE_ARGS = (str, bytes, numbers.Number, type(None), datetime.date, datetime.time, datetime.timedelta)
+
+_listener = None
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queues log records for the listener thread to format and write.
+
+    Records whose arguments are all immutable are queued unformatted; any other
+    record is formatted here, because its arguments (dicts, frames...) may
+    change once the call returns.
+    """
+
+    def prepare(self, record):
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, _IMMUTABLE_ARGS) for value in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+def parse_log_levels(spec):
+    """
+    Parse per-module levels such as ``"strategy.tunnel_strategy=WARNING,metatrader=DEBUG"``
+    into ``{logger name: level}``.
+    """
+    levels = {}
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        name, sep, level = entry.partition("=")
+        if not sep or not name.strip() or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            raise ValueError(f"Invalid log level entry: '{entry.strip()}'. Expected module=LEVEL.")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+def setup_logging(log_level=logging.INFO, log_file="app.log", module_levels=None):
     """
     Set up logging configuration.
+
+    Callers only put records on a queue; a listener thread formats them and
+    writes them to the log file and the console. ``module_levels`` sets the
+    level of individual loggers, as a dict or a ``parse_log_levels`` string.
     """
+    global _listener
+    stop_logging()
+
     log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
     file_handler = logging.FileHandler(log_file)
@@ -13,13 +63,36 @@ def setup_logging(log_level=logging.INFO, log_file="app.log"):
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(log_formatter)
 
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
     # Ensure no duplicate handlers
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
 
-    logging.basicConfig(level=log_level, handlers=[file_handler, console_handler])
+    logging.basicConfig(level=log_level, handlers=[DeferredQueueHandler(log_queue)])
+
+    if isinstance(module_levels, str):
+        module_levels = parse_log_levels(module_levels)
+    for name, level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    logging.getLogger(__name__).info("Logging setup complete.")
+
+def stop_logging():
+    """
+    Write out every queued record and stop the listener thread.
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
 
-    logging.info("Logging setup complete.")
+atexit.register(stop_logging)
 
 def log_bid_ask_prices(symbol, bid, ask):
     """
@@ -1,4 +1,6 @@
 import matplotlib.pyplot as plt
+import numpy as np
+from utils.journal import EVENT_KINDS
 
 def plot_backtest_results(data, trades):
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
@@ -39,3 +41,37 @@ def plot_backtest_results(data, trades):
 
     plt.tight_layout()
     plt.show()
+
+def plot_journal(events):
+    """
+    Plot the fills, closes and equity of a trade journal (see ``utils.journal.read_journal``).
+    """
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+
+    kind = events['kind']
+    side = events['side']
+    fills = kind == EVENT_KINDS['fill']
+    closes = kind == EVENT_KINDS['close']
+    ax1.plot(events['time'][fills & (side > 0)], events['price'][fills & (side > 0)], 'g^', markersize=6, label='Buy')
+    ax1.plot(events['time'][fills & (side < 0)], events['price'][fills & (side < 0)], 'rv', markersize=6, label='Sell')
+    ax1.plot(events['time'][closes], events['price'][closes], 'kx', markersize=6, label='Close')
+    ax1.set_ylabel('Price')
+    ax1.set_title('Trade Journal')
+    ax1.grid(True)
+    ax1.legend()
+
+    # Equity snapshots from live trading; the balance after each close otherwise
+    snapshots = kind == EVENT_KINDS['equity']
+    if snapshots.any():
+        ax2.plot(events['time'][snapshots], events['equity'][snapshots], label='Equity')
+    # Closes journaled without a balance are left out of the balance line
+    closes &= ~np.isnan(events['balance'])
+    order = np.argsort(events['time'][closes], kind='stable')
+    ax2.plot(events['time'][closes][order], events['balance'][closes][order], label='Balance')
+    ax2.set_ylabel('Equity')
+    ax2.set_title('Account Equity')
+    ax2.grid(True)
+    ax2.legend()
+
+    plt.tight_layout()
+    plt.show()